@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - pyarrow é opcional
+    pa = None
+
+# Símbolos ignorados ao ler valores em texto (ex.: "R$ 1.234,56")
+_IGNORED_CHARACTERS = r"[R$\s]"
+# Valores sem vírgula em que cada ponto separa grupos de três dígitos (ex.:
+# "1.234" ou "1.234.567") são lidos como inteiros com ponto de milhar
+_THOUSANDS_ONLY = r"[+-]?\d{1,3}(?:\.\d{3})+"
+
+
+def to_decimal_values(values: pd.Series) -> pd.Series:
+    """
+    Converte a coluna "Valor" em números, aceitando o formato brasileiro.
+
+    Colunas já numéricas são devolvidas sem alteração. Em texto, valores com
+    vírgula são lidos como "1.234,56" (ponto de milhar e vírgula decimal); sem
+    vírgula, pontos seguidos de exatamente três dígitos também são de milhar
+    ("1.234" vale 1234), e os demais valores são lidos como "1234.56".
+
+    Parâmetros:
+    values (pd.Series): Coluna "Valor" lida do CSV.
+
+    Retorno:
+    pd.Series: Coluna "Valor" numérica.
+    """
+    if is_numeric_dtype(values):
+        return values
+    text = values.astype("string")
+    # Cada reescrita só é feita se alguma linha precisar dela; a conversão
+    # final de texto em float é a parte cara
+    if text.str.contains(_IGNORED_CHARACTERS, regex=True).any():
+        text = text.str.replace(_IGNORED_CHARACTERS, "", regex=True)
+    brazilian = text.str.contains(",", regex=False).fillna(False)
+    thousands = text.str.fullmatch(_THOUSANDS_ONLY).fillna(False)
+    if brazilian.any() or thousands.any():
+        without_dots = text.str.replace(".", "", regex=False)
+        text = text.where(~thousands, without_dots)
+        text = text.where(~brazilian, without_dots.str.replace(",", ".", regex=False))
+    # Células só com símbolos valem como vazias
+    return _text_to_float(text.mask(text == ""))
+
+
+def _text_to_float(text):
+    # A conversão do Arrow é bem mais rápida; formatos que só o pandas aceita
+    # (ex.: "1_000") e os valores inválidos ficam com a conversão do pandas
+    if pa is not None:
+        try:
+            numbers = pc.cast(pa.array(text), pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, TypeError):
+            pass
+        else:
+            return pd.Series(
+                numbers.to_numpy(zero_copy_only=False),
+                index=text.index,
+                name=text.name,
+            )
+    return text.astype("float64")
+
+
+def to_cents(values: pd.Series) -> np.ndarray:
+    """
+    Converte a coluna "Valor" em centavos inteiros.
+
+    Valores ausentes valem zero, como na soma do pandas.
+
+    Parâmetros:
+    values (pd.Series): Coluna "Valor", numérica ou em texto.
+
+    Retorno:
+    np.ndarray: Valores em centavos (int64).
+    """
+    numbers = to_decimal_values(values).to_numpy(dtype="float64", na_value=np.nan)
+    return np.nan_to_num(np.rint(numbers * 100), nan=0.0).astype("int64")
+
+
+def cents_to_values(cents) -> np.ndarray:
+    """
+    Converte centavos inteiros de volta em valores decimais para exibição.
+
+    Parâmetros:
+    cents: Valores em centavos.
+
+    Retorno:
+    np.ndarray: Valores em reais (float64).
+    """
+    return np.asarray(cents, dtype="int64") / 100
@@ -0,0 +1,203 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Tipos de anomalia
+DUPLICATE = "Duplicado"
+NEAR_DUPLICATE = "Quase Duplicado"
+OUTLIER = "Atípico"
+
+ANOMALIES_COLUMNS = ["Tipo", "Grupo", "Id", "Linha", "Hist", "Valor", "Detalhe"]
+
+# Escore robusto: 0,6745 torna o desvio absoluto mediano comparável ao
+# desvio-padrão de uma distribuição normal
+_MAD_SCALE = 0.6745
+
+
+def find_duplicates(
+    ids: np.ndarray, hist: np.ndarray, cents: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encontra linhas repetidas (mesmo "Id", "Hist" e valor).
+
+    Cada linha é reduzida a um hash de 64 bits e as linhas são ordenadas pelo
+    hash: as repetidas ficam vizinhas. Os grupos são conferidos pelas colunas,
+    o que descarta colisões.
+
+    Parâmetros:
+    ids (np.ndarray): Código do "Id" de cada linha.
+    hist (np.ndarray): "Hist" de cada linha.
+    cents (np.ndarray): Valor assinado de cada linha, em centavos.
+
+    Retorno:
+    Tuple[np.ndarray, np.ndarray]: Posição das linhas repetidas (todas as
+    ocorrências) e o grupo de cada uma, numerado a partir de 0 na ordem em que
+    os grupos aparecem; as linhas vêm ordenadas por grupo e posição.
+    """
+    keys = pd.DataFrame({"id": ids, "hist": hist, "cents": cents})
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    order = np.argsort(hashes)
+    groups = _runs(hashes[order])
+    # A primeira linha ordenada de cada grupo serve para conferir as demais
+    reference = order[np.flatnonzero(np.diff(groups, prepend=-1))][groups]
+    repeated = np.bincount(groups)[groups] > 1
+    rows, reference, groups = order[repeated], reference[repeated], groups[repeated]
+    same = (
+        (ids[rows] == ids[reference])
+        & (hist[rows] == hist[reference])
+        & (cents[rows] == cents[reference])
+    )
+    if not same.all():
+        # Colisão de hash (ou "Hist" vazio): agrupa comparando as colunas
+        groups = (
+            keys.iloc[rows]
+            .groupby(["id", "hist", "cents"], sort=False, dropna=False)
+            .ngroup()
+            .to_numpy()
+        )
+        repeated = np.bincount(groups)[groups] > 1
+        rows, groups = rows[repeated], groups[repeated]
+    groups, order = _by_group(rows, groups)
+    return rows[order], groups[order]
+
+
+def find_near_duplicates(
+    ids: np.ndarray, hist: np.ndarray, cents: np.ndarray, tolerance: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encontra linhas quase repetidas: mesmo "Id" e "Hist" e valores que diferem
+    em até tolerance centavos.
+
+    As linhas são ordenadas por "Id", "Hist" e valor, e uma janela desliza
+    sobre os valores ordenados: cada linha entra no grupo da anterior quando a
+    diferença entre as duas não passa da tolerância. Grupos só com valores
+    iguais ficam para find_duplicates.
+
+    Parâmetros:
+    ids (np.ndarray): Código do "Id" de cada linha.
+    hist (np.ndarray): "Hist" de cada linha.
+    cents (np.ndarray): Valor assinado de cada linha, em centavos.
+    tolerance (int): Maior diferença, em centavos, entre linhas vizinhas.
+
+    Retorno:
+    Tuple[np.ndarray, np.ndarray, np.ndarray]: Posição das linhas, o grupo de
+    cada uma (numerado como em find_duplicates) e a amplitude do grupo, em
+    centavos, ordenados por grupo e posição.
+    """
+    empty = np.array([], dtype="int64")
+    if tolerance <= 0 or len(cents) < 2:
+        return empty, empty, empty
+    order = _sort_order(ids, hist, cents)
+    sorted_cents = cents[order]
+    gap = np.diff(sorted_cents)
+    close = (
+        (ids[order][1:] == ids[order][:-1])
+        & (hist[order][1:] == hist[order][:-1])
+        & (gap <= tolerance)
+    )
+    window = np.cumsum(np.concatenate([[True], ~close])) - 1
+    sizes = np.bincount(window)
+    different = np.bincount(window[1:], weights=close & (gap > 0)) > 0
+    member = (sizes[window] > 1) & np.append(different, False)[window]
+    if not member.any():
+        return empty, empty, empty
+
+    # Ordenados por valor, o primeiro e o último de cada janela dão a amplitude
+    windows, inverse = np.unique(window[member], return_inverse=True)
+    lowest = sorted_cents[np.searchsorted(window, windows, side="left")]
+    highest = sorted_cents[np.searchsorted(window, windows, side="right") - 1]
+    rows = order[member]
+    groups, order = _by_group(rows, inverse)
+    return rows[order], groups[order], (highest - lowest)[inverse][order]
+
+
+def find_outliers(
+    ids: np.ndarray, cents: np.ndarray, threshold: float, min_lines: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encontra valores atípicos dentro de cada "Id".
+
+    Usa o escore robusto 0,6745 * (valor - mediana) / desvio absoluto mediano
+    sobre o módulo dos valores. As medianas saem de duas ordenações de todas as
+    linhas (por valor e por desvio, dentro de cada "Id"), sem laço por "Id".
+
+    Parâmetros:
+    ids (np.ndarray): Código do "Id" de cada linha.
+    cents (np.ndarray): Valor assinado de cada linha, em centavos.
+    threshold (float): Escore a partir do qual o valor é atípico (ex.: 3,5).
+    min_lines (int): Quantidade mínima de linhas do "Id" para avaliá-lo.
+
+    Retorno:
+    Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Posição das linhas
+    atípicas, o grupo de cada uma (um por "Id", numerado como em
+    find_duplicates), o escore e a mediana do "Id", em centavos, ordenados por
+    grupo e posição.
+    """
+    empty = np.array([], dtype="int64")
+    if not len(cents):
+        return empty, empty, empty.astype("float64"), empty.astype("float64")
+    magnitude = np.abs(cents.astype("int64"))
+    order = _sort_order(ids, magnitude)
+    sorted_magnitude = magnitude[order]
+    group = _runs(ids[order])
+    starts = np.flatnonzero(np.diff(group, prepend=-1))
+    counts = np.diff(np.append(starts, len(order)))
+
+    # Com a mediana em dobro, os desvios (também em dobro) continuam inteiros
+    median = _sorted_median(sorted_magnitude, starts, counts)
+    deviation = 2 * sorted_magnitude - median[group]
+    absolute = np.abs(deviation)
+    mad = _sorted_median(absolute[_sort_order(group, absolute)], starts, counts)
+    evaluated = np.flatnonzero((counts[group] >= min_lines) & (mad[group] > 0))
+    # mad é o quádruplo do desvio absoluto mediano
+    score = 2 * _MAD_SCALE * deviation[evaluated] / mad[group[evaluated]]
+    flagged = np.abs(score) > threshold
+    score, flagged = score[flagged], evaluated[flagged]
+
+    rows = order[flagged]
+    groups, order = _by_group(rows, group[flagged])
+    medians = median[group[flagged]] / 2
+    return rows[order], groups[order], score[order], medians[order]
+
+
+def _sort_order(*keys):
+    # Ordem pelas chaves, da mais para a menos significativa. Chaves inteiras
+    # que cabem juntas em um int64 viram uma chave única, e uma ordenação simples
+    # substitui a lexsort, várias vezes mais lenta
+    combined = np.zeros(len(keys[0]), dtype="int64")
+    if not len(combined):
+        return combined
+    capacity = 1
+    for key in keys:
+        if key.dtype.kind not in "iu":
+            return np.lexsort(keys[::-1])
+        low = int(key.min())
+        span = int(key.max()) - low + 1
+        capacity *= span
+        if capacity >= 2**63:
+            return np.lexsort(keys[::-1])
+        combined = combined * span + (key - low)
+    return np.argsort(combined)
+
+
+def _runs(values):
+    # Numera as sequências de valores iguais de um array ordenado
+    return np.cumsum(np.diff(values, prepend=values[:1]) != 0)
+
+
+def _sorted_median(values, starts, counts):
+    # Dobro da mediana de cada grupo contínuo de valores ordenados no grupo
+    return values[starts + (counts - 1) // 2] + values[starts + counts // 2]
+
+
+def _by_group(rows, groups):
+    # Renumera os grupos de 0 em diante pela primeira linha de cada um e dá a
+    # ordem das linhas por grupo e posição
+    unique, inverse = np.unique(groups, return_inverse=True)
+    first = np.full(len(unique), np.iinfo("int64").max)
+    np.minimum.at(first, inverse, rows)
+    rank = np.empty(len(unique), dtype="int64")
+    rank[np.argsort(first)] = np.arange(len(unique))
+    groups = rank[inverse]
+    return groups, _sort_order(groups, rows)
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from instrumentation import peak_rss_mb
+from synthetic import generate_ledger
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+STAGES = [
+    "_load_and_process_data",
+    "_calculate_results",
+    "_find_similar_values",
+    "_save_to_excel",
+]
+
+
+def run_stages(csv_path: str, output_path: str, output_format: str = "xlsx"):
+    """
+    Executa cada etapa da conciliação de um arquivo e mede o tempo de cada uma.
+
+    O tempo de _find_similar_values é medido à parte e descontado de
+    _calculate_results, que a chama internamente.
+
+    Parâmetros:
+    csv_path (str): CSV de entrada.
+    output_path (str): Pasta de saída.
+    output_format (str): Formato de saída usado em _save_to_excel.
+
+    Retorno:
+    dict: Tempo em segundos por etapa, quantidade de linhas e pico de memória.
+    """
+    from tools import Conciliation
+
+    conciliation = Conciliation()
+    conciliation.set_output(output_path)
+    conciliation.set_output_format(output_format)
+
+    timings = {}
+    find_similar_values = conciliation._find_similar_values
+
+    def timed_find_similar_values(*args):
+        start = time.perf_counter()
+        result = find_similar_values(*args)
+        timings["_find_similar_values"] = time.perf_counter() - start
+        return result
+
+    conciliation._find_similar_values = timed_find_similar_values
+
+    for stage, args in [
+        ("_load_and_process_data", (csv_path,)),
+        ("_calculate_results", ()),
+        ("_save_to_excel", (csv_path,)),
+    ]:
+        start = time.perf_counter()
+        getattr(conciliation, stage)(*args)
+        timings[stage] = time.perf_counter() - start
+    timings["_calculate_results"] -= timings["_find_similar_values"]
+
+    return {
+        "rows": conciliation._rows_parsed,
+        "stages": {stage: timings[stage] for stage in STAGES},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmark(sizes, work_dir, output_format="xlsx", **generator_options):
+    """
+    Gera razões sintéticos de cada tamanho e mede a conciliação de cada um em
+    um processo separado, para que o pico de memória seja independente.
+
+    Parâmetros:
+    sizes (List[int]): Quantidades de linhas a medir.
+    work_dir (str): Pasta para os CSV gerados e os resultados.
+    output_format (str): Formato de saída usado em _save_to_excel.
+    generator_options: Opções repassadas para synthetic.generate_ledger.
+
+    Retorno:
+    List[dict]: Um resultado de run_stages por tamanho.
+    """
+    results = []
+    for rows in sizes:
+        csv_path = os.path.join(work_dir, f"ledger_{rows}.csv")
+        if not os.path.exists(csv_path):
+            generate_ledger(csv_path, rows, **generator_options)
+        completed = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--run-one",
+                csv_path,
+                "--output",
+                os.path.join(work_dir, "result"),
+                "--format",
+                output_format,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results.append(json.loads(completed.stdout))
+    return results
+
+
+def _print_table(results):
+    header = f"{'rows':>10} " + " ".join(f"{s.strip('_')[:22]:>23}" for s in STAGES)
+    print(header + f" {'peak MB':>9}")
+    for result in results:
+        line = f"{result['rows']:>10} " + " ".join(
+            f"{result['stages'][stage]:>22.3f}s" for stage in STAGES
+        )
+        peak = result["peak_rss_mb"]
+        print(line + (f" {peak:>9.1f}" if peak is not None else f" {'-':>9}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede o tempo de cada etapa da conciliação em razões sintéticos."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+        help="Quantidades de linhas separadas por vírgula (ex.: 10000,10000000)",
+    )
+    parser.add_argument("--ids", type=int, default=None)
+    parser.add_argument("--cnpj-ratio", type=float, default=0.3)
+    parser.add_argument("--match-rate", type=float, default=0.6)
+    parser.add_argument("--offset-ratio", type=float, default=0.1)
+    parser.add_argument("--work-dir", default=None, help="Pasta de trabalho")
+    parser.add_argument("--format", default="xlsx", help="Formato de saída")
+    parser.add_argument("--json", default=None, help="Salva os resultados em JSON")
+    parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_stages(args.run_one, args.output, args.format)))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = run_benchmark(
+            args.sizes,
+            args.work_dir or temp_dir,
+            output_format=args.format,
+            ids=args.ids,
+            cnpj_ratio=args.cnpj_ratio,
+            match_rate=args.match_rate,
+            offset_ratio=args.offset_ratio,
+        )
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow é opcional
+    pa = None
+
+# Mudanças no formato dos resultados devem incrementar esta versão
+CACHE_VERSION = 1
+
+CACHE_FOLDER = ".conciliation_cache"
+
+# Mudanças na leitura do CSV ou nas colunas guardadas devem incrementar esta versão
+PARSED_CACHE_VERSION = 3
+
+PARSED_CACHE_FOLDER = ".parsed_cache"
+
+_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo, lendo-o em blocos.
+
+    Parâmetros:
+    path (str): Caminho do arquivo.
+
+    Retorno:
+    str: Hash hexadecimal do conteúdo.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def _evict_oldest(directory, max_bytes):
+    # Remove as entradas (arquivos ou pastas) de uso mais antigo até o limite
+    entries = []
+    for name in os.listdir(directory):
+        if name.startswith("."):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            entries.append((os.path.getmtime(path), _path_size(path), path))
+        except FileNotFoundError:
+            continue
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+class ResultCache:
+    """
+    Cache em disco dos resultados da conciliação.
+
+    Cada entrada é uma pasta com o nome da chave contendo uma cópia do
+    resultado gerado. A data de modificação da pasta marca o último uso e as
+    entradas mais antigas são removidas quando o tamanho total passa do limite.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self._directory = directory
+        self._max_bytes = max_bytes
+
+    @staticmethod
+    def key(input_file: str, settings: Dict) -> str:
+        """
+        Gera a chave de um arquivo de entrada a partir do seu conteúdo e das
+        configurações que afetam o resultado.
+
+        Parâmetros:
+        input_file (str): Caminho do arquivo de entrada.
+        settings (Dict): Configurações da conciliação, sem o diretório de saída.
+
+        Retorno:
+        str: Chave da entrada no cache.
+        """
+        payload = json.dumps(
+            {"version": CACHE_VERSION, "settings": settings}, sort_keys=True
+        )
+        digest = hashlib.sha256(file_digest(input_file).encode())
+        digest.update(payload.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str, output_base: str) -> Optional[str]:
+        """
+        Restaura o resultado em cache, se existir, no caminho de saída.
+
+        Parâmetros:
+        key (str): Chave da entrada.
+        output_base (str): Caminho de saída sem a extensão.
+
+        Retorno:
+        Optional[str]: Caminho do resultado restaurado, ou None se não houver
+        entrada para a chave.
+        """
+        entry = os.path.join(self._directory, key)
+        try:
+            artifact_name = os.listdir(entry)[0]
+        except (FileNotFoundError, IndexError):
+            return None
+        artifact = os.path.join(entry, artifact_name)
+        extension = os.path.splitext(artifact_name)[1]
+        output = f"{output_base}{extension}"
+
+        # Só copia se o resultado no destino não for idêntico ao do cache
+        if not self._same_file(artifact, output):
+            if os.path.isdir(artifact):
+                shutil.copytree(artifact, output, dirs_exist_ok=True)
+            else:
+                shutil.copy2(artifact, output)
+        os.utime(entry)
+        return output
+
+    def put(self, key: str, output: str):
+        """
+        Guarda uma cópia do resultado e remove as entradas menos usadas se o
+        cache ultrapassar o limite de tamanho.
+
+        Parâmetros:
+        key (str): Chave da entrada.
+        output (str): Caminho do resultado gerado (arquivo ou pasta).
+        """
+        if _path_size(output) > self._max_bytes:
+            return
+        os.makedirs(self._directory, exist_ok=True)
+        # Grava em uma pasta temporária e renomeia, para não expor entradas parciais
+        staging = os.path.join(self._directory, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        target = os.path.join(staging, os.path.basename(output))
+        if os.path.isdir(output):
+            shutil.copytree(output, target)
+        else:
+            shutil.copy2(output, target)
+        try:
+            os.replace(staging, os.path.join(self._directory, key))
+        except OSError:
+            # Outro processo gravou a mesma chave primeiro
+            shutil.rmtree(staging, ignore_errors=True)
+        _evict_oldest(self._directory, self._max_bytes)
+
+    @staticmethod
+    def _same_file(source, destination):
+        if not os.path.isfile(source) or not os.path.isfile(destination):
+            return False
+        source_stat = os.stat(source)
+        destination_stat = os.stat(destination)
+        return (
+            source_stat.st_size == destination_stat.st_size
+            and int(source_stat.st_mtime) == int(destination_stat.st_mtime)
+        )
+
+
+class ParsedLedgerCache:
+    """
+    Cache em disco dos razões já lidos e com o "Id" extraído.
+
+    Cada entrada é um arquivo Arrow IPC sem compressão, relido por mapeamento
+    de memória: uma nova conciliação do mesmo arquivo (ex.: com outros sinais
+    de "Hist" ou outro formato de saída) não relê o CSV nem executa as
+    expressões regulares. A chave usa o caminho, o tamanho e a data de
+    modificação do arquivo, sem ler seu conteúdo. Sem o pyarrow o cache fica
+    desativado.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self._directory = directory
+        self._max_bytes = max_bytes
+
+    @staticmethod
+    def available() -> bool:
+        """
+        Indica se o pyarrow está instalado.
+        """
+        return pa is not None
+
+    @staticmethod
+    def key(input_file: str, id_patterns: List[Tuple[str, str, int]]) -> str:
+        """
+        Gera a chave de um arquivo de entrada.
+
+        Parâmetros:
+        input_file (str): Caminho do arquivo de entrada.
+        id_patterns (List[Tuple[str, str, int]]): Padrões usados na extração
+        do "Id".
+
+        Retorno:
+        str: Chave da entrada no cache.
+        """
+        stat = os.stat(input_file)
+        payload = json.dumps(
+            {
+                "version": PARSED_CACHE_VERSION,
+                "file": os.path.abspath(input_file),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "id_patterns": id_patterns,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Iterator[pd.DataFrame]]:
+        """
+        Lê uma entrada por mapeamento de memória.
+
+        Parâmetros:
+        key (str): Chave da entrada.
+
+        Retorno:
+        Optional[Iterator[pd.DataFrame]]: Os blocos guardados, na ordem em que
+        foram gravados, ou None se não houver entrada para a chave.
+        """
+        path = os.path.join(self._directory, f"{key}.arrow")
+        try:
+            source = pa.memory_map(path)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return self._read_blocks(source)
+
+    @staticmethod
+    def _read_blocks(source):
+        with source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+
+    def put(
+        self, key: str, blocks: Iterable[pd.DataFrame]
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Guarda os blocos lidos à medida que são consumidos. A entrada só passa a
+        valer depois do último bloco; então as entradas menos usadas são
+        removidas se o cache ultrapassar o limite de tamanho.
+
+        Parâmetros:
+        key (str): Chave da entrada.
+        blocks (Iterable[pd.DataFrame]): Blocos com as mesmas colunas.
+
+        Retorno:
+        Iterator[pd.DataFrame]: Os mesmos blocos, sem alteração.
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        # Grava em um arquivo temporário e renomeia, para não expor entradas parciais
+        staging = os.path.join(self._directory, f".tmp-{uuid.uuid4().hex}")
+        complete = True
+        try:
+            with pa.OSFile(staging, "wb") as sink:
+                writer = schema = None
+                for block in blocks:
+                    batch = pa.RecordBatch.from_pandas(block, preserve_index=False)
+                    if writer is None:
+                        schema = batch.schema
+                        writer = pa.ipc.new_file(sink, schema)
+                    # Blocos com tipos inferidos diferentes invalidam a entrada
+                    complete = complete and batch.schema.equals(schema)
+                    if complete:
+                        writer.write_batch(batch)
+                    yield block
+                if writer is None:
+                    complete = False
+                else:
+                    writer.close()
+        except BaseException:
+            # Leitura interrompida (erro ou cancelamento): descarta a entrada
+            os.remove(staging)
+            raise
+        if not complete or os.path.getsize(staging) > self._max_bytes:
+            os.remove(staging)
+            return
+        os.replace(staging, os.path.join(self._directory, f"{key}.arrow"))
+        _evict_oldest(self._directory, self._max_bytes)
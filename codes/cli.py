@@ -0,0 +1,352 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cache import file_digest
+from tools import Conciliation
+from writers import OUTPUT_WRITERS
+
+# Códigos de saída para agendadores
+EXIT_OK = 0
+EXIT_FAILED = 1  # ao menos um arquivo falhou ou não foi encontrado
+EXIT_USAGE = 2  # argumentos inválidos (padrão do argparse)
+EXIT_NO_INPUT = 3  # nenhum arquivo encontrado
+EXIT_INTERRUPTED = 130
+
+WATCH_STATE_FILE = ".watch_processed"
+
+
+def expand_inputs(inputs: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Expande arquivos, padrões glob e pastas em uma lista de arquivos CSV.
+
+    Parâmetros:
+    inputs (List[str]): Caminhos de arquivos, padrões (ex.: "csv/*.csv") ou
+    pastas, das quais são usados os arquivos .csv.
+
+    Retorno:
+    Tuple[List[str], List[str]]: Arquivos encontrados, sem repetição e na
+    ordem dos argumentos, e os caminhos explícitos (sem padrão glob) que não
+    existem.
+    """
+    files = []
+    missing = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(sorted(glob.glob(os.path.join(item, "*.csv"))))
+        elif glob.has_magic(item):
+            files.extend(sorted(glob.glob(item)))
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            missing.append(item)
+    return list(dict.fromkeys(os.path.abspath(file) for file in files)), missing
+
+
+class InboxWatcher:
+    """
+    Observa pastas de entrada e libera os CSV novos para conciliação.
+
+    Um arquivo só é liberado quando seu tamanho e data de modificação ficam
+    estáveis pelo intervalo de debounce, evitando ler exportações ainda em
+    gravação. Arquivos com conteúdo já processado são ignorados; os hashes
+    processados ficam salvos em um arquivo de estado para sobreviver a
+    reinícios.
+    """
+
+    def __init__(self, directories: List[str], debounce: float, state_path: str):
+        self._directories = directories
+        self._debounce = debounce
+        self._state_path = state_path
+        self._pending: Dict[str, Tuple[int, int, float]] = {}
+        self._processed = set()
+        if os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as file:
+                self._processed = {line.strip() for line in file if line.strip()}
+
+    def poll(self) -> List[Tuple[str, str]]:
+        """
+        Verifica as pastas uma vez.
+
+        Retorno:
+        List[Tuple[str, str]]: Pares (arquivo, hash do conteúdo) prontos para
+        conciliação.
+        """
+        now = time.monotonic()
+        ready = []
+        digests = set()
+        seen = set()
+        for directory in self._directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                # Pasta removida ou sem permissão: tenta de novo na próxima volta
+                print(f"Pasta indisponível: {directory}: {e}", file=sys.stderr)
+                continue
+            for entry in entries:
+                try:
+                    if not entry.is_file() or not entry.name.lower().endswith(".csv"):
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Removido entre a listagem e a leitura
+                seen.add(entry.path)
+                size, mtime = stat.st_size, stat.st_mtime_ns
+                previous = self._pending.get(entry.path)
+                if previous is None or previous[:2] != (size, mtime):
+                    self._pending[entry.path] = (size, mtime, now)
+                    continue
+                if previous[2] is None or now - previous[2] < self._debounce:
+                    continue
+                try:
+                    digest = file_digest(entry.path)
+                except OSError:
+                    # Removido ou bloqueado durante a leitura; espera estabilizar
+                    self._pending.pop(entry.path, None)
+                    continue
+                # Marca como visto até o arquivo mudar de novo
+                self._pending[entry.path] = (size, mtime, None)
+                # Cópias com o mesmo conteúdo na mesma volta são conciliadas uma vez
+                if digest not in self._processed and digest not in digests:
+                    digests.add(digest)
+                    ready.append((entry.path, digest))
+        for path in set(self._pending) - seen:
+            del self._pending[path]
+        return ready
+
+    def mark_processed(self, digest: str):
+        """
+        Registra um conteúdo como processado.
+
+        Parâmetros:
+        digest (str): Hash do conteúdo do arquivo.
+        """
+        self._processed.add(digest)
+        with open(self._state_path, "a", encoding="utf-8") as file:
+            file.write(digest + "\n")
+
+
+def _report(summaries) -> int:
+    exit_code = EXIT_OK
+    for summary in summaries:
+        if summary["status"] == "ok":
+            print(
+                f"ok      {summary['file']} -> {summary['output']}"
+                f" ({summary['elapsed']:.1f}s)"
+            )
+        else:
+            exit_code = EXIT_FAILED
+            print(
+                f"{summary['status']:<7} {summary['file']}: {summary['error']}",
+                file=sys.stderr,
+            )
+    return exit_code
+
+
+def _consolidate(conciliation: Conciliation, files: List[str], name: str) -> int:
+    start = time.perf_counter()
+    try:
+        output = conciliation.consolidate(files, name)
+    except Exception as e:
+        print(f"error   {name}: {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    elapsed = time.perf_counter() - start
+    print(f"ok      {len(files)} períodos -> {output} ({elapsed:.1f}s)")
+    return EXIT_OK
+
+
+def watch(conciliation: Conciliation, directories: List[str], args) -> int:
+    """
+    Concilia continuamente os CSV que chegam nas pastas de entrada.
+
+    Retorno:
+    int: EXIT_INTERRUPTED quando interrompido pelo usuário.
+    """
+    watcher = InboxWatcher(
+        directories,
+        args.debounce,
+        os.path.join(args.output, WATCH_STATE_FILE),
+    )
+    print(f"Observando {', '.join(directories)} (Ctrl+C para sair)")
+    try:
+        while True:
+            ready = watcher.poll()
+            if ready:
+                summaries = conciliation.new_conciliation([path for path, _ in ready])
+                _report(summaries)
+                # Falhas também são registradas para não repetir o erro a cada volta
+                for _, digest in ready:
+                    watcher.mark_processed(digest)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Conciliação de razões contábeis sem interface gráfica."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Arquivos CSV, padrões glob ou pastas de entrada"
+    )
+    parser.add_argument("-o", "--output", required=True, help="Pasta de saída")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="Processos em paralelo"
+    )
+    parser.add_argument(
+        "--format",
+        default="xlsx",
+        choices=sorted(OUTPUT_WRITERS),
+        help="Formato dos resultados",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=None, help="Lê o CSV em blocos de N linhas"
+    )
+    parser.add_argument(
+        "--hist-rules",
+        default=None,
+        metavar="ARQUIVO",
+        help="Arquivo JSON com as regras de \"Hist\" (sinais, categorias e abas)",
+    )
+    parser.add_argument(
+        "--tolerance-cents",
+        type=int,
+        default=0,
+        help="Agrupa saldos em aberto cuja diferença não passa de N centavos",
+    )
+    parser.add_argument(
+        "--max-parts",
+        type=int,
+        default=1,
+        help="Agrupa saldos quitados em até N parcelas",
+    )
+    parser.add_argument(
+        "--anomalies",
+        action="store_true",
+        help="Lista linhas repetidas e valores atípicos na aba \"Anomalias\"",
+    )
+    parser.add_argument(
+        "--cache-mb", type=int, default=0, help="Tamanho do cache de resultados"
+    )
+    parser.add_argument(
+        "--parsed-cache-mb",
+        type=int,
+        default=0,
+        help="Tamanho do cache dos CSV já lidos (formato Arrow)",
+    )
+    parser.add_argument(
+        "--report", action="store_true", help="Salva o relatório de execução"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["cprofile", "tracemalloc"],
+        default=None,
+        help="Inclui o profiler escolhido no relatório de execução",
+    )
+    parser.add_argument(
+        "--consolidate",
+        nargs="?",
+        const="consolidado",
+        default=None,
+        metavar="NOME",
+        help="Concilia os arquivos como períodos de um único razão, na ordem dada",
+    )
+    parser.add_argument(
+        "--incremental-store",
+        default=None,
+        metavar="ARQUIVO",
+        help="Soma cada arquivo, como lote, ao estado salvo neste banco SQLite",
+    )
+    parser.add_argument(
+        "--only-touched",
+        action="store_true",
+        help="Com --incremental-store, gera só os \"Id\" afetados pelo lote",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Observa as pastas de entrada e concilia os CSV novos",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=5.0, help="Segundos entre verificações"
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=10.0,
+        help="Segundos sem alteração antes de conciliar um arquivo novo",
+    )
+    return parser
+
+
+def build_conciliation(args) -> Conciliation:
+    conciliation = Conciliation()
+    conciliation.set_output(args.output)
+    conciliation.set_workers(args.workers)
+    conciliation.set_output_format(args.format)
+    conciliation.set_chunk_size(args.chunk_size)
+    if args.hist_rules:
+        conciliation.set_hist_rules(args.hist_rules)
+    conciliation.set_matching(args.tolerance_cents, args.max_parts)
+    conciliation.set_anomaly_detection(args.anomalies)
+    conciliation.set_cache(args.cache_mb * 1024 * 1024 if args.cache_mb else None)
+    conciliation.set_parsed_cache(
+        args.parsed_cache_mb * 1024 * 1024 if args.parsed_cache_mb else None
+    )
+    conciliation.set_instrumentation(args.report or bool(args.profile), args.profile)
+    conciliation.set_incremental_store(args.incremental_store, args.only_touched)
+    return conciliation
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Ponto de entrada da linha de comando.
+
+    Parâmetros:
+    argv (Optional[List[str]]): Argumentos; por padrão, os do processo.
+
+    Retorno:
+    int: Código de saída (EXIT_OK, EXIT_FAILED, EXIT_NO_INPUT ou
+    EXIT_INTERRUPTED). Um caminho explícito inexistente resulta em
+    EXIT_FAILED, mesmo que os demais arquivos sejam conciliados.
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        conciliation = build_conciliation(args)
+    except (OSError, ValueError) as e:
+        print(f"Configuração inválida: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.watch:
+        directories = [item for item in args.inputs if os.path.isdir(item)]
+        if len(directories) != len(args.inputs):
+            print("O modo --watch aceita apenas pastas.", file=sys.stderr)
+            return EXIT_USAGE
+        return watch(conciliation, directories, args)
+
+    files, missing = expand_inputs(args.inputs)
+    for item in missing:
+        print(f"Arquivo não encontrado: {item}", file=sys.stderr)
+    if not files:
+        print("Nenhum arquivo CSV encontrado.", file=sys.stderr)
+        return EXIT_NO_INPUT
+    try:
+        if args.consolidate:
+            # Um período faltando mudaria o razão consolidado
+            if missing:
+                return EXIT_FAILED
+            return _consolidate(conciliation, files, args.consolidate)
+        exit_code = _report(conciliation.new_conciliation(files))
+        # Os arquivos encontrados são conciliados, mas o agendador vê a falha
+        return EXIT_FAILED if missing else exit_code
+    except KeyboardInterrupt:
+        conciliation.cancel()
+        return EXIT_INTERRUPTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
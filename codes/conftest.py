@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tools import Conciliation
+
+CSV_HEADER = "Data;Valor;Hist;Complemento;Outro"
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """
+    Grava um razão CSV de teste e retorna o caminho.
+
+    Cada linha é (Valor, Hist, Complemento); o Valor é gravado como texto,
+    no formato do arquivo (ex.: "1.234,56" ou "10.5").
+    """
+
+    def write(rows, name="razao.csv"):
+        lines = [CSV_HEADER]
+        lines += [f"01/01/2024;{value};{hist};{text};x" for value, hist, text in rows]
+        path = tmp_path / name
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return str(path)
+
+    return write
+
+
+@pytest.fixture
+def make_conciliation(tmp_path):
+    """
+    Cria uma Conciliation que grava em CSV na pasta indicada, dentro da pasta
+    temporária do teste.
+    """
+
+    def make(folder="out"):
+        conciliation = Conciliation()
+        conciliation.set_output(str(tmp_path / folder))
+        conciliation.set_output_format("csv")
+        return conciliation
+
+    return make
+
+
+@pytest.fixture
+def conciliation(make_conciliation):
+    """
+    Conciliation do teste, gravando em CSV na pasta "out".
+    """
+    return make_conciliation()
+
+
+@pytest.fixture
+def reconcile(conciliation):
+    """
+    Concilia um arquivo com a Conciliation do teste e retorna o resumo,
+    verificando que não houve erro.
+    """
+
+    def run(path, conciliation=conciliation):
+        summary = conciliation.new_conciliation([path])[0]
+        assert summary["status"] == "ok", summary["error"]
+        return summary
+
+    return run
+
+
+@pytest.fixture
+def sheet():
+    """
+    Lê uma aba gravada em CSV (com o "Id" como texto).
+    """
+
+    def read(output, name):
+        path = os.path.join(output, f"{name}.csv")
+        return pd.read_csv(path, sep=";", dtype={"Id": "str"})
+
+    return read
@@ -0,0 +1,195 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from amounts import cents_to_values
+
+PERIOD_COLUMN = "Período"
+
+
+def period_name(file: str) -> str:
+    """
+    Nome do período de um arquivo: o nome do arquivo sem a extensão
+    (ex.: "csv/2024-01.csv" -> "2024-01").
+    """
+    return os.path.splitext(os.path.basename(file))[0]
+
+
+class ConsolidatedLedger:
+    """
+    Movimentos de vários períodos guardados em uma única tabela colunar.
+
+    Cada período contribui com a soma dos centavos assinados por "Id" e com os
+    valores de "Próximo Ano" ("Hist" 20 nas regras padrão); a tabela
+    "Período" x "Id" é montada uma vez e as consultas (saldos acumulados,
+    período de fechamento, transporte entre períodos, histórico de um "Id")
+    reutilizam o resultado sem reler os arquivos.
+    """
+
+    def __init__(self):
+        self._periods: List[str] = []
+        self._totals: List[pd.Series] = []
+        self._next_year_values: List[np.ndarray] = []
+        self._movements = None
+        self._cumulative = None
+        self._closing = None
+
+    def add_period(self, period: str, totals: pd.Series, next_year_values):
+        """
+        Acrescenta um período depois dos já carregados.
+
+        Parâmetros:
+        period (str): Nome do período; deve ser único.
+        totals (pd.Series): Centavos assinados somados por "Id" no período.
+        next_year_values: Centavos assinados das linhas de "Próximo Ano" do período.
+        """
+        if period in self._periods:
+            raise ValueError(f"Período repetido: '{period}'")
+        self._periods.append(period)
+        self._totals.append(totals.astype("int64"))
+        self._next_year_values.append(np.asarray(next_year_values, dtype="int64"))
+        self._movements = self._cumulative = self._closing = None
+
+    def periods(self) -> List[str]:
+        """
+        Retorna os períodos na ordem em que foram carregados.
+        """
+        return list(self._periods)
+
+    def movements(self) -> pd.DataFrame:
+        """
+        Retorna a movimentação em centavos de cada "Id" (linhas) em cada
+        período (colunas), com NaN onde o "Id" não aparece no período.
+        """
+        if self._movements is None:
+            movements = pd.concat(self._totals, keys=self._periods, names=[PERIOD_COLUMN])
+            self._movements = movements.unstack(PERIOD_COLUMN).reindex(
+                columns=self._periods
+            )
+        return self._movements
+
+    def cumulative(self) -> pd.DataFrame:
+        """
+        Retorna o saldo acumulado em centavos de cada "Id" ao fim de cada
+        período.
+        """
+        if self._cumulative is None:
+            self._cumulative = (
+                self.movements().fillna(0).astype("int64").cumsum(axis=1)
+            )
+        return self._cumulative
+
+    def totals(self) -> pd.Series:
+        """
+        Retorna o saldo final em centavos de cada "Id", somando todos os períodos.
+        """
+        return self.cumulative().iloc[:, -1].rename("_cents")
+
+    def next_year_values(self) -> np.ndarray:
+        """
+        Retorna os valores de "Próximo Ano" de todos os períodos, sem repetição.
+        """
+        return np.unique(np.concatenate(self._next_year_values))
+
+    def closing_periods(self) -> pd.Series:
+        """
+        Retorna, para cada "Id", o período em que o saldo zerou pela última
+        vez, ou None se o "Id" continua em aberto no último período.
+        """
+        if self._closing is None:
+            open_balance = self.cumulative().to_numpy() != 0
+            # open_after[:, p]: saldo diferente de zero no período p ou depois
+            open_after = np.flip(
+                np.logical_or.accumulate(np.flip(open_balance, axis=1), axis=1), axis=1
+            )
+            closing = open_after.sum(axis=1)
+            # Um "Id" não fecha antes de aparecer pela primeira vez
+            first_seen = self.movements().notna().to_numpy().argmax(axis=1)
+            closing = np.maximum(closing, first_seen)
+            periods = np.array(self._periods + [None], dtype=object)
+            # dtype object mantém None (o pandas converteria para NaN em texto)
+            self._closing = pd.Series(
+                periods[closing],
+                index=self.cumulative().index,
+                name="Fechamento",
+                dtype=object,
+            )
+        return self._closing
+
+    def carry_over(self) -> pd.DataFrame:
+        """
+        Resume o transporte de saldos entre períodos consecutivos.
+
+        Retorno:
+        pd.DataFrame: Uma linha por período com os "Id" recebidos em aberto do
+        período anterior, quantos deles foram liquidados no período, os "Id"
+        fechados no período e os "Id" e saldos (positivo e negativo)
+        transportados para o período seguinte.
+        """
+        cumulative = self.cumulative().to_numpy()
+        open_balance = cumulative != 0
+        closing = self.closing_periods()
+        rows = []
+        for idx, period in enumerate(self._periods):
+            balance = cumulative[:, idx]
+            received = (
+                open_balance[:, idx - 1]
+                if idx > 0
+                else np.zeros(len(balance), dtype=bool)
+            )
+            rows.append(
+                {
+                    PERIOD_COLUMN: period,
+                    "Recebidos em Aberto": int(received.sum()),
+                    "Liquidados do Anterior": int((received & ~open_balance[:, idx]).sum()),
+                    "Fechados no Período": int((closing == period).sum()),
+                    "Transportados": int(open_balance[:, idx].sum()),
+                    "Saldo Positivo Transportado": cents_to_values(
+                        balance[balance > 0].sum()
+                    ),
+                    "Saldo Negativo Transportado": cents_to_values(
+                        balance[balance < 0].sum()
+                    ),
+                }
+            )
+        return pd.DataFrame(rows)
+
+    def balances(self) -> pd.DataFrame:
+        """
+        Retorna o saldo de cada "Id" ao fim de cada período, com o saldo final
+        em "Resultado" e o período de fechamento em "Fechamento".
+        """
+        cumulative = self.cumulative()
+        table = pd.DataFrame(
+            cents_to_values(cumulative.to_numpy()),
+            index=cumulative.index,
+            columns=self._periods,
+        )
+        table.insert(0, "Resultado", cents_to_values(self.totals()))
+        table.insert(1, "Fechamento", self.closing_periods())
+        return table.rename_axis("Id").reset_index()
+
+    def history(self, id_: str) -> Optional[pd.DataFrame]:
+        """
+        Retorna a movimentação e o saldo acumulado de um "Id" em cada período.
+
+        Parâmetros:
+        id_ (str): O "Id" consultado.
+
+        Retorno:
+        Optional[pd.DataFrame]: Colunas "Período", "Movimento" e "Saldo", ou None
+        se o "Id" não aparece em nenhum período.
+        """
+        if id_ not in self.cumulative().index:
+            return None
+        return pd.DataFrame(
+            {
+                PERIOD_COLUMN: self._periods,
+                "Movimento": cents_to_values(
+                    self.movements().loc[id_].fillna(0).to_numpy()
+                ),
+                "Saldo": cents_to_values(self.cumulative().loc[id_].to_numpy()),
+            }
+        )
@@ -0,0 +1,138 @@
+import os
+from typing import Dict, List, NamedTuple
+
+
+class FolderEntry(NamedTuple):
+    name: str
+    size: int
+    mtime: float
+
+
+class FolderSnapshot:
+    """
+    Retrato em memória dos arquivos de uma pasta com uma extensão.
+
+    A pasta é lida com os.scandir e mantida em cache com o nome, o tamanho e
+    a data de modificação de cada arquivo. Uma nova leitura só acontece quando
+    a data de modificação da própria pasta muda (arquivo criado, renomeado ou
+    removido) ou quando é forçada; as alterações feitas pela interface podem
+    ser aplicadas diretamente, sem reler a pasta.
+    """
+
+    def __init__(self, directory: str, extension: str):
+        self._directory = directory
+        self._extension = extension.lower()
+        self._entries: Dict[str, FolderEntry] = {}
+        self._directory_mtime = None
+        self._ordered = None
+        self._query = ""
+        self._filtered = None
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Atualiza o retrato se a pasta mudou.
+
+        Parâmetros:
+        force (bool): Relê a pasta mesmo sem mudança aparente (ex.: um arquivo
+        existente foi sobrescrito).
+
+        Retorno:
+        bool: True se a lista de arquivos mudou.
+        """
+        try:
+            directory_mtime = os.stat(self._directory).st_mtime_ns
+        except OSError:
+            directory_mtime = None
+        if not force and directory_mtime == self._directory_mtime:
+            return False
+        self._directory_mtime = directory_mtime
+
+        entries = {}
+        if directory_mtime is not None:
+            with os.scandir(self._directory) as scanner:
+                for entry in scanner:
+                    if not entry.name.lower().endswith(self._extension):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:  # removido durante a leitura
+                        continue
+                    entries[entry.name] = FolderEntry(
+                        entry.name, stat.st_size, stat.st_mtime
+                    )
+        if entries == self._entries:
+            return False
+        self._entries = entries
+        self._invalidate()
+        return True
+
+    def remove(self, name: str):
+        """
+        Retira um arquivo do retrato sem reler a pasta.
+
+        Parâmetros:
+        name (str): Nome do arquivo removido.
+        """
+        if self._entries.pop(name, None) is not None:
+            self._invalidate()
+
+    def rename(self, name: str, new_name: str):
+        """
+        Renomeia um arquivo no retrato sem reler a pasta.
+
+        Parâmetros:
+        name (str): Nome atual do arquivo.
+        new_name (str): Novo nome, na mesma pasta.
+        """
+        entry = self._entries.pop(name, None)
+        if entry is not None and new_name.lower().endswith(self._extension):
+            self._entries[new_name] = entry._replace(name=new_name)
+        self._invalidate()
+
+    def set_filter(self, query: str) -> bool:
+        """
+        Define o texto usado para filtrar os arquivos pelo nome.
+
+        Parâmetros:
+        query (str): Trecho procurado no nome, sem diferenciar maiúsculas; vazio
+        mostra todos os arquivos.
+
+        Retorno:
+        bool: True se o filtro mudou.
+        """
+        query = query.strip().lower()
+        if query == self._query:
+            return False
+        # Refinar a busca filtra só o resultado anterior
+        if self._filtered is not None and query.startswith(self._query):
+            self._filtered = [
+                entry for entry in self._filtered if query in entry.name.lower()
+            ]
+        else:
+            self._filtered = None
+        self._query = query
+        return True
+
+    def entries(self) -> List[FolderEntry]:
+        """
+        Retorna os arquivos que passam pelo filtro, dos mais recentes para os
+        mais antigos.
+        """
+        if self._filtered is None:
+            if self._ordered is None:
+                self._ordered = sorted(
+                    self._entries.values(), key=lambda entry: (-entry.mtime, entry.name)
+                )
+            self._filtered = [
+                entry for entry in self._ordered if self._query in entry.name.lower()
+            ]
+        return self._filtered
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _invalidate(self):
+        self._ordered = None
+        self._filtered = None
@@ -0,0 +1,126 @@
+import re
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+# Padrões padrão de "Id": (nome, expressão, prioridade). Menor prioridade vence.
+DEFAULT_ID_PATTERNS = [
+    ("cnpj", r"\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}", 10),
+    ("number", r"\d+", 100),
+]
+
+# Padrões prontos que podem ser registrados com IdExtractor.add_pattern
+CPF_PATTERN = r"\d{3}\.\d{3}\.\d{3}-\d{2}"
+BOLETO_PATTERN = r"\d{5}\.\d{5} \d{5}\.\d{6} \d{5}\.\d{6} \d \d{14}"
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - pyarrow é opcional
+    pa = None
+
+
+class IdExtractor:
+    """
+    Extrai o "Id" de cada "Complemento" com uma única expressão regular.
+
+    Os padrões são combinados em uma alternância ancorada no início do texto,
+    na ordem de prioridade: o primeiro padrão encontrado em qualquer posição do
+    texto vence os de prioridade maior. Sem nenhum padrão, o próprio
+    "Complemento" é usado como "Id". Com o pyarrow instalado a expressão roda
+    no RE2 sobre colunas de texto Arrow; sem ele, no módulo re.
+    """
+
+    def __init__(self, patterns: Optional[List[Tuple[str, str, int]]] = None):
+        self._patterns = list(DEFAULT_ID_PATTERNS if patterns is None else patterns)
+        self._compile()
+
+    def _compile(self):
+        ordered = sorted(self._patterns, key=lambda pattern: pattern[2])
+        alternatives = "|".join(
+            f".*?(?P<{name}>{expression})" for name, expression, _ in ordered
+        )
+        # Sintaxe aceita tanto pelo módulo re quanto pelo RE2 do pyarrow
+        self._expression = f"(?s)^(?:{alternatives})"
+        self._regex = re.compile(self._expression)
+        self._names = [name for name, _, _ in ordered]
+        self._group_indexes = [self._regex.groupindex[name] for name in self._names]
+
+    def add_pattern(self, name: str, expression: str, priority: int = 50):
+        """
+        Registra um novo padrão de "Id".
+
+        Parâmetros:
+        name (str): Nome do padrão; deve ser um identificador Python válido.
+        expression (str): Expressão regular do "Id", sem grupos de captura.
+        priority (int): Precedência do padrão. O CNPJ usa 10 e o número
+        genérico 100, então o padrão 50 fica entre os dois.
+        """
+        if not name.isidentifier() or name in self._names:
+            raise ValueError(f"Nome de padrão inválido ou repetido: '{name}'")
+        if re.compile(expression).groups:
+            raise ValueError(
+                f"O padrão '{name}' não pode ter grupos de captura; use (?:...)"
+            )
+        self._patterns.append((name, expression, priority))
+        self._compile()
+
+    def patterns(self) -> List[Tuple[str, str, int]]:
+        """
+        Retorna os padrões registrados como (nome, expressão, prioridade).
+        """
+        return list(self._patterns)
+
+    def extract(self, complemento: pd.Series) -> pd.Series:
+        """
+        Extrai o "Id" de cada linha da coluna "Complemento".
+
+        Parâmetros:
+        complemento (pd.Series): Coluna "Complemento".
+
+        Retorno:
+        pd.Series: Coluna "Id".
+        """
+        if pa is not None:
+            try:
+                return self._extract_arrow(complemento)
+            except (pa.ArrowException, AttributeError, TypeError):
+                pass  # Padrão ou coluna não suportados pelo Arrow; usa o módulo re
+        return self._extract_python(complemento)
+
+    def _extract_arrow(self, complemento):
+        strings = pa.array(complemento, type=pa.string(), from_pandas=True)
+        # Colunas Arrow concatenadas (blocos lidos) chegam em vários pedaços
+        if isinstance(strings, pa.ChunkedArray):
+            strings = strings.combine_chunks()
+        groups = pc.extract_regex(strings, self._expression)
+        # O RE2 devolve "" para as alternativas que não casaram
+        columns = []
+        for name in self._names:
+            column = groups.field(name)
+            columns.append(
+                pc.if_else(pc.equal(column, ""), pa.scalar(None, pa.string()), column)
+            )
+        ids = pc.coalesce(*columns, strings)
+        dtype = complemento.dtype if complemento.dtype != object else "string[pyarrow]"
+        return pd.Series(
+            pd.array(ids, dtype=dtype), index=complemento.index, name=complemento.name
+        )
+
+    def _extract_python(self, complemento):
+        match = self._regex.match
+        group_indexes = self._group_indexes
+        ids = []
+        for text in complemento.tolist():
+            found = match(text) if isinstance(text, str) else None
+            if found is None:
+                ids.append(text)
+                continue
+            for index in group_indexes:
+                value = found.group(index)
+                if value is not None:
+                    ids.append(value)
+                    break
+        return pd.Series(
+            ids, index=complemento.index, name=complemento.name, dtype=object
+        )
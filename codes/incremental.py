@@ -0,0 +1,157 @@
+import sqlite3
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from amounts import cents_to_values
+
+# Categorias persistidas para cada "Id"
+COMPLETED = 0
+LAST_YEAR = 1
+INCOMPLETE = 2
+NEXT_YEAR = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    id TEXT PRIMARY KEY,
+    cents INTEGER NOT NULL,
+    category INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS balances_category ON balances (category, cents);
+CREATE TABLE IF NOT EXISTS next_year_values (
+    cents INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS applied_batches (
+    digest TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TEMP TABLE IF NOT EXISTS touched (id TEXT PRIMARY KEY);
+CREATE TEMP TABLE IF NOT EXISTS new_values (cents INTEGER PRIMARY KEY);
+"""
+
+_CLASSIFY_TOUCHED = f"""
+UPDATE balances SET category = CASE
+    WHEN cents = 0 THEN {COMPLETED}
+    WHEN cents > 0 THEN {LAST_YEAR}
+    WHEN cents IN (SELECT cents FROM next_year_values) THEN {NEXT_YEAR}
+    ELSE {INCOMPLETE}
+END
+WHERE id IN (SELECT id FROM touched)
+"""
+
+# Valores de "Próximo Ano" vistos pela primeira vez reclassificam Ids não tocados
+_CLASSIFY_NEW_VALUES = f"""
+UPDATE balances SET category = {NEXT_YEAR}
+WHERE category = {INCOMPLETE} AND cents IN (SELECT cents FROM new_values)
+"""
+
+
+# "Id" afetados pelo último lote: os tocados e os promovidos a próximo ano
+_TOUCHED_FILTER = f"""
+WHERE id IN (SELECT id FROM touched)
+    OR (category = {NEXT_YEAR} AND cents IN (SELECT cents FROM new_values))
+"""
+
+
+class IncrementalStore:
+    """
+    Estado persistente da conciliação incremental em um banco SQLite.
+
+    Guarda o saldo em centavos e a categoria de cada "Id", além dos valores
+    assinados de "Próximo Ano" já vistos. Cada novo lote de lançamentos atualiza
+    apenas os "Id" presentes no lote; o hash de cada lote aplicado também é
+    guardado, para que o mesmo arquivo não seja somado duas vezes.
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Fecha a conexão com o banco.
+        """
+        self._connection.close()
+
+    def apply(
+        self, totals: pd.Series, next_year_values, digest: Optional[str] = None
+    ) -> int:
+        """
+        Soma os saldos de um lote aos saldos persistidos e reclassifica os "Id"
+        afetados.
+
+        Parâmetros:
+        totals (pd.Series): Soma dos centavos assinados do lote, indexada por "Id".
+        next_year_values: Centavos assinados das linhas de "Próximo Ano" do lote.
+        digest (Optional[str]): Hash do arquivo do lote. Um lote com hash já
+        aplicado é recusado com ValueError, sem alterar o estado.
+
+        Retorno:
+        int: Quantidade de "Id" tocados pelo lote.
+        """
+        ids = totals.index.astype(str).tolist()
+        cents = totals.to_numpy(dtype="int64").tolist()
+        values = np.unique(np.asarray(next_year_values, dtype="int64")).tolist()
+
+        with self._connection as connection:
+            if digest is not None:
+                inserted = connection.execute(
+                    "INSERT OR IGNORE INTO applied_batches (digest) VALUES (?)",
+                    (digest,),
+                )
+                if not inserted.rowcount:
+                    raise ValueError("Lote já aplicado ao estado incremental")
+            connection.execute("DELETE FROM touched")
+            connection.execute("DELETE FROM new_values")
+
+            connection.executemany(
+                "INSERT OR IGNORE INTO new_values (cents) VALUES (?)",
+                ((value,) for value in values),
+            )
+            connection.execute(
+                "DELETE FROM new_values"
+                " WHERE cents IN (SELECT cents FROM next_year_values)"
+            )
+            connection.execute(
+                "INSERT INTO next_year_values SELECT cents FROM new_values"
+            )
+
+            connection.executemany(
+                "INSERT INTO balances (id, cents, category) VALUES (?, ?, -1)"
+                " ON CONFLICT (id) DO UPDATE SET cents = cents + excluded.cents",
+                zip(ids, cents),
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO touched (id) VALUES (?)",
+                ((id_,) for id_ in ids),
+            )
+            connection.execute(_CLASSIFY_TOUCHED)
+            connection.execute(_CLASSIFY_NEW_VALUES)
+        return len(ids)
+
+    def results(self, only_touched: bool = False):
+        """
+        Retorna os saldos persistidos.
+
+        Parâmetros:
+        only_touched (bool): Retorna só os "Id" do último lote aplicado e os
+        reclassificados como próximo ano por ele, em tempo proporcional ao
+        lote; senão, todos os "Id".
+
+        Retorno:
+        Tuple[pd.DataFrame, pd.Series]: Tabela com as colunas "Id", "_cents" e
+        "Resultado" e a máscara dos "Id" classificados como próximo ano.
+        """
+        query = "SELECT id AS Id, cents AS _cents, category FROM balances"
+        if only_touched:
+            query += _TOUCHED_FILTER
+        result = pd.read_sql_query(f"{query} ORDER BY id", self._connection)
+        next_year = result.pop("category") == NEXT_YEAR
+        result["Resultado"] = cents_to_values(result["_cents"])
+        return result, next_year
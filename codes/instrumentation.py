@@ -0,0 +1,183 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+PROFILERS = ("cprofile", "tracemalloc")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Retorna o pico de memória residente do processo atual, em MB, ou None se
+    não for possível medi-lo nesta plataforma.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB e macOS em bytes
+        return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / 1024**2
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Retorna a memória residente atual do processo, em MB, ou None se não for
+    possível medi-la nesta plataforma.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1024**2
+
+
+class RunReport:
+    """
+    Relatório de execução da conciliação de um arquivo.
+
+    Registra o tempo, as linhas de entrada e saída e a memória residente de
+    cada etapa, além de contadores livres (linhas com regex, grupos, pares
+    encontrados, linhas gravadas). Opcionalmente executa o cProfile ou o
+    tracemalloc durante toda a conciliação.
+    """
+
+    def __init__(self, input_file: str, profiler: Optional[str] = None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Profiler desconhecido: '{profiler}'")
+        self._input_file = input_file
+        self._profiler_name = profiler
+        self._profiler = None
+        self._stages = []
+        self._counters: Dict[str, int] = {}
+        self._start = time.perf_counter()
+        self._elapsed = None
+        self._profile = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Mede o tempo e a memória de uma etapa. O registro entregue aceita as
+        linhas de entrada e saída em "rows_in" e "rows_out".
+
+        A memória residente é lida ao fim da etapa ("rss_mb"), com a variação
+        desde o início ("rss_delta_mb"); "process_peak_rss_mb" é o pico do
+        processo até ali, não só da etapa.
+
+        Parâmetros:
+        name (str): Nome da etapa.
+        """
+        record = {"stage": name, "rows_in": None, "rows_out": None}
+        self._stages.append(record)
+        rss_start = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            rss_end = current_rss_mb()
+            record["rss_mb"] = rss_end
+            record["rss_delta_mb"] = (
+                rss_end - rss_start if None not in (rss_start, rss_end) else None
+            )
+            record["process_peak_rss_mb"] = peak_rss_mb()
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Incrementa um contador do relatório.
+
+        Parâmetros:
+        name (str): Nome do contador.
+        amount (int): Valor a somar.
+        """
+        self._counters[name] = self._counters.get(name, 0) + int(amount)
+
+    def start_profiler(self):
+        """
+        Inicia o profiler escolhido na criação do relatório, se houver.
+        """
+        if self._profiler_name == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self._profiler_name == "tracemalloc":
+            tracemalloc.start()
+
+    def stop_profiler(self, profile_path: str):
+        """
+        Encerra o profiler e guarda seus resultados.
+
+        Parâmetros:
+        profile_path (str): Arquivo onde as estatísticas do cProfile são salvas.
+        """
+        self._elapsed = time.perf_counter() - self._start
+        if self._profiler_name == "cprofile" and self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(profile_path)
+            stats = pstats.Stats(self._profiler).sort_stats("cumulative")
+            self._profile = {
+                "stats_file": profile_path,
+                "top": [
+                    {
+                        "function": pstats.func_std_string(function),
+                        "calls": calls,
+                        "cumulative_seconds": cumulative,
+                    }
+                    for function, (_, calls, _, cumulative, _) in sorted(
+                        stats.stats.items(), key=lambda item: -item[1][3]
+                    )[:20]
+                ],
+            }
+        elif self._profiler_name == "tracemalloc" and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:20]
+            tracemalloc.stop()
+            self._profile = {
+                "traced_current_mb": current / 1024**2,
+                "traced_peak_mb": peak / 1024**2,
+                "top": [
+                    {"location": str(stat.traceback), "size_mb": stat.size / 1024**2}
+                    for stat in top
+                ],
+            }
+
+    def to_dict(self) -> Dict:
+        """
+        Retorna o relatório como um dicionário serializável em JSON.
+        """
+        return {
+            "input_file": self._input_file,
+            "seconds": self._elapsed,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self._stages,
+            "counters": self._counters,
+            "profiler": self._profiler_name,
+            "profile": self._profile,
+        }
+
+    def save(self, path: str):
+        """
+        Salva o relatório em JSON.
+
+        Parâmetros:
+        path (str): Caminho do arquivo JSON.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2, ensure_ascii=False)
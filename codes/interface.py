@@ -1,13 +1,34 @@
 import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog
 
+from folder import FolderSnapshot
+
+# Intervalo entre verificações da pasta de resultados, em milissegundos
+FOLDER_POLL_MS = 2000
+# Quantidade máxima de "Id" listados em uma consulta
+QUERY_LIMIT = 500
+
 
 class Interface:
     def __init__(self, root, path):
         self._root = root
         self._action = lambda: None
+        self._cancel_action = lambda: None
+        self._query_action = None
+        self._events = queue.Queue()  # Eventos enviados pela thread de trabalho
+        self._running = False
+        self._anomaly_detection = False
+        self._status_files = []
+        self._file_status = {}
         self._output_folder = path
+        self._snapshot = None
+        self._file_rows = []  # Linhas reaproveitadas da lista de arquivos
+        self._first_file = 0
+        self._startup_tasks = []  # Executadas depois que a janela aparece
         self._bg_color = "#333333"
         self._top_frame_color = "#123524"
         self._button_bg_color = "#123524"
@@ -23,6 +44,7 @@ class Interface:
         self._root.configure(bg=self._bg_color)  # Background escuro para estilo retro
         self._root.resizable(False, True)  # Trava a largura da janela
         self._create_widgets()
+        self._root.bind("<Map>", self._on_first_map, add="+")
 
     def _ensure_result_folder(self):
         result_folder = os.path.join(os.path.dirname(__file__), "..", "result")
@@ -33,6 +55,7 @@ class Interface:
     def _create_widgets(self):
         self._create_top_frame()
         self._create_separator()  # Adiciona a linha preta entre os frames
+        self._create_status_frame()
         self._create_files_frame()
 
     def _create_separator(self):
@@ -45,8 +68,93 @@ class Interface:
             title="Selecione um arquivo CSV",
             filetypes=(("Arquivos CSV", "*.csv"), ("Todos os Arquivos", "*.*")),
         )
-        self._action(files)
-        self._update_folder_view()
+        if not files or self._running:
+            return
+        self._running = True
+        # Lida aqui, no loop do Tk, e consultada pela thread de trabalho
+        self._anomaly_detection = self._anomalies_var.get()
+        self._status_files = []
+        self._file_status = {}
+        self._status_list.delete(0, "end")
+        self.new_button.configure(state="disabled")
+        self._cancel_button.configure(state="normal")
+
+        # Executa a ação fora do loop do Tk; o progresso volta pela fila de eventos
+        worker = threading.Thread(target=self._run_action, args=(files,), daemon=True)
+        worker.start()
+        self._root.after(100, self._poll_events)
+
+    def _run_action(self, files):
+        try:
+            self._action(files)
+        except Exception as e:
+            self._events.put({"event": "failed", "file": None, "error": str(e)})
+        finally:
+            self._events.put({"event": "done", "file": None})
+
+    def _action_cancel(self):
+        self._cancel_button.configure(state="disabled")
+        self._cancel_action()
+
+    def _poll_events(self):
+        finished = False
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if event["event"] == "done":
+                finished = True
+            elif event["event"] == "failed":
+                self._status_list.insert("end", f"Error: {event['error']}")
+            else:
+                self._apply_event(event)
+
+        self._refresh_status()
+        if finished:
+            self._running = False
+            self.new_button.configure(state="normal")
+            self._cancel_button.configure(state="disabled")
+            self._update_folder_view()
+        else:
+            self._root.after(100, self._poll_events)
+
+    def _apply_event(self, event):
+        file = event["file"]
+        if file not in self._file_status:
+            self._status_files.append(file)
+            self._file_status[file] = {"start": time.perf_counter(), "elapsed": None}
+        status = self._file_status[file]
+        if event["event"] == "file_started":
+            status["text"] = "reading"
+        elif event["event"] == "rows_parsed":
+            status["text"] = f"{event['rows']} rows"
+        elif event["event"] == "matched":
+            status["text"] = f"{event['matches']} matched"
+        elif event["event"] == "written":
+            status["text"] = "cached" if event.get("cached") else "written"
+        elif event["event"] == "file_finished":
+            summary = event["summary"]
+            status["text"] = {"ok": "done", "cancelled": "cancelled"}.get(
+                summary["status"], "error"
+            )
+            status["elapsed"] = summary["elapsed"]
+
+    def _refresh_status(self):
+        # Atualiza as linhas de status com o tempo decorrido de cada arquivo
+        now = time.perf_counter()
+        for idx, file in enumerate(self._status_files):
+            status = self._file_status[file]
+            elapsed = status["elapsed"]
+            if elapsed is None:
+                elapsed = now - status["start"]
+            name = os.path.splitext(os.path.basename(file))[0][:20]
+            line = f"{name:<20} {status.get('text', ''):<14} {elapsed:7.1f}s"
+            if idx < self._status_list.size():
+                self._status_list.delete(idx)
+            self._status_list.insert(idx, line)
+        if self._status_files:
+            self._status_list.see("end")
 
     def _open_about(self):
         about_window = tk.Toplevel(self._root)
@@ -93,6 +201,201 @@ class Interface:
         )
         close_button.pack(pady=12)
 
+    def _open_query(self):
+        # Consulta o arquivo selecionado na lista de status ou pede um CSV
+        selection = self._status_list.curselection()
+        if selection and selection[0] < len(self._status_files):
+            file = self._status_files[selection[0]]
+        else:
+            file = filedialog.askopenfilename(
+                title="Selecione um arquivo CSV",
+                filetypes=(("Arquivos CSV", "*.csv"), ("Todos os Arquivos", "*.*")),
+            )
+        if not file:
+            return
+
+        query_window = tk.Toplevel(self._root)
+        query_window.title(f"Query - {os.path.basename(file)}")
+        query_window.geometry("640x480")
+        query_window.configure(bg=self._bg_color)
+        message = tk.Label(
+            query_window,
+            text="Indexing...",
+            bg=self._bg_color,
+            fg=self._label_fg_color,
+            font=("Courier New", 10),
+            anchor="w",
+        )
+        message.pack(fill="x", padx=10, pady=(10, 0))
+
+        # O índice é montado fora do loop do Tk; as consultas depois levam milissegundos
+        built = {}
+
+        def build():
+            start = time.perf_counter()
+            try:
+                built["index"] = self._query_action(file)
+            except Exception as e:
+                built["error"] = str(e)
+            built["elapsed"] = time.perf_counter() - start
+
+        def wait():
+            if not query_window.winfo_exists():
+                return
+            if "elapsed" not in built:
+                query_window.after(100, wait)
+            elif "error" in built:
+                message.configure(text=f"Error: {built['error']}")
+            else:
+                index = built["index"]
+                message.configure(
+                    text=f"{len(index)} Ids indexed in {built['elapsed']:.1f}s"
+                )
+                self._create_query_widgets(query_window, index, message)
+
+        threading.Thread(target=build, daemon=True).start()
+        query_window.after(100, wait)
+
+    def _create_query_widgets(self, query_window, index, message):
+        filters = tk.Frame(query_window, bg=self._bg_color)
+        filters.pack(fill="x", padx=10, pady=5)
+        entries = {}
+        for column, (label, width) in enumerate(
+            [("Id/CNPJ", 20), ("Min", 10), ("Max", 10), ("Hist", 5)]
+        ):
+            tk.Label(
+                filters,
+                text=label,
+                bg=self._bg_color,
+                fg=self._label_fg_color,
+                font=("Courier New", 10),
+            ).grid(row=0, column=column, sticky="w")
+            entry = tk.Entry(
+                filters,
+                width=width,
+                bg=self._label_bg_color,
+                fg=self._label_fg_color,
+                insertbackground=self._label_fg_color,
+                font=("Courier New", 10),
+                relief="flat",
+            )
+            entry.grid(row=1, column=column, padx=(0, 5))
+            entry.bind("<Return>", lambda _: run_query())
+            entries[label] = entry
+
+        category = tk.StringVar(value="All")
+        tk.Label(
+            filters,
+            text="Category",
+            bg=self._bg_color,
+            fg=self._label_fg_color,
+            font=("Courier New", 10),
+        ).grid(row=0, column=4, sticky="w")
+        category_menu = tk.OptionMenu(filters, category, "All", *index.categories())
+        category_menu.configure(
+            bg=self._button_bg_color,
+            fg=self._button_fg_color,
+            font=("Courier New", 10),
+            relief="flat",
+            activebackground=self._button_active_bg_color,
+            highlightthickness=0,
+        )
+        category_menu.grid(row=1, column=4, padx=(0, 5))
+        tk.Button(
+            filters,
+            text="Find",
+            command=lambda: run_query(),
+            bg=self._button_bg_color,
+            fg=self._button_fg_color,
+            font=("Courier New", 10),
+            relief="flat",
+            activebackground=self._button_active_bg_color,
+        ).grid(row=1, column=5)
+
+        # "Id" encontrados e, abaixo, a situação e as linhas do "Id" selecionado
+        lists = []
+        for height in (10, 8):
+            listbox = tk.Listbox(
+                query_window,
+                bg=self._label_bg_color,
+                fg=self._label_fg_color,
+                font=("Courier New", 10),
+                relief="flat",
+                height=height,
+            )
+            listbox.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+            lists.append(listbox)
+        results, details = lists
+        shown = []
+
+        def run_query():
+            hist = entries["Hist"].get().strip()
+            try:
+                found = index.find(
+                    prefix=entries["Id/CNPJ"].get(),
+                    minimum=self._parse_amount(entries["Min"].get()),
+                    maximum=self._parse_amount(entries["Max"].get()),
+                    category=None if category.get() == "All" else category.get(),
+                    hist=int(hist) if hist else None,
+                )
+            except ValueError as e:
+                message.configure(text=f"Error: {e}")
+                return
+            message.configure(
+                text=f"{len(found)} Ids found"
+                + (f" (showing {QUERY_LIMIT})" if len(found) > QUERY_LIMIT else "")
+            )
+            found = found.head(QUERY_LIMIT)
+            shown[:] = list(found["Id"])
+            results.delete(0, "end")
+            details.delete(0, "end")
+            results.insert(
+                "end",
+                *[
+                    f"{id_:<22} {value:>14.2f}  {name}"
+                    for id_, value, name in zip(
+                        found["Id"], found["Resultado"], found["Categoria"]
+                    )
+                ],
+            )
+
+        def show_details(_):
+            selection = results.curselection()
+            if not selection:
+                return
+            id_ = shown[selection[0]]
+            balance = index.balance(id_)
+            lines = index.lines(id_)
+            details.delete(0, "end")
+            details.insert(
+                "end",
+                f"{balance['Id']}: {balance['Resultado']:.2f} ({balance['Categoria']})",
+                f"Match: {balance['Par'] or '-'}",
+                *[
+                    f"{line:>8} {hist:>5} {value:>12.2f}  {text}"
+                    for line, hist, value, text in zip(
+                        lines["Linha"],
+                        lines["Hist"],
+                        lines["Valor"],
+                        lines.get("Complemento", [""] * len(lines)),
+                    )
+                ],
+            )
+
+        results.bind("<<ListboxSelect>>", show_details)
+        entries["Id/CNPJ"].focus_set()
+        run_query()
+
+    @staticmethod
+    def _parse_amount(text):
+        # Aceita "1234.56" e o formato brasileiro "1.234,56"; vazio não filtra
+        text = text.strip()
+        if not text:
+            return None
+        if "," in text:
+            text = text.replace(".", "").replace(",", ".")
+        return float(text)
+
     def _create_top_frame(self):
         top_frame = tk.Frame(self._root, bg=self._top_frame_color)
         top_frame.pack(fill="x")
@@ -147,67 +450,233 @@ class Interface:
         )
         self.about_button.grid(row=0, column=6, pady=0)
 
+    def _create_status_frame(self):
+        status_frame = tk.Frame(self._root, bg=self._bg_color)
+        status_frame.pack(fill="x", padx=10, pady=(10, 0))
+
+        # Lista com o andamento e o tempo decorrido de cada arquivo
+        self._status_list = tk.Listbox(
+            status_frame,
+            bg=self._label_bg_color,
+            fg=self._label_fg_color,
+            font=("Courier New", 10),
+            relief="flat",
+            height=4,
+        )
+        self._status_list.pack(side="left", fill="x", expand=True)
+        buttons_frame = tk.Frame(status_frame, bg=self._bg_color)
+        buttons_frame.pack(side="left", padx=(5, 0))
+
+        # "Cancel" button
+        self._cancel_button = tk.Button(
+            buttons_frame,
+            text="Cancel",
+            command=self._action_cancel,
+            bg=self._button_bg_color,
+            fg=self._button_fg_color,
+            font=("Courier New", 10),
+            relief="flat",
+            activebackground=self._button_active_bg_color,
+            state="disabled",
+        )
+        self._cancel_button.pack(fill="x")
+
+        # "Query" button: consulta o arquivo selecionado na lista (ou um novo)
+        self._query_button = tk.Button(
+            buttons_frame,
+            text="Query",
+            command=self._open_query,
+            bg=self._button_bg_color,
+            fg=self._button_fg_color,
+            font=("Courier New", 10),
+            relief="flat",
+            activebackground=self._button_active_bg_color,
+            state="disabled",
+        )
+        self._query_button.pack(fill="x", pady=(5, 0))
+
+        # Busca por anomalias: desligada por padrão, pois aumenta o tempo de
+        # cada conciliação e acrescenta uma aba ao resultado
+        self._anomalies_var = tk.BooleanVar(value=False)
+        anomalies_check = tk.Checkbutton(
+            buttons_frame,
+            text="Anomalies",
+            variable=self._anomalies_var,
+            bg=self._bg_color,
+            fg=self._label_fg_color,
+            selectcolor=self._label_bg_color,
+            activebackground=self._bg_color,
+            activeforeground=self._label_fg_color,
+            font=("Courier New", 10),
+        )
+        anomalies_check.pack(fill="x", pady=(5, 0))
+
     def _create_files_frame(self):
         form_frame = tk.Frame(self._root, bg=self._bg_color)
         form_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Busca pelo nome dos resultados
+        search_frame = tk.Frame(form_frame, bg=self._bg_color)
+        search_frame.pack(fill="x", pady=(0, 5))
+        self._search_text = tk.StringVar()
+        self._search_text.trace_add("write", lambda *_: self._apply_search())
+        search_entry = tk.Entry(
+            search_frame,
+            textvariable=self._search_text,
+            bg=self._label_bg_color,
+            fg=self._label_fg_color,
+            insertbackground=self._label_fg_color,
+            font=("Courier New", 10),
+            relief="flat",
+        )
+        search_entry.pack(side="left", fill="x", expand=True)
+        self._files_count = tk.Label(
+            search_frame,
+            bg=self._bg_color,
+            fg=self._label_fg_color,
+            font=("Courier New", 10),
+            width=12,
+            anchor="e",
+        )
+        self._files_count.pack(side="left")
+
+        # Lista virtual: só as linhas visíveis existem e são reaproveitadas na rolagem
         self._folder_view = tk.Frame(form_frame, bg=self._label_bg_color)
         self._folder_view.pack(fill="both", expand=True)
+        self._folder_scrollbar = tk.Scrollbar(
+            self._folder_view, orient="vertical", command=self._scroll_folder_view
+        )
+        self._folder_scrollbar.pack(side="right", fill="y")
+        self._rows_frame = tk.Frame(self._folder_view, bg=self._label_bg_color)
+        self._rows_frame.pack(side="left", fill="both", expand=True)
+        self._rows_frame.grid_propagate(False)
+        self._rows_frame.bind("<Configure>", lambda _: self._render_folder_view())
+        self._bind_mouse_wheel(self._rows_frame)
+
+        # A pasta só é lida depois que a janela aparece
+        self._snapshot = FolderSnapshot(self._output_folder, ".xlsx")
+        self.after_startup(self._start_folder_view)
+
+    def _start_folder_view(self):
         self._update_folder_view()
-
-    def _update_folder_view(self):
-        for widget in self._folder_view.winfo_children():
-            widget.destroy()
-        for idx, item in enumerate(os.listdir(self._output_folder)):
-            if item.endswith(".xlsx"):  # Filtrar para mostrar somente .xlsx 
-                item_name = os.path.splitext(item)[0]
-                row = idx
-
-                file_label = tk.Label(
-                    self._folder_view,
-                    text=item_name,
-                    bg=self._label_bg_color,
-                    fg=self._label_fg_color,
-                    font=("Courier New", 12),
-                    width=25,
-                    anchor="w",
-                )
-                file_label.grid(row=row, column=0, padx=5, pady=5, sticky="w")
-
-                open_button = tk.Button(
-                    self._folder_view,
-                    text="Open",
-                    command=lambda item=item: self._open_file(item),
-                    bg=self._button_bg_color,
-                    fg=self._button_fg_color,
-                    font=("Courier New", 10),
-                    relief="flat",
-                    activebackground=self._button_active_bg_color,
-                )
-                open_button.grid(row=row, column=1, padx=5, pady=5)
-
-                rename_button = tk.Button(
-                    self._folder_view,
-                    text="Rename",
-                    command=lambda item=item: self._rename_file(item),
-                    bg=self._button_bg_color,
-                    fg=self._button_fg_color,
-                    font=("Courier New", 10),
-                    relief="flat",
-                    activebackground=self._button_active_bg_color,
-                )
-                rename_button.grid(row=row, column=2, padx=5, pady=5)
-
-                delete_button = tk.Button(
-                    self._folder_view,
-                    text="Delete",
-                    command=lambda item=item: self._delete_file(item),
-                    bg=self._button_bg_color,
-                    fg=self._button_fg_color,
-                    font=("Courier New", 10),
-                    relief="flat",
-                    activebackground=self._button_active_bg_color,
-                )
-                delete_button.grid(row=row, column=3, padx=5, pady=5)
+        self._root.after(FOLDER_POLL_MS, self._poll_folder)
+
+    def _on_first_map(self, event):
+        # Só o primeiro mapeamento da janela principal interessa
+        if event.widget is not self._root or self._startup_tasks is None:
+            return
+        tasks, self._startup_tasks = self._startup_tasks, None
+        # Desenha a janela antes de qualquer tarefa de inicialização
+        self._root.update_idletasks()
+        for func in tasks:
+            self._root.after_idle(func)
+
+    def _update_folder_view(self, force=True):
+        # Relê a pasta (só o que mudou é refeito) e redesenha as linhas visíveis
+        self._snapshot.refresh(force=force)
+        self._render_folder_view()
+
+    def _poll_folder(self):
+        # Acompanha arquivos criados, renomeados ou removidos fora da interface
+        if self._snapshot.refresh():
+            self._render_folder_view()
+        self._root.after(FOLDER_POLL_MS, self._poll_folder)
+
+    def _apply_search(self):
+        if self._snapshot.set_filter(self._search_text.get()):
+            self._first_file = 0
+            self._render_folder_view()
+
+    def _create_file_row(self):
+        row = {"item": None}
+        row["label"] = tk.Label(
+            self._rows_frame,
+            bg=self._label_bg_color,
+            fg=self._label_fg_color,
+            font=("Courier New", 12),
+            width=25,
+            anchor="w",
+        )
+        row["buttons"] = [
+            tk.Button(
+                self._rows_frame,
+                text=text,
+                command=lambda row=row, command=command: command(row["item"]),
+                bg=self._button_bg_color,
+                fg=self._button_fg_color,
+                font=("Courier New", 10),
+                relief="flat",
+                activebackground=self._button_active_bg_color,
+            )
+            for text, command in (
+                ("Open", self._open_file),
+                ("Rename", self._rename_file),
+                ("Delete", self._delete_file),
+            )
+        ]
+        for widget in [row["label"], *row["buttons"]]:
+            self._bind_mouse_wheel(widget)
+        return row
+
+    def _visible_rows(self):
+        # Quantas linhas cabem na altura atual da lista
+        if not self._file_rows:
+            self._file_rows.append(self._create_file_row())
+        row_height = self._file_rows[0]["buttons"][0].winfo_reqheight() + 10
+        return max(1, self._rows_frame.winfo_height() // row_height)
+
+    def _render_folder_view(self):
+        entries = self._snapshot.entries()
+        visible = self._visible_rows()
+        while len(self._file_rows) < visible:
+            self._file_rows.append(self._create_file_row())
+        self._first_file = max(0, min(self._first_file, len(entries) - visible))
+
+        for idx, row in enumerate(self._file_rows):
+            position = self._first_file + idx
+            widgets = [row["label"], *row["buttons"]]
+            if idx >= visible or position >= len(entries):
+                row["item"] = None
+                for widget in widgets:
+                    widget.grid_remove()
+                continue
+            row["item"] = entries[position].name
+            row["label"].configure(text=os.path.splitext(row["item"])[0])
+            row["label"].grid(row=idx, column=0, padx=5, pady=5, sticky="w")
+            for column, button in enumerate(row["buttons"], start=1):
+                button.grid(row=idx, column=column, padx=5, pady=5)
+
+        if entries:
+            self._folder_scrollbar.set(
+                self._first_file / len(entries),
+                min(1.0, (self._first_file + visible) / len(entries)),
+            )
+        else:
+            self._folder_scrollbar.set(0.0, 1.0)
+        self._files_count.configure(text=f"{len(entries)}/{len(self._snapshot)}")
+
+    def _scroll_folder_view(self, action, amount, unit=None):
+        # Recebe os comandos da barra de rolagem ("moveto" ou "scroll")
+        entries = len(self._snapshot.entries())
+        visible = self._visible_rows()
+        if action == "moveto":
+            self._first_file = int(float(amount) * entries)
+        elif unit == "pages":
+            self._first_file += int(amount) * visible
+        else:
+            self._first_file += int(amount)
+        self._render_folder_view()
+
+    def _bind_mouse_wheel(self, widget):
+        widget.bind(
+            "<MouseWheel>",
+            # Só o sentido importa: no macOS o delta vale ±1, no Windows ±120
+            lambda event: self._scroll_folder_view(
+                "scroll", -1 if event.delta > 0 else 1
+            ),
+        )
+        widget.bind("<Button-4>", lambda _: self._scroll_folder_view("scroll", -1))
+        widget.bind("<Button-5>", lambda _: self._scroll_folder_view("scroll", 1))
 
     def _open_file(self, item):
         file_path = os.path.join(self._output_folder, item)
@@ -224,15 +693,25 @@ class Interface:
         if new_name:
             new_name = os.path.splitext(new_name)[0] + ".xlsx"
             os.rename(os.path.join(self._output_folder, item), new_name)
-            self._update_folder_view()
+            if os.path.dirname(os.path.abspath(new_name)) == os.path.abspath(
+                self._output_folder
+            ):
+                self._snapshot.rename(item, os.path.basename(new_name))
+            else:
+                self._snapshot.remove(item)
+            self._render_folder_view()
 
     def _delete_file(self, item):
         os.remove(os.path.join(self._output_folder, item))
-        self._update_folder_view()
+        self._snapshot.remove(item)
+        self._render_folder_view()
 
     def _select_folder(self):
         self._output_folder = filedialog.askdirectory(title="Select a folder")
         if self._output_folder:
+            self._snapshot = FolderSnapshot(self._output_folder, ".xlsx")
+            self._first_file = 0
+            self._snapshot.set_filter(self._search_text.get())
             self._update_folder_view()
 
     def _update_widgets_colors(self):
@@ -248,17 +727,84 @@ class Interface:
                 )
             elif isinstance(widget, tk.Label):
                 widget.configure(bg=self._label_bg_color, fg=self._label_fg_color)
-        self._update_folder_view()
+        # As linhas da lista são recriadas com as novas cores
+        for row in self._file_rows:
+            for widget in [row["label"], *row["buttons"]]:
+                widget.destroy()
+        self._file_rows = []
+        self._rows_frame.configure(bg=self._label_bg_color)
+        self._render_folder_view()
 
     def set_action(self, func):
         """
         Define a função de ação a ser executada quando um novo arquivo é selecionado.
 
+        A função é executada em uma thread separada para não travar a janela;
+        o progresso deve ser informado por meio de report_progress.
+
         Parâmetros:
         func (callable): Função a ser chamada com a lista de arquivos selecionados.
         """
         self._action = func
 
+    def set_query_action(self, func):
+        """
+        Define a função que monta o índice de consulta de um arquivo e ativa o
+        botão "Query".
+
+        A função é executada em uma thread separada e deve retornar um objeto
+        com a interface de query.ResultIndex.
+
+        Parâmetros:
+        func (callable): Função chamada com o caminho do CSV.
+        """
+        self._query_action = func
+        self._query_button.configure(state="normal")
+
+    def after_startup(self, func):
+        """
+        Agenda uma tarefa para logo depois que a janela for exibida pela
+        primeira vez, sem atrasar o seu aparecimento.
+
+        Parâmetros:
+        func (callable): Função sem argumentos, executada no loop do Tk; tarefas
+        demoradas devem apenas iniciar uma thread.
+        """
+        if self._startup_tasks is None:
+            self._root.after_idle(func)
+        else:
+            self._startup_tasks.append(func)
+
+    def set_cancel_action(self, func):
+        """
+        Define a função chamada quando o botão "Cancel" é pressionado.
+
+        Parâmetros:
+        func (callable): Função sem argumentos que interrompe a ação em andamento.
+        """
+        self._cancel_action = func
+
+    def report_progress(self, event):
+        """
+        Registra um evento de progresso da ação em andamento.
+
+        Pode ser chamado de qualquer thread; o evento é exibido pelo loop do Tk.
+
+        Parâmetros:
+        event (dict): Evento com as chaves "event" e "file" e dados adicionais.
+        """
+        self._events.put(event)
+
+    def get_anomaly_detection(self):
+        """
+        Retorna se a busca por anomalias foi marcada para a conciliação em
+        andamento (desmarcada por padrão).
+
+        Retorno:
+        bool: True se a caixa "Anomalies" estava marcada ao iniciar a conciliação.
+        """
+        return self._anomaly_detection
+
     def get_output_folder(self):
         """
         Retorna o caminho da pasta de saída onde os arquivos processados são armazenados.
@@ -1,15 +1,120 @@
+from startup import StartupTimer
+
+# Marca o início antes dos demais imports
+timer = StartupTimer()
+
 import os
-from interface import Interface
-from tools import Conciliation
+import threading
 import tkinter as tk
 
+from interface import Interface
+
+# Histórico dos tempos de inicialização, na pasta de resultados
+STARTUP_LOG = ".startup_times.jsonl"
+# Regras de "Hist" do cliente, opcionais, ao lado da pasta de resultados
+HIST_RULES_FILE = os.path.join(os.path.dirname(__file__), "..", "hist_rules.json")
+
+
+class LazyConciliation:
+    """
+    Cria a Conciliation (e carrega pandas e numpy) só quando ela é usada pela
+    primeira vez, para que a janela apareça sem esperar por essas bibliotecas.
+
+    configure é chamada uma vez, ao criar a Conciliation; prepare, se
+    informada, antes de cada conciliação, com as opções escolhidas na janela.
+    """
+
+    def __init__(self, configure, prepare=None):
+        self._configure = configure
+        self._prepare = prepare
+        self._conciliation = None
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def get(self):
+        """
+        Retorna a Conciliation, criando-a se necessário; se o carregamento em
+        segundo plano estiver em andamento, espera por ele.
+        """
+        with self._lock:
+            if self._conciliation is None:
+                from tools import Conciliation
+
+                conciliation = Conciliation()
+                self._configure(conciliation)
+                self._conciliation = conciliation
+            return self._conciliation
+
+    def preload(self, on_ready=None):
+        """
+        Carrega a Conciliation em uma thread, sem bloquear a janela.
+
+        Parâmetros:
+        on_ready (callable): Chamada, na thread de carregamento, ao terminar.
+        """
+
+        def load():
+            self.get()
+            if on_ready:
+                on_ready()
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def new_conciliation(self, files):
+        self._cancelled = False
+        conciliation = self.get()
+        # Cancelado enquanto as bibliotecas ainda carregavam
+        if self._cancelled:
+            return []
+        if self._prepare:
+            self._prepare(conciliation)
+        return conciliation.new_conciliation(files)
+
+    def query(self, file):
+        return self.get().query(file)
+
+    def cancel(self):
+        self._cancelled = True
+        if self._conciliation is not None:
+            self._conciliation.cancel()
+
 
 if __name__ == "__main__":
+    timer.mark("imports")
     root = tk.Tk()
     interface = Interface(
         root, path=os.path.join(os.path.dirname(__file__), "..", "result")
     )
-    conciliation = Conciliation()
-    conciliation.set_output(interface.get_output_folder())
-    interface.set_action(lambda files: conciliation.new_conciliation(files))
+    timer.mark("window_created")
+
+    def configure(conciliation):
+        conciliation.set_output(interface.get_output_folder())
+        conciliation.set_cache(512 * 1024 * 1024)
+        conciliation.set_parsed_cache(1024 * 1024 * 1024)
+        conciliation.set_progress(interface.report_progress)
+        if os.path.exists(HIST_RULES_FILE):
+            conciliation.set_hist_rules(HIST_RULES_FILE)
+
+    def prepare(conciliation):
+        # A busca por anomalias só roda quando marcada na janela
+        conciliation.set_anomaly_detection(interface.get_anomaly_detection())
+
+    def analytics_ready():
+        timer.mark("analytics_ready")
+        timer.report(os.path.join(interface.get_output_folder(), STARTUP_LOG))
+
+    conciliation = LazyConciliation(configure, prepare)
+    interface.set_action(conciliation.new_conciliation)
+    interface.set_cancel_action(conciliation.cancel)
+    interface.set_query_action(conciliation.query)
+    # A interface desenha a janela no primeiro mapeamento, antes deste evento
+    root.bind(
+        "<Map>",
+        lambda event: event.widget is root and timer.mark("first_paint"),
+        add="+",
+    )
+    # Depois da primeira exibição: a lista de arquivos já foi agendada pela
+    # interface; as bibliotecas de análise carregam em segundo plano
+    interface.after_startup(lambda: timer.mark("folder_listed"))
+    interface.after_startup(lambda: conciliation.preload(analytics_ready))
     root.mainloop()
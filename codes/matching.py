@@ -0,0 +1,152 @@
+import time
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+import numpy as np
+
+# Tipos de agrupamento registrados na aba de pagamentos agrupados
+TOLERANCE = "Tolerância"
+SPLIT = "Parcelado"
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def match_within_tolerance(
+    positive_cents: np.ndarray, negative_cents: np.ndarray, tolerance: int
+) -> List[Tuple[int, int]]:
+    """
+    Pareia um-para-um saldos positivos e negativos cujos módulos diferem no
+    máximo pela tolerância, escolhendo sempre o negativo livre mais próximo.
+
+    Os negativos são ordenados uma vez e cada positivo é localizado por busca
+    binária; os negativos já usados são pulados com ponteiros de "próximo
+    livre" à esquerda e à direita, então o custo total é O(n log n).
+
+    Parâmetros:
+    positive_cents (np.ndarray): Saldos positivos em centavos.
+    negative_cents (np.ndarray): Módulos dos saldos negativos em centavos.
+    tolerance (int): Diferença máxima aceita, em centavos.
+
+    Retorno:
+    List[Tuple[int, int]]: Pares (posição do positivo, posição do negativo).
+    """
+    if len(positive_cents) == 0 or len(negative_cents) == 0:
+        return []
+    negative_order = np.argsort(negative_cents, kind="stable")
+    sorted_negative = negative_cents[negative_order]
+    positive_order = np.argsort(positive_cents, kind="stable")
+    insertion = np.searchsorted(sorted_negative, positive_cents[positive_order])
+
+    size = len(sorted_negative)
+    # right[i]: primeira posição livre >= i (size = nenhuma)
+    # left[i + 1]: última posição livre <= i (0 = nenhuma)
+    right = list(range(size + 1))
+    left = list(range(size + 1))
+
+    def find(links, i):
+        root = i
+        while links[root] != root:
+            root = links[root]
+        while links[i] != root:
+            links[i], i = root, links[i]
+        return root
+
+    pairs = []
+    for position, start in zip(positive_order.tolist(), insertion.tolist()):
+        value = int(positive_cents[position])
+        candidates = []
+        after = find(right, start)
+        if after < size:
+            candidates.append(after)
+        before = find(left, start) - 1
+        if before >= 0:
+            candidates.append(before)
+        if not candidates:
+            break
+        best = min(candidates, key=lambda j: abs(int(sorted_negative[j]) - value))
+        if abs(int(sorted_negative[best]) - value) > tolerance:
+            continue
+        right[best] = best + 1
+        left[best + 1] = best
+        pairs.append((position, int(negative_order[best])))
+    return pairs
+
+
+def match_subsets(
+    target_cents: np.ndarray,
+    part_cents: np.ndarray,
+    max_parts: int,
+    tolerance: int,
+    time_budget: float,
+) -> List[Tuple[int, List[int]]]:
+    """
+    Procura, para cada alvo, de 2 a max_parts parcelas cuja soma é igual ao
+    alvo (dentro da tolerância). Cada parcela é usada no máximo uma vez.
+
+    As parcelas ficam ordenadas, e a busca em profundidade descarta ramos em
+    que a menor parcela restante já estoura o alvo ou em que as maiores não o
+    alcançam; a última parcela é encontrada por busca binária. A busca para
+    quando o tempo limite é atingido e devolve o que já encontrou.
+
+    Parâmetros:
+    target_cents (np.ndarray): Módulos dos saldos a cobrir, em centavos.
+    part_cents (np.ndarray): Módulos dos saldos do lado oposto, em centavos.
+    max_parts (int): Quantidade máxima de parcelas por alvo.
+    tolerance (int): Diferença máxima aceita na soma, em centavos.
+    time_budget (float): Tempo máximo da busca, em segundos.
+
+    Retorno:
+    List[Tuple[int, List[int]]]: Pares (posição do alvo, posições das parcelas).
+    """
+    deadline = time.monotonic() + time_budget
+    part_order = np.argsort(part_cents, kind="stable")
+    values = part_cents[part_order].tolist()
+    indexes = part_order.tolist()
+
+    groups = []
+    try:
+        for target_position in np.argsort(target_cents, kind="stable").tolist():
+            target = int(target_cents[target_position])
+            for parts in range(2, max_parts + 1):
+                found = _search(values, target, parts, tolerance, 0, deadline)
+                if found is not None:
+                    groups.append((target_position, [indexes[i] for i in found]))
+                    for i in sorted(found, reverse=True):
+                        del values[i], indexes[i]
+                    break
+    except _BudgetExceeded:
+        pass
+    return groups
+
+
+def _search(values, target, parts, tolerance, start, deadline):
+    if parts == 1:
+        low = bisect_left(values, target - tolerance, start)
+        high = bisect_right(values, target + tolerance, start)
+        if low == high:
+            return None
+        # Entre as parcelas aceitas, usa a mais próxima do valor restante
+        middle = bisect_left(values, target, low, high)
+        candidates = [i for i in (middle - 1, middle) if low <= i < high]
+        return [min(candidates, key=lambda i: abs(values[i] - target))]
+
+    end = bisect_right(values, target + tolerance, start)
+    if end - start < parts:
+        return None
+    if time.monotonic() > deadline:
+        raise _BudgetExceeded()
+    largest = values[end - 1]
+    for i in range(start, end - parts + 1):
+        value = values[i]
+        if value * parts > target + tolerance:
+            break
+        if value + (parts - 1) * largest < target - tolerance:
+            continue
+        if i > start and value == values[i - 1]:
+            continue
+        rest = _search(values, target - value, parts - 1, tolerance, i + 1, deadline)
+        if rest is not None:
+            return [i] + rest
+    return None
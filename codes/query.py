@@ -0,0 +1,249 @@
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from amounts import cents_to_values
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow é opcional
+    pa = None
+
+CATEGORY_COLUMN = "Categoria"
+LINE_COLUMN = "Linha"
+
+# Categorias na ordem das abas do resultado
+CATEGORIES = [
+    "Ano Passado",
+    "Pagamento Incompleto",
+    "Próximo Ano",
+    "Pagamento Completo",
+    "Pagamentos Agrupados",
+]
+
+_CNPJ_DIGITS = re.compile(r"\d{14}")
+
+
+def normalize_id(text: str) -> str:
+    """
+    Prepara um "Id" digitado para a busca: CNPJ só com dígitos
+    (ex.: "12345678000190") ganha a máscara "12.345.678/0001-90".
+    """
+    text = text.strip()
+    if _CNPJ_DIGITS.fullmatch(text):
+        return f"{text[:2]}.{text[2:5]}.{text[5:8]}/{text[8:12]}-{text[12:]}"
+    return text
+
+
+def _contiguous(column: pd.Series) -> pd.Series:
+    # Texto Arrow lido em blocos fica em pedaços, e buscar poucas linhas
+    # percorre todos eles; juntá-los uma vez deixa cada busca proporcional ao
+    # número de linhas retornadas
+    if pa is None or not isinstance(column.array, pd.arrays.ArrowStringArray):
+        return column
+    array = pa.array(column.array)
+    if not isinstance(array, pa.ChunkedArray) or array.num_chunks <= 1:
+        return column
+    combined = array.combine_chunks()
+    return pd.Series(pd.array(combined, dtype=column.dtype), index=column.index)
+
+
+class ResultIndex:
+    """
+    Índice de consulta sobre os resultados de uma conciliação.
+
+    Os saldos ficam na ordem dos códigos da categoria "Id" (que é a ordem
+    alfabética), e as linhas do razão são agrupadas por "Id" e por "Hist" com
+    uma ordenação estável feita uma única vez: as linhas de um "Id" são uma
+    fatia contínua dessa ordem, localizada por deslocamentos pré-calculados.
+    Assim cada consulta custa milissegundos, mesmo com milhões de linhas.
+    """
+
+    def __init__(
+        self,
+        lines: pd.DataFrame,
+        balances: pd.DataFrame,
+        partners: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Parâmetros:
+        lines (pd.DataFrame): Linhas lidas, na ordem do arquivo, com "Id"
+        categórico, "Hist", "Valor" e, se disponível, "Complemento". Linhas
+        sem "Id" não são consultáveis.
+        balances (pd.DataFrame): Resultados por "Id" com "_cents" e "Categoria".
+        partners (Optional[Dict[str, str]]): "Id" do par ou grupo de cada "Id"
+        pareado (ex.: "Semelhante: 123").
+        """
+        ids = lines["Id"].cat
+        # Textos em um array simples: a busca binária não passa pelo pandas
+        self._ids = ids.categories.to_numpy(dtype=object)
+        codes = ids.codes.to_numpy()
+        columns = [
+            column for column in ("Hist", "Valor", "Complemento") if column in lines
+        ]
+        self._lines = lines[columns]
+        if "Complemento" in self._lines:
+            self._lines["Complemento"] = _contiguous(self._lines["Complemento"])
+
+        # Linhas sem "Id" (código -1, "Complemento" vazio) ficam fora dos índices
+        with_id = np.flatnonzero(codes >= 0)
+
+        # Deslocamentos: as linhas do "Id" de código c são
+        # self._id_order[self._id_offsets[c]:self._id_offsets[c + 1]]
+        self._id_order = with_id[np.argsort(codes[with_id], kind="stable")]
+        self._id_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(codes[with_id], minlength=len(self._ids)))]
+        )
+        self._hist = lines["Hist"].to_numpy()
+        self._hist_order = with_id[np.argsort(self._hist[with_id], kind="stable")]
+        self._sorted_hist = self._hist[self._hist_order]
+        self._codes = codes
+
+        balances = balances.set_index("Id").reindex(ids.categories)
+        self._cents = balances["_cents"].fillna(0).to_numpy(dtype="int64")
+        self._categories = pd.Categorical(
+            balances[CATEGORY_COLUMN], categories=CATEGORIES
+        ).codes
+        self._partners = dict(partners or {})
+
+    def categories(self) -> List[str]:
+        """
+        Retorna os nomes das categorias aceitos por find.
+        """
+        return list(CATEGORIES)
+
+    def ids(self, prefix: str = "", limit: Optional[int] = None) -> List[str]:
+        """
+        Retorna os "Id" que começam com o texto, em ordem alfabética.
+
+        Parâmetros:
+        prefix (str): Início do "Id" (CNPJ só com dígitos também é aceito).
+        limit (Optional[int]): Quantidade máxima de resultados.
+        """
+        start, stop = self._prefix_range(normalize_id(prefix))
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return list(self._ids[start:stop])
+
+    def balance(self, id_: str) -> Optional[Dict]:
+        """
+        Explica a situação de um "Id".
+
+        Parâmetros:
+        id_ (str): O "Id" ou o CNPJ só com dígitos.
+
+        Retorno:
+        Optional[Dict]: "Id", "Resultado", "Categoria", "Linhas" (quantidade) e
+        "Par" (o "Id" pareado ou o grupo, se houver), ou None se o "Id" não
+        existe.
+        """
+        code = self._code(id_)
+        if code is None:
+            return None
+        category = self._categories[code]
+        return {
+            "Id": self._ids[code],
+            "Resultado": float(cents_to_values(self._cents[code])),
+            CATEGORY_COLUMN: CATEGORIES[category] if category >= 0 else None,
+            "Linhas": int(self._id_offsets[code + 1] - self._id_offsets[code]),
+            "Par": self._partners.get(self._ids[code]),
+        }
+
+    def lines(self, id_: str, hist: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Retorna as linhas do razão de um "Id", na ordem do arquivo.
+
+        Parâmetros:
+        id_ (str): O "Id" ou o CNPJ só com dígitos.
+        hist (Optional[int]): Mantém só as linhas com este código "Hist".
+
+        Retorno:
+        Optional[pd.DataFrame]: "Linha" (1 = primeiro lançamento após o
+        cabeçalho), "Hist", "Valor" e "Complemento" (quando disponível), ou None
+        se o "Id" não existe.
+        """
+        code = self._code(id_)
+        if code is None:
+            return None
+        rows = self._id_order[self._id_offsets[code] : self._id_offsets[code + 1]]
+        if hist is not None:
+            rows = rows[self._hist[rows] == hist]
+        lines = self._lines.take(rows).reset_index(drop=True)
+        lines.insert(0, LINE_COLUMN, rows + 1)
+        return lines
+
+    def find(
+        self,
+        prefix: str = "",
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+        category: Optional[str] = None,
+        hist: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Busca os "Id" que atendem a todos os filtros informados.
+
+        Parâmetros:
+        prefix (str): Início do "Id" (CNPJ só com dígitos também é aceito).
+        minimum (Optional[float]): Menor "Resultado", em reais.
+        maximum (Optional[float]): Maior "Resultado", em reais.
+        category (Optional[str]): Uma das CATEGORIES.
+        hist (Optional[int]): Só os "Id" com alguma linha deste código "Hist".
+        limit (Optional[int]): Quantidade máxima de resultados.
+
+        Retorno:
+        pd.DataFrame: "Id", "Resultado", "Categoria" e "Linhas", em ordem de "Id".
+        """
+        start, stop = self._prefix_range(normalize_id(prefix))
+        mask = np.zeros(len(self._ids), dtype=bool)
+        mask[start:stop] = True
+        if minimum is not None:
+            mask &= self._cents >= round(minimum * 100)
+        if maximum is not None:
+            mask &= self._cents <= round(maximum * 100)
+        if category is not None:
+            if category not in CATEGORIES:
+                raise ValueError(f"Categoria desconhecida: '{category}'")
+            mask &= self._categories == CATEGORIES.index(category)
+        if hist is not None:
+            left = np.searchsorted(self._sorted_hist, hist, side="left")
+            right = np.searchsorted(self._sorted_hist, hist, side="right")
+            with_hist = np.zeros(len(self._ids), dtype=bool)
+            with_hist[self._codes[self._hist_order[left:right]]] = True
+            mask &= with_hist
+
+        codes = np.flatnonzero(mask)
+        if limit is not None:
+            codes = codes[:limit]
+        categories = self._categories[codes]
+        return pd.DataFrame(
+            {
+                "Id": self._ids.take(codes),
+                "Resultado": cents_to_values(self._cents[codes]),
+                CATEGORY_COLUMN: pd.Categorical.from_codes(
+                    categories, categories=CATEGORIES
+                ),
+                "Linhas": np.diff(self._id_offsets)[codes],
+            }
+        )
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _code(self, id_):
+        # Posição exata do "Id" entre as categorias ordenadas
+        id_ = normalize_id(id_)
+        code = np.searchsorted(self._ids, id_)
+        if code < len(self._ids) and self._ids[code] == id_:
+            return int(code)
+        return None
+
+    def _prefix_range(self, prefix):
+        # Os "Id" com o prefixo formam uma faixa contínua das categorias ordenadas
+        if not prefix:
+            return 0, len(self._ids)
+        start, stop = np.searchsorted(self._ids, [prefix, prefix + "\U0010ffff"])
+        return int(start), int(stop)
@@ -0,0 +1,331 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Categorias de um código "Hist"
+REGULAR = "regular"  # entra no saldo, sem aba própria
+NEXT_YEAR = "next_year"  # entra no saldo e marca valores de "Próximo Ano"
+OTHER = "other"  # entra no saldo e é listado na aba de "Hist" diferente
+
+# Códigos numéricos das categorias após a compilação; os baldes (abas
+# personalizadas) recebem os códigos seguintes, na ordem em que aparecem
+REGULAR_KIND = 0
+NEXT_YEAR_KIND = 1
+OTHER_KIND = 2
+_FIRST_BUCKET_KIND = 3
+
+# Regras usadas quando nenhum arquivo é informado
+DEFAULT_HIST_RULES = {
+    "default_sign": 1,
+    "rules": [
+        {"hist": 20, "sign": -1, "category": NEXT_YEAR},
+        {"hist": 133, "sign": 1, "category": REGULAR},
+    ],
+}
+
+# Abas do resultado que um balde não pode substituir
+RESERVED_SHEETS = (
+    "Ano Passado",
+    "Pagamento Incompleto",
+    "Próximo Ano",
+    "Pagamento Completo",
+    "Pagamentos Agrupados",
+    "Anomalias",
+    "Planilha Limpa",
+    "Saldos por Período",
+    "Transporte entre Períodos",
+)
+
+_RULE_KEYS = {"hist", "sign", "category", "bucket"}
+_INVALID_SHEET_CHARACTERS = set("[]:*?/\\")
+_MAX_SHEET_NAME = 31  # limite do Excel
+_MAX_RANGE = 100_000
+_MAX_DENSE_SPAN = 1 << 16
+
+
+class HistRules:
+    """
+    Regras que definem, para cada código "Hist", o sinal do "Valor" e a
+    categoria da linha.
+
+    As regras são declaradas em JSON, por exemplo:
+
+        {
+          "default_sign": 1,
+          "other_sheet": "Hist Diferente",
+          "rules": [
+            {"hist": 20, "sign": -1, "category": "next_year"},
+            {"hist": [133, 134], "sign": 1},
+            {"hist": {"from": 900, "to": 999}, "sign": -1, "bucket": "Estornos"}
+          ]
+        }
+
+    "category" é "regular" (padrão), "next_year" ou "other"; "bucket" lista
+    as linhas do código em uma aba própria, no lugar da aba de "Hist"
+    diferente. Códigos sem regra usam "default_sign" e são "other". As regras
+    são compiladas uma vez em tabelas ordenadas, e cada bloco de linhas é
+    classificado com uma única busca binária, qualquer que seja o número de
+    regras.
+    """
+
+    def __init__(
+        self,
+        signs: Dict[int, int],
+        categories: Dict[int, str],
+        buckets: Optional[Dict[int, str]] = None,
+        default_sign: int = 1,
+        other_sheet: Optional[str] = None,
+    ):
+        """
+        Parâmetros:
+        signs (Dict[int, int]): Sinal (-1 ou 1) de cada código.
+        categories (Dict[int, str]): Categoria de cada código (REGULAR,
+        NEXT_YEAR ou OTHER).
+        buckets (Optional[Dict[int, str]]): Aba própria de cada código.
+        default_sign (int): Sinal dos códigos sem sinal definido.
+        other_sheet (Optional[str]): Nome da aba de "Hist" diferente; por
+        padrão, "Hist Diferente de" seguido dos códigos com categoria.
+        """
+        buckets = dict(buckets or {})
+        for sign in [*signs.values(), default_sign]:
+            if sign not in (-1, 1):
+                raise ValueError(f"Sinal inválido: {sign} (use -1 ou 1)")
+        for category in categories.values():
+            if category not in (REGULAR, NEXT_YEAR, OTHER):
+                raise ValueError(f"Categoria de \"Hist\" desconhecida: '{category}'")
+        overlap = set(categories) & set(buckets)
+        if overlap:
+            raise ValueError(f"Códigos com categoria e balde: {sorted(overlap)}")
+
+        self._signs = {int(hist): int(sign) for hist, sign in signs.items()}
+        self._categories = {
+            int(hist): category for hist, category in categories.items()
+        }
+        self._buckets = {int(hist): bucket for hist, bucket in buckets.items()}
+        self._default_sign = int(default_sign)
+        self._other_sheet = other_sheet or self._default_other_sheet()
+        self._bucket_names = list(dict.fromkeys(self._buckets.values()))
+        for name in [self._other_sheet, *self._bucket_names]:
+            _check_sheet_name(name)
+        if self._other_sheet in self._bucket_names:
+            raise ValueError(
+                f"Balde com o nome da aba de \"Hist\" diferente: '{self._other_sheet}'"
+            )
+        self._compile()
+
+    @classmethod
+    def default(cls) -> "HistRules":
+        """
+        Retorna as regras padrão: "Hist" 20 negativo e de "Próximo Ano", "Hist"
+        133 positivo e os demais códigos listados em "Hist Diferente de 20 e 133".
+        """
+        return cls.from_dict(DEFAULT_HIST_RULES)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HistRules":
+        """
+        Cria as regras a partir do conteúdo de um arquivo de regras (ver a
+        documentação da classe).
+        """
+        unknown = set(data) - {"default_sign", "other_sheet", "rules"}
+        if unknown:
+            raise ValueError(f"Chaves desconhecidas nas regras: {sorted(unknown)}")
+        signs, categories, buckets = {}, {}, {}
+        for rule in data.get("rules", []):
+            unknown = set(rule) - _RULE_KEYS
+            if unknown or "hist" not in rule:
+                raise ValueError(f"Regra inválida: {rule}")
+            for hist in _expand_codes(rule["hist"]):
+                if hist in signs or hist in categories or hist in buckets:
+                    raise ValueError(f"Código \"Hist\" repetido nas regras: {hist}")
+                if "sign" in rule:
+                    signs[hist] = rule["sign"]
+                if "bucket" in rule:
+                    if "category" in rule:
+                        raise ValueError(f"Regra com categoria e balde: {rule}")
+                    buckets[hist] = rule["bucket"]
+                else:
+                    categories[hist] = rule.get("category", REGULAR)
+        return cls(
+            signs,
+            categories,
+            buckets,
+            data.get("default_sign", 1),
+            data.get("other_sheet"),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HistRules":
+        """
+        Lê as regras de um arquivo JSON.
+
+        Parâmetros:
+        path (str): Caminho do arquivo de regras.
+
+        Retorno:
+        HistRules: As regras compiladas.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls.from_dict(json.load(file))
+
+    def to_dict(self) -> Dict:
+        """
+        Retorna as regras no formato do arquivo, com um código por regra e em
+        ordem de código (serve de chave estável para o cache de resultados).
+        """
+        rules = []
+        for hist in self._codes.tolist():
+            rule = {"hist": hist}
+            if hist in self._signs:
+                rule["sign"] = self._signs[hist]
+            if hist in self._buckets:
+                rule["bucket"] = self._buckets[hist]
+            else:
+                rule["category"] = self._categories.get(hist, OTHER)
+            rules.append(rule)
+        return {
+            "default_sign": self._default_sign,
+            "other_sheet": self._other_sheet,
+            "rules": rules,
+        }
+
+    def with_signs(self, hist_signs: Dict[int, int]) -> "HistRules":
+        """
+        Retorna uma cópia das regras com a tabela de sinais substituída: os
+        códigos fora de hist_signs mantêm o "Valor" original.
+        """
+        return HistRules(
+            hist_signs, self._categories, self._buckets, 1, self._other_sheet
+        )
+
+    def signs(self) -> Dict[int, int]:
+        """
+        Retorna o sinal de cada código com sinal definido.
+        """
+        return dict(self._signs)
+
+    def classify(self, hist) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classifica um bloco de linhas.
+
+        Parâmetros:
+        hist: Coluna "Hist" do bloco (valores ausentes usam o sinal padrão e
+        são "other").
+
+        Retorno:
+        Tuple[np.ndarray, np.ndarray]: A categoria compilada (REGULAR_KIND,
+        NEXT_YEAR_KIND, OTHER_KIND ou um balde; int8) e o sinal (int64) de cada
+        linha.
+        """
+        values = np.asarray(hist)
+        missing = len(self._codes)  # posição das tabelas para códigos sem regra
+        if values.dtype.kind in "iu" and self._dense_positions is not None:
+            # Códigos inteiros em uma faixa curta: leitura direta da tabela
+            offset = values.astype("int64") - self._lowest_code
+            inside = (offset >= 0) & (offset < len(self._dense_positions))
+            position = self._dense_positions[np.where(inside, offset, 0)]
+            position[~inside] = missing
+        elif missing:
+            # Demais casos (ex.: "Hist" com valores ausentes): busca binária
+            values = values.astype("float64")
+            position = np.searchsorted(self._sorted_codes, values)
+            found = self._sorted_codes[np.minimum(position, missing - 1)] == values
+            position[~found] = missing
+        else:
+            position = np.zeros(len(values), dtype="int64")
+        return self._kind_table[position], self._sign_table[position]
+
+    def listed_sheets(self) -> Dict[int, str]:
+        """
+        Retorna as abas de linhas listadas por código compilado: a de "Hist"
+        diferente e a de cada balde.
+        """
+        sheets = {OTHER_KIND: self._other_sheet}
+        for offset, name in enumerate(self._bucket_names):
+            sheets[_FIRST_BUCKET_KIND + offset] = name
+        return sheets
+
+    def _compile(self):
+        # Tabelas alinhadas aos códigos ordenados: sinal e categoria compilada
+        kind_of_category = {
+            REGULAR: REGULAR_KIND,
+            NEXT_YEAR: NEXT_YEAR_KIND,
+            OTHER: OTHER_KIND,
+        }
+        bucket_kind = {
+            name: _FIRST_BUCKET_KIND + offset
+            for offset, name in enumerate(self._bucket_names)
+        }
+        self._codes = np.array(
+            sorted(set(self._signs) | set(self._categories) | set(self._buckets)),
+            dtype="int64",
+        )
+        self._sorted_codes = self._codes.astype("float64")
+        # Tabelas alinhadas aos códigos, com uma posição final para os códigos
+        # sem regra
+        self._sign_table = np.array(
+            [self._signs.get(hist, self._default_sign) for hist in self._codes.tolist()]
+            + [self._default_sign],
+            dtype="int64",
+        )
+        self._kind_table = np.array(
+            [
+                bucket_kind[self._buckets[hist]]
+                if hist in self._buckets
+                else kind_of_category[self._categories.get(hist, OTHER)]
+                for hist in self._codes.tolist()
+            ]
+            + [OTHER_KIND],
+            dtype="int8",
+        )
+        # Posição de cada código da faixa [menor, maior], quando ela é curta
+        self._dense_positions = None
+        self._lowest_code = None
+        if len(self._codes) and self._codes[-1] - self._codes[0] < _MAX_DENSE_SPAN:
+            self._lowest_code = int(self._codes[0])
+            self._dense_positions = np.full(
+                int(self._codes[-1]) - self._lowest_code + 1,
+                len(self._codes),
+                dtype="int64",
+            )
+            self._dense_positions[self._codes - self._lowest_code] = np.arange(
+                len(self._codes)
+            )
+
+    def _default_other_sheet(self):
+        # "Hist Diferente de 20 e 133": os códigos que não são listados
+        codes = sorted(
+            hist for hist, category in self._categories.items() if category != OTHER
+        )
+        if not codes:
+            return "Hist Diferente"
+        names = [str(hist) for hist in codes]
+        joined = names[-1]
+        if len(names) > 1:
+            joined = f"{', '.join(names[:-1])} e {joined}"
+        name = f"Hist Diferente de {joined}"
+        return name if len(name) <= _MAX_SHEET_NAME else "Hist Diferente"
+
+
+def _expand_codes(value) -> List[int]:
+    # Aceita um código, uma lista de códigos ou um intervalo {"from": a, "to": b}
+    if isinstance(value, dict):
+        if set(value) != {"from", "to"}:
+            raise ValueError(f"Intervalo de \"Hist\" inválido: {value}")
+        start, stop = int(value["from"]), int(value["to"])
+        if stop < start or stop - start >= _MAX_RANGE:
+            raise ValueError(f"Intervalo de \"Hist\" inválido: {value}")
+        return list(range(start, stop + 1))
+    if isinstance(value, list):
+        return [int(hist) for hist in value]
+    return [int(value)]
+
+
+def _check_sheet_name(name):
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError(f"Nome de aba inválido: {name!r}")
+    if len(name) > _MAX_SHEET_NAME or _INVALID_SHEET_CHARACTERS & set(name):
+        raise ValueError(f"Nome de aba inválido para o Excel: '{name}'")
+    if name in RESERVED_SHEETS:
+        raise ValueError(f"Nome de aba reservado: '{name}'")
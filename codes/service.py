@@ -0,0 +1,536 @@
+import argparse
+import io
+import itertools
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from rules import HistRules
+from tools import Conciliation
+
+# Estados de um trabalho
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+
+# Tempo padrão, em segundos, que um trabalho encerrado e seus arquivos são mantidos
+DEFAULT_RETENTION = 24 * 60 * 60
+
+# Nomes das configurações aceitas em cada trabalho; cada uma é convertida e
+# aplicada à Conciliation em ConciliationService._configured_conciliation
+JOB_SETTINGS = (
+    "output_format",
+    "chunk_size",
+    "hist_signs",
+    "hist_rules",
+    "matching",
+    "anomalies",
+    "id_patterns",
+)
+
+
+def _warm_up():
+    # Carrega as bibliotecas e compila os padrões antes do primeiro trabalho
+    import xlsxwriter  # noqa: F401
+
+    Conciliation()
+    return os.getpid()
+
+
+class Job:
+    """
+    Um pedido de conciliação de um arquivo recebido pelo serviço.
+    """
+
+    def __init__(self, file: str, priority: int, settings: Dict, output_root: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.file = file
+        self.priority = priority
+        self.settings = settings
+        self.output_path = os.path.join(output_root, self.id)
+        # Conciliação já configurada e pasta do CSV enviado, se houver
+        self.conciliation = None
+        self.upload = None
+        self.status = QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.summary = None
+
+    def to_dict(self) -> Dict:
+        """
+        Retorna o estado do trabalho, com os tempos de fila e de execução e,
+        ao terminar, o resumo e o tempo de cada etapa.
+        """
+        now = time.time()
+        started = self.started or (now if self.status == QUEUED else self.finished)
+        data = {
+            "id": self.id,
+            "file": self.file,
+            "priority": self.priority,
+            "status": self.status,
+            "submitted": self.submitted,
+            "queued_seconds": started - self.submitted,
+            "run_seconds": (
+                (self.finished or now) - self.started if self.started else None
+            ),
+        }
+        if self.summary is not None:
+            report = self.summary.get("report") or {}
+            data.update(
+                {
+                    "result": self.summary["status"],
+                    "output": self.summary["output"],
+                    "error": self.summary["error"],
+                    "stages": report.get("stages"),
+                    "counters": report.get("counters"),
+                }
+            )
+        return data
+
+
+class ConciliationService:
+    """
+    Fila de conciliações atendida por processos mantidos aquecidos.
+
+    Os processos são criados e preparados uma única vez, na inicialização, e
+    reaproveitados por todos os trabalhos; a fila libera primeiro os trabalhos
+    de maior prioridade e, entre iguais, os mais antigos. Cada trabalho grava
+    o resultado em uma pasta própria, e os caches de resultados e de razões
+    lidos são compartilhados entre todos. Se um processo for encerrado (ex.:
+    falta de memória), os processos são recriados para os próximos trabalhos.
+    Trabalhos encerrados há mais que o tempo de retenção são esquecidos, com
+    o resultado e o CSV enviado.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        workers: int,
+        cache_size: Optional[int] = None,
+        parsed_cache_size: Optional[int] = None,
+        retention: float = DEFAULT_RETENTION,
+    ):
+        self._output_path = os.path.abspath(output_path)
+        self._uploads = os.path.join(self._output_path, "uploads")
+        self._cache_size = cache_size
+        self._parsed_cache_size = parsed_cache_size
+        self._workers = max(1, int(workers))
+        self._retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._slots = threading.Semaphore(self._workers)
+        os.makedirs(self._uploads, exist_ok=True)
+
+        self._executor, warm = self._start_pool()
+        for future in warm:
+            future.result()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(
+        self,
+        file: str,
+        priority: int = 0,
+        settings: Optional[Dict] = None,
+    ) -> Job:
+        """
+        Coloca um arquivo na fila.
+
+        Parâmetros:
+        file (str): Caminho do CSV, acessível pelo serviço.
+        priority (int): Trabalhos de prioridade maior são executados antes.
+        settings (Optional[Dict]): Configurações do trabalho (ver JOB_SETTINGS):
+        "output_format", "chunk_size", "hist_signs" ({código: sinal}),
+        "hist_rules" (o conteúdo de um arquivo de regras, ver rules.HistRules),
+        "matching" ([tolerância em centavos, parcelas]), "anomalies" (true ou
+        [tolerância em centavos, escore, linhas mínimas]) e "id_patterns"
+        ([[nome, expressão, prioridade], ...]).
+
+        Retorno:
+        Job: O trabalho criado.
+        """
+        if not os.path.isfile(file):
+            raise ValueError(f"Arquivo não encontrado: '{file}'")
+        settings = dict(settings or {})
+        unknown = set(settings) - set(JOB_SETTINGS)
+        if unknown:
+            raise ValueError(f"Configurações desconhecidas: {sorted(unknown)}")
+        job = Job(os.path.abspath(file), int(priority), settings, self._output_path)
+        # Valida as configurações antes de aceitar o trabalho
+        job.conciliation = self._configured_conciliation(job)
+        self._expire()
+        with self._lock:
+            self._jobs[job.id] = job
+        self._queue.put((-job.priority, next(self._order), job))
+        return job
+
+    def submit_upload(
+        self, name: str, content: bytes, priority: int = 0, settings=None
+    ) -> Job:
+        """
+        Guarda um CSV enviado ao serviço e o coloca na fila.
+
+        Parâmetros:
+        name (str): Nome do arquivo enviado; define o nome do resultado.
+        content (bytes): Conteúdo do CSV.
+        priority (int): Ver submit.
+        settings: Ver submit.
+
+        Retorno:
+        Job: O trabalho criado.
+        """
+        name = os.path.basename(name) or "upload.csv"
+        folder = os.path.join(self._uploads, uuid.uuid4().hex[:12])
+        os.makedirs(folder)
+        path = os.path.join(folder, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        try:
+            job = self.submit(path, priority, settings)
+        except Exception:
+            shutil.rmtree(folder, ignore_errors=True)
+            raise
+        job.upload = folder
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancela um trabalho que ainda está na fila.
+
+        Retorno:
+        bool: False se o trabalho já começou ou terminou.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.status != QUEUED:
+                return False
+            job.status = CANCELLED
+            job.finished = time.time()
+            return True
+
+    def job(self, job_id: str) -> Job:
+        """
+        Retorna um trabalho pelo identificador (KeyError se não existir).
+        """
+        with self._lock:
+            return self._jobs[job_id]
+
+    def jobs(self) -> List[Job]:
+        """
+        Retorna todos os trabalhos, do mais antigo ao mais recente.
+        """
+        self._expire()
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted)
+
+    def health(self) -> Dict:
+        """
+        Retorna o número de processos e de trabalhos em cada estado.
+        """
+        counts = {QUEUED: 0, RUNNING: 0, FINISHED: 0, CANCELLED: 0}
+        for job in self.jobs():
+            counts[job.status] += 1
+        return {"workers": self._workers, **counts}
+
+    def close(self):
+        """
+        Encerra o despacho e os processos depois dos trabalhos em execução; os
+        trabalhos ainda na fila são cancelados.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    job.status = CANCELLED
+                    job.finished = time.time()
+        self._queue.put((float("-inf"), -1, None))
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _start_pool(self):
+        # Cria os processos e os prepara; retorna o executor e os futuros do preparo
+        executor = ProcessPoolExecutor(max_workers=self._workers)
+        return executor, [executor.submit(_warm_up) for _ in range(self._workers)]
+
+    def _restart_pool(self, broken):
+        # Um processo encerrado quebra o executor inteiro; o primeiro trabalho a
+        # perceber cria outro, e os seguintes já encontram o novo
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor, _ = self._start_pool()
+        broken.shutdown(wait=False)
+
+    def _expire(self):
+        # Esquece os trabalhos encerrados há mais que o tempo de retenção e
+        # remove o resultado e o CSV enviado de cada um
+        limit = time.time() - self._retention
+        with self._lock:
+            expired = [
+                job
+                for job in self._jobs.values()
+                if job.status in (FINISHED, CANCELLED) and job.finished < limit
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.output_path, ignore_errors=True)
+            if job.upload:
+                shutil.rmtree(job.upload, ignore_errors=True)
+
+    def _configured_conciliation(self, job):
+        conciliation = Conciliation()
+        conciliation.set_output(job.output_path)
+        conciliation.set_cache(self._cache_size)
+        conciliation.set_parsed_cache(self._parsed_cache_size)
+        conciliation.set_cache_directory(self._output_path)
+        conciliation.set_instrumentation(True)
+        settings = job.settings
+        if "output_format" in settings:
+            conciliation.set_output_format(settings["output_format"])
+        if "chunk_size" in settings:
+            conciliation.set_chunk_size(settings["chunk_size"])
+        if "hist_rules" in settings:
+            conciliation.set_hist_rules(HistRules.from_dict(settings["hist_rules"]))
+        if "hist_signs" in settings:
+            conciliation.set_hist_signs(
+                {int(hist): int(sign) for hist, sign in settings["hist_signs"].items()}
+            )
+        if "matching" in settings:
+            conciliation.set_matching(*settings["matching"])
+        anomalies = settings.get("anomalies")
+        if anomalies:
+            conciliation.set_anomaly_detection(
+                True, *([] if anomalies is True else anomalies)
+            )
+        for name, expression, priority in settings.get("id_patterns", []):
+            conciliation.add_id_pattern(name, expression, priority)
+        return conciliation
+
+    def _dispatch(self):
+        # Envia os trabalhos aos processos na ordem de prioridade, um por
+        # processo livre, para que a fila (e não o executor) decida a ordem
+        while True:
+            self._slots.acquire()
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                if job.status != QUEUED:
+                    self._slots.release()
+                    continue
+                job.status = RUNNING
+                job.started = time.time()
+                executor = self._executor
+            try:
+                future = job.conciliation.submit_to(executor, job.file)
+            except BrokenProcessPool:
+                self._restart_pool(executor)
+                with self._lock:
+                    executor = self._executor
+                future = job.conciliation.submit_to(executor, job.file)
+            future.add_done_callback(
+                lambda future, job=job, executor=executor: self._finish(
+                    job, future, executor
+                )
+            )
+
+    def _finish(self, job, future, executor):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart_pool(executor)
+        summary = Conciliation.collect_summary(future, job.file)
+        with self._lock:
+            job.summary = summary
+            job.status = FINISHED
+            job.finished = time.time()
+        self._slots.release()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    API HTTP do serviço (JSON):
+
+    POST   /jobs              {"path", "priority", "settings"} ou, com
+                              Content-Type text/csv, o próprio CSV no corpo e
+                              ?name=&priority=&settings= (JSON) na URL
+    GET    /jobs              Todos os trabalhos
+    GET    /jobs/<id>         Estado, resumo e tempo de cada etapa
+    GET    /jobs/<id>/result  O resultado (pastas são enviadas em .zip)
+    DELETE /jobs/<id>         Cancela um trabalho ainda na fila
+    GET    /health            Processos e trabalhos por estado
+    """
+
+    service: ConciliationService = None
+
+    def do_GET(self):
+        parts = self._path_parts()
+        try:
+            if parts == ["health"]:
+                return self._send_json(200, self.service.health())
+            if parts == ["jobs"]:
+                return self._send_json(
+                    200, [job.to_dict() for job in self.service.jobs()]
+                )
+            if len(parts) == 2 and parts[0] == "jobs":
+                return self._send_json(200, self.service.job(parts[1]).to_dict())
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+                return self._send_result(self.service.job(parts[1]))
+        except KeyError:
+            return self._send_json(404, {"error": "Trabalho não encontrado"})
+        self._send_json(404, {"error": "Rota não encontrada"})
+
+    def do_POST(self):
+        if self._path_parts() != ["jobs"]:
+            return self._send_json(404, {"error": "Rota não encontrada"})
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get("Content-Type", "").startswith("text/csv"):
+                query = parse_qs(urlparse(self.path).query)
+                job = self.service.submit_upload(
+                    query.get("name", ["upload.csv"])[0],
+                    body,
+                    int(query.get("priority", [0])[0]),
+                    json.loads(query.get("settings", ["{}"])[0]),
+                )
+            else:
+                request = json.loads(body or b"{}")
+                job = self.service.submit(
+                    request["path"],
+                    request.get("priority", 0),
+                    request.get("settings"),
+                )
+        except (KeyError, TypeError, ValueError) as e:
+            return self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+        self._send_json(202, job.to_dict())
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "Rota não encontrada"})
+        try:
+            cancelled = self.service.cancel(parts[1])
+        except KeyError:
+            return self._send_json(404, {"error": "Trabalho não encontrado"})
+        if not cancelled:
+            return self._send_json(409, {"error": "O trabalho já foi iniciado"})
+        self._send_json(200, self.service.job(parts[1]).to_dict())
+
+    def log_message(self, format, *args):
+        # Registro enxuto no terminal do serviço
+        print(f"{self.address_string()} {format % args}")
+
+    def _path_parts(self):
+        return [part for part in urlparse(self.path).path.split("/") if part]
+
+    def _send_result(self, job):
+        output = job.summary and job.summary["output"]
+        if not output or not os.path.exists(output):
+            return self._send_json(409, {"error": "Resultado indisponível"})
+        if os.path.isdir(output):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for folder, _, names in os.walk(output):
+                    for name in names:
+                        path = os.path.join(folder, name)
+                        archive.write(path, os.path.relpath(path, output))
+            content = buffer.getvalue()
+            filename = f"{os.path.basename(output)}.zip"
+        else:
+            with open(output, "rb") as file:
+                content = file.read()
+            filename = os.path.basename(output)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, code, data):
+        content = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def serve(service: ConciliationService, host: str, port: int):
+    """
+    Atende a API HTTP até ser interrompido (Ctrl+C).
+    """
+    handler = type("Handler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serviço de conciliação em http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Serviço local de conciliação com processos mantidos aquecidos."
+    )
+    parser.add_argument("-o", "--output", required=True, help="Pasta de saída")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processos em paralelo",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Endereço de escuta (o padrão aceita só conexões locais)",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Porta de escuta")
+    parser.add_argument(
+        "--cache-mb", type=int, default=512, help="Tamanho do cache de resultados"
+    )
+    parser.add_argument(
+        "--parsed-cache-mb",
+        type=int,
+        default=1024,
+        help="Tamanho do cache dos CSV já lidos",
+    )
+    parser.add_argument(
+        "--retention-hours",
+        type=float,
+        default=DEFAULT_RETENTION / 3600,
+        help="Horas que os trabalhos encerrados e seus arquivos são mantidos",
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    serve(
+        ConciliationService(
+            args.output,
+            args.workers,
+            args.cache_mb * 1024 * 1024 or None,
+            args.parsed_cache_mb * 1024 * 1024 or None,
+            args.retention_hours * 3600,
+        ),
+        args.host,
+        args.port,
+    )
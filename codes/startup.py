@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+
+class StartupTimer:
+    """
+    Marca os tempos da inicialização do aplicativo, contados a partir da
+    criação do objeto (o mais cedo possível em main.py).
+
+    Só usa a biblioteca padrão, para não pesar na própria inicialização.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._started_at = time.time()
+        self._marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """
+        Registra o tempo decorrido até agora com um nome (ex.: "first_paint").
+        Pode ser chamado de qualquer thread; só a primeira marca de cada nome
+        é mantida.
+        """
+        with self._lock:
+            self._marks.setdefault(name, time.perf_counter() - self._start)
+
+    def to_dict(self) -> Dict:
+        """
+        Retorna as marcas, em segundos, na ordem em que aconteceram.
+        """
+        with self._lock:
+            marks = sorted(self._marks.items(), key=lambda item: item[1])
+        return {
+            "started_at": self._started_at,
+            "marks": {name: round(seconds, 4) for name, seconds in marks},
+        }
+
+    def report(self, path: Optional[str] = None):
+        """
+        Mostra o resumo no terminal e, se indicado, acrescenta as marcas como
+        uma linha JSON ao arquivo, formando o histórico usado para acompanhar
+        regressões entre versões.
+
+        Parâmetros:
+        path (Optional[str]): Arquivo .jsonl de histórico.
+        """
+        data = self.to_dict()
+        summary = ", ".join(
+            f"{name} {seconds * 1000:.0f} ms" for name, seconds in data["marks"].items()
+        )
+        print(f"Inicialização: {summary}")
+        if path:
+            try:
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(data) + "\n")
+            except OSError as e:
+                print(f"Não foi possível gravar o tempo de inicialização: {e}")
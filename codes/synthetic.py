@@ -0,0 +1,143 @@
+import argparse
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Códigos de "Hist" que não entram no sinal (aparecem em "Hist Diferente")
+OTHER_HIST_CODES = np.array([1, 5, 71, 250])
+
+_ROWS_PER_BLOCK = 1_000_000
+
+
+def _formatted_cnpj(numbers):
+    digits = [f"{number % 10**14:014d}" for number in numbers]
+    return [f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}" for d in digits]
+
+
+def generate_ledger(
+    path: str,
+    rows: int,
+    ids: Optional[int] = None,
+    cnpj_ratio: float = 0.3,
+    match_rate: float = 0.6,
+    other_hist_ratio: float = 0.02,
+    offset_ratio: float = 0.1,
+    seed: int = 0,
+):
+    """
+    Gera um razão sintético no formato exportado pelo sistema contábil
+    (CSV separado por ";" com as colunas "Valor", "Hist" e "Complemento").
+
+    Os lançamentos são gerados em pares por "Id": um crédito (Hist 133) e um
+    débito (Hist 20). Nos "Id" quitados os dois valores são iguais; nos demais
+    o segundo lançamento é parcial e o sinal dos códigos é sorteado, gerando
+    saldos positivos e negativos. Uma parte dos "Id" é reservada em duplas de
+    saldos opostos e exatos (um lançamento de Hist 133 em um e outro, de mesmo
+    valor, de Hist 20 no outro), que o pareamento de valores semelhantes
+    sempre encontra.
+
+    Parâmetros:
+    path (str): Caminho do CSV gerado.
+    rows (int): Quantidade de linhas.
+    ids (int): Quantidade de "Id" distintos; por padrão, um a cada 4 linhas.
+    cnpj_ratio (float): Fração dos "Id" identificados por CNPJ formatado.
+    match_rate (float): Fração dos "Id" com saldo zero.
+    other_hist_ratio (float): Fração das linhas com outros códigos de "Hist".
+    offset_ratio (float): Fração dos "Id" em duplas de saldos opostos.
+    seed (int): Semente do gerador aleatório.
+    """
+    rng = np.random.default_rng(seed)
+    ids = ids or max(1, rows // 4)
+
+    # Atributos de cada "Id"
+    amounts = rng.integers(100, 5_000_000, ids)  # centavos
+    settled = rng.random(ids) < match_rate
+    swapped = rng.random(ids) < 0.5
+    uses_cnpj = rng.random(ids) < cnpj_ratio
+    numbers = rng.permutation(np.arange(1, ids + 1) * 7919)
+    cnpjs = np.array(_formatted_cnpj(numbers[uses_cnpj] * 1_000_003), dtype=object)
+    texts = np.array([f"NF {number} REF PGTO" for number in numbers], dtype=object)
+    texts[uses_cnpj] = [
+        f"PGTO NF {number} CNPJ {cnpj}"
+        for number, cnpj in zip(numbers[uses_cnpj], cnpjs)
+    ]
+
+    # Os últimos "Id" formam as duplas de saldos opostos, com uma linha cada, e
+    # ficam fora do sorteio dos demais lançamentos
+    offset = int(ids * offset_ratio) // 2 * 2
+    offset = max(0, min(offset, (ids - 1) // 2 * 2, rows // 2 * 2))
+    regular = ids - offset
+
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        _offset_block(amounts, texts, regular).to_csv(file, sep=";", index=False)
+        for start in range(offset, rows, _ROWS_PER_BLOCK):
+            count = min(_ROWS_PER_BLOCK, rows - start)
+            block = _ledger_block(
+                rng, count, regular, amounts, settled, swapped, texts, other_hist_ratio
+            )
+            block.to_csv(file, sep=";", index=False, header=False)
+
+
+def _offset_block(amounts, texts, first_offset):
+    owner = np.arange(first_offset, len(amounts))
+    # Cada dupla usa o valor do primeiro "Id": crédito em um, débito no outro
+    valor = np.repeat(amounts[owner[::2]], 2) / 100
+    hist = np.tile([133, 20], len(owner) // 2)
+    return pd.DataFrame(
+        {
+            "Data": "31/12/2024",
+            "Valor": valor,
+            "Hist": hist,
+            "Complemento": texts[owner],
+        }
+    )
+
+
+def _ledger_block(
+    rng, rows, regular, amounts, settled, swapped, texts, other_hist_ratio
+):
+    pairs = (rows + 1) // 2
+    owner = rng.integers(0, regular, pairs)
+
+    first = amounts[owner]
+    fraction = rng.uniform(0.1, 0.9, pairs)
+    second = np.where(settled[owner], first, np.rint(first * fraction)).astype("int64")
+    first_hist = np.where(swapped[owner], 20, 133)
+    second_hist = np.where(swapped[owner], 133, 20)
+
+    owner_rows = np.repeat(owner, 2)[:rows]
+    valor = np.column_stack([first, second]).ravel()[:rows] / 100
+    hist = np.column_stack([first_hist, second_hist]).ravel()[:rows]
+    other = rng.random(rows) < other_hist_ratio
+    hist[other] = rng.choice(OTHER_HIST_CODES, other.sum())
+
+    return pd.DataFrame(
+        {
+            "Data": "31/12/2024",
+            "Valor": valor,
+            "Hist": hist,
+            "Complemento": texts[owner_rows],
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um razão sintético.")
+    parser.add_argument("path", help="CSV de saída")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--ids", type=int, default=None)
+    parser.add_argument("--cnpj-ratio", type=float, default=0.3)
+    parser.add_argument("--match-rate", type=float, default=0.6)
+    parser.add_argument("--offset-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_ledger(
+        args.path,
+        args.rows,
+        ids=args.ids,
+        cnpj_ratio=args.cnpj_ratio,
+        match_rate=args.match_rate,
+        offset_ratio=args.offset_ratio,
+        seed=args.seed,
+    )
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from amounts import cents_to_values, to_cents, to_decimal_values
+
+
+def test_brazilian_and_plain_text_values():
+    values = pd.Series(["R$ 1.234,56", "-10,5", "10.5", "0.25", None], dtype=object)
+    result = to_decimal_values(values)
+    assert result.iloc[:4].tolist() == [1234.56, -10.5, 10.5, 0.25]
+    assert np.isnan(result.iloc[4])
+
+
+def test_dots_before_three_digits_are_thousands_separators():
+    values = pd.Series(["1.234", "-1.234.567", "1.2345", "12.34", "1,5"], dtype=object)
+    assert to_decimal_values(values).tolist() == [1234, -1234567, 1.2345, 12.34, 1.5]
+
+
+def test_numeric_columns_are_unchanged():
+    values = pd.Series([1.234, 10.5])
+    assert to_decimal_values(values) is values
+
+
+def test_cents_round_trip():
+    cents = to_cents(pd.Series(["0,1", "0,2", None], dtype=object))
+    assert cents.tolist() == [10, 20, 0]
+    assert cents_to_values(cents).tolist() == [0.1, 0.2, 0.0]
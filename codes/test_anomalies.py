@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+
+from anomalies import (
+    DUPLICATE,
+    NEAR_DUPLICATE,
+    OUTLIER,
+    find_duplicates,
+    find_near_duplicates,
+    find_outliers,
+)
+
+IDS = np.array([0, 0, 0, 1, 1, 1, 1, 1, 1, 2, 2])
+HIST = np.array([20, 20, 20, 133, 133, 133, 133, 133, 20, 5, 5])
+CENTS = np.array([100, 100, 150, 100, 102, 101, 100, 100, 9000, 7, 7])
+
+
+def test_duplicates_are_grouped_in_file_order():
+    rows, groups = find_duplicates(IDS, HIST, CENTS)
+    assert rows.tolist() == [0, 1, 3, 6, 7, 9, 10]
+    assert groups.tolist() == [0, 0, 1, 1, 1, 2, 2]
+
+
+def test_duplicates_with_missing_hist_fall_back_to_exact_comparison():
+    hist = HIST.astype("float64")
+    hist[[0, 1]] = np.nan
+    rows, groups = find_duplicates(IDS, hist, CENTS)
+    assert rows.tolist() == [0, 1, 3, 6, 7, 9, 10]
+    assert groups.tolist() == [0, 0, 1, 1, 1, 2, 2]
+
+
+def test_near_duplicates_need_a_difference_within_tolerance():
+    rows, groups, spans = find_near_duplicates(IDS, HIST, CENTS, 5)
+    assert rows.tolist() == [3, 4, 5, 6, 7]
+    assert groups.tolist() == [0] * 5
+    assert spans.tolist() == [2] * 5
+    # Valores só iguais (linhas 9 e 10) ficam para find_duplicates, e 150
+    # entra no grupo das linhas 0 e 1 só com tolerância de 50 centavos
+    assert find_near_duplicates(IDS, HIST, CENTS, 50)[0].tolist()[:3] == [0, 1, 2]
+    assert 2 not in find_near_duplicates(IDS, HIST, CENTS, 49)[0]
+
+
+def test_outliers_use_the_median_of_each_id():
+    rows, groups, scores, medians = find_outliers(IDS, CENTS, 3.5, 5)
+    assert rows.tolist() == [8]
+    assert groups.tolist() == [0]
+    assert medians.tolist() == [100.5]
+    assert scores[0] > 3.5
+    # Ids com menos linhas que o mínimo não são avaliados
+    assert len(find_outliers(IDS, CENTS, 3.5, 7)[0]) == 0
+
+
+def test_empty_input():
+    empty = np.array([], dtype="int64")
+    assert len(find_duplicates(empty, empty, empty)[0]) == 0
+    assert len(find_near_duplicates(empty, empty, empty, 5)[0]) == 0
+    assert len(find_outliers(empty, empty, 3.5, 5)[0]) == 0
+
+
+def test_anomalies_sheet(ledger, conciliation, reconcile, sheet):
+    path = ledger(
+        [
+            ("10.5", 20, "NF 100"),
+            ("10.5", 20, "NF 100"),
+            ("3.0", 133, ""),
+            ("3.0", 133, ""),
+            ("7.25", 20, "NF 200"),
+            ("7.26", 20, "NF 200"),
+        ]
+    )
+    conciliation.set_anomaly_detection(True)
+    anomalies = sheet(reconcile(path)["output"], "Anomalias")
+
+    duplicates = anomalies[anomalies["Tipo"] == DUPLICATE]
+    assert duplicates["Linha"].tolist() == [1, 2, 3, 4]
+    # Linhas sem "Id" ficam vazias, sem herdar o "Id" de outra categoria
+    assert duplicates["Id"].iloc[:2].tolist() == ["100", "100"]
+    assert duplicates["Id"].iloc[2:].isna().all()
+    near = anomalies[anomalies["Tipo"] == NEAR_DUPLICATE]
+    assert near["Linha"].tolist() == [5, 6]
+    assert (anomalies["Tipo"] != OUTLIER).all()
+
+
+def test_anomalies_are_off_by_default(ledger, reconcile):
+    path = ledger([("10.5", 20, "NF 100"), ("10.5", 20, "NF 100")])
+    output = reconcile(path)["output"]
+    assert not os.path.exists(os.path.join(output, "Anomalias.csv"))
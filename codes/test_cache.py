@@ -0,0 +1,135 @@
+import os
+
+import pandas as pd
+import pytest
+
+from cache import CACHE_FOLDER, PARSED_CACHE_FOLDER, ParsedLedgerCache, ResultCache
+
+ROWS = [("10.50", 133, "NF 100"), ("4.00", 20, "NF 100")]
+
+needs_arrow = pytest.mark.skipif(
+    not ParsedLedgerCache.available(), reason="requer pyarrow"
+)
+
+
+def _write(path, content):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+    return str(path)
+
+
+def test_key_depends_on_content_and_settings(tmp_path):
+    first = _write(tmp_path / "a.csv", "conteúdo")
+    copy = _write(tmp_path / "b.csv", "conteúdo")
+    other = _write(tmp_path / "c.csv", "outro")
+    key = ResultCache.key(first, {"chunk_size": None})
+    assert ResultCache.key(copy, {"chunk_size": None}) == key
+    assert ResultCache.key(other, {"chunk_size": None}) != key
+    assert ResultCache.key(first, {"chunk_size": 10}) != key
+
+
+def test_put_and_get_files_and_folders(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), 10_000)
+    assert cache.get("nada", str(tmp_path / "saida")) is None
+
+    cache.put("arquivo", _write(tmp_path / "r.xlsx", "planilha"))
+    (tmp_path / "out").mkdir()
+    restored = cache.get("arquivo", str(tmp_path / "out" / "r"))
+    with open(restored, encoding="utf-8") as file:
+        assert file.read() == "planilha"
+
+    folder = tmp_path / "pasta"
+    folder.mkdir()
+    _write(folder / "Ano Passado.csv", "Id;Resultado")
+    cache.put("pasta", str(folder))
+    restored = cache.get("pasta", str(tmp_path / "out" / "pasta"))
+    assert os.listdir(restored) == ["Ano Passado.csv"]
+    assert restored == str(tmp_path / "out" / "pasta")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), 250)
+    for key in ("a", "b"):
+        cache.put(key, _write(tmp_path / f"{key}.xlsx", "x" * 100))
+        os.utime(tmp_path / "cache" / key, (1, 1 if key == "a" else 2))
+    # Usar "a" a torna a mais recente, e "b" sai quando "c" entra
+    assert cache.get("a", str(tmp_path / "a_saida")) is not None
+    cache.put("c", _write(tmp_path / "c.xlsx", "x" * 100))
+    assert sorted(os.listdir(tmp_path / "cache")) == ["a", "c"]
+    # Resultados maiores que o limite não são guardados
+    cache.put("d", _write(tmp_path / "d.xlsx", "x" * 300))
+    assert "d" not in os.listdir(tmp_path / "cache")
+
+
+def test_conciliation_restores_cached_results(ledger, conciliation, tmp_path):
+    path = ledger(ROWS)
+    events = []
+    conciliation.set_cache(10_000_000)
+    conciliation.set_progress(events.append)
+    for output_format in ("csv", "csv", "xlsx"):
+        conciliation.set_output_format(output_format)
+        assert conciliation.new_conciliation([path])[0]["status"] == "ok"
+    cached = [event["cached"] for event in events if event["event"] == "written"]
+    # O formato de saída faz parte da chave
+    assert cached == [False, True, False]
+    assert os.path.isdir(tmp_path / "out" / CACHE_FOLDER)
+
+
+def _blocks():
+    return [
+        pd.DataFrame({"Valor": [10.5, 4.0], "Hist": [133, 20], "Id": ["1", "1"]}),
+        pd.DataFrame({"Valor": [7.0], "Hist": [5], "Id": ["2"]}),
+    ]
+
+
+@needs_arrow
+def test_parsed_blocks_round_trip(tmp_path):
+    cache = ParsedLedgerCache(str(tmp_path / "cache"), 10_000_000)
+    assert cache.get("chave") is None
+    # Os blocos passam sem alteração e só são guardados ao fim da leitura
+    for block, expected in zip(cache.put("chave", _blocks()), _blocks()):
+        pd.testing.assert_frame_equal(block, expected)
+    for block, expected in zip(cache.get("chave"), _blocks()):
+        pd.testing.assert_frame_equal(block, expected)
+
+
+@needs_arrow
+def test_partial_or_inconsistent_reads_are_not_kept(tmp_path):
+    cache = ParsedLedgerCache(str(tmp_path / "cache"), 10_000_000)
+    blocks = cache.put("parcial", _blocks())
+    next(blocks)
+    blocks.close()
+    assert cache.get("parcial") is None
+
+    inconsistent = _blocks()
+    inconsistent[1]["Hist"] = inconsistent[1]["Hist"].astype("float64")
+    list(cache.put("tipos", inconsistent))
+    assert cache.get("tipos") is None
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_parsed_key_follows_file_and_patterns(tmp_path):
+    path = _write(tmp_path / "razao.csv", "conteúdo")
+    key = ParsedLedgerCache.key(path, [])
+    assert ParsedLedgerCache.key(path, [("cpf", r"\d{11}", 0)]) != key
+    os.utime(path, ns=(1, 1))
+    assert ParsedLedgerCache.key(path, []) != key
+
+
+@needs_arrow
+def test_conciliation_reuses_parsed_ledger(
+    ledger, conciliation, reconcile, sheet, tmp_path
+):
+    path = ledger(ROWS)
+    conciliation.set_parsed_cache(10_000_000)
+    conciliation.set_instrumentation(True)
+    outputs = []
+    for signs in ({20: -1, 133: 1}, {20: 1, 133: 1}):
+        conciliation.set_hist_signs(signs)
+        summary = reconcile(path)
+        outputs.append(sheet(summary["output"], "Ano Passado")["Resultado"])
+    assert summary["report"]["counters"]["parsed_cache_hits"] == 1
+    assert os.listdir(tmp_path / "out" / PARSED_CACHE_FOLDER)
+    # Outros sinais continuam valendo com o razão lido do cache
+    assert outputs[0].tolist() == [6.5]
+    assert outputs[1].tolist() == [14.5]
@@ -0,0 +1,89 @@
+import os
+
+import cli
+from cli import (
+    EXIT_FAILED,
+    EXIT_NO_INPUT,
+    EXIT_OK,
+    EXIT_USAGE,
+    InboxWatcher,
+    expand_inputs,
+    main,
+)
+
+ROWS = [("10.5", 20, "NF 100"), ("10.5", 133, "NF 200")]
+
+
+def test_expand_inputs_reports_missing_paths(ledger, tmp_path):
+    path = ledger(ROWS)
+    files, missing = expand_inputs([str(tmp_path), path, "nao_existe.csv"])
+    assert files == [os.path.abspath(path)]
+    assert missing == ["nao_existe.csv"]
+    # Padrões sem correspondência não são caminhos explícitos
+    assert expand_inputs([str(tmp_path / "*.txt")]) == ([], [])
+
+
+def test_exit_codes(ledger, tmp_path):
+    path = ledger(ROWS)
+    output = str(tmp_path / "out")
+    assert main([path, "-o", output, "--format", "csv"]) == EXIT_OK
+    assert main([str(tmp_path / "*.txt"), "-o", output]) == EXIT_NO_INPUT
+    assert main([path, "-o", output, "--hist-rules", "nao_existe.json"]) == EXIT_USAGE
+
+
+def test_missing_explicit_input_fails_but_reconciles_the_rest(ledger, tmp_path):
+    path = ledger(ROWS)
+    output = tmp_path / "out"
+    code = main([path, "razao_errado.csv", "-o", str(output), "--format", "csv"])
+    assert code == EXIT_FAILED
+    assert (output / "razao" / "Ano Passado.csv").exists()
+
+
+def test_incremental_store_option_refuses_a_repeated_file(ledger, tmp_path):
+    path = ledger(ROWS)
+    args = [path, "-o", str(tmp_path / "out"), "--format", "csv"]
+    args += ["--incremental-store", str(tmp_path / "estado.sqlite")]
+    assert main(args) == EXIT_OK
+    assert main(args) == EXIT_FAILED
+
+
+def _watcher(tmp_path, *directories):
+    return InboxWatcher(
+        [str(directory) for directory in directories],
+        0,
+        str(tmp_path / "estado"),
+    )
+
+
+def test_watcher_releases_stable_files_once(ledger, tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    first = ledger(ROWS, "inbox/a.csv")
+    ledger(ROWS, "inbox/b.csv")  # mesmo conteúdo
+    watcher = _watcher(tmp_path, inbox)
+    assert watcher.poll() == []
+    ready = watcher.poll()
+    assert [path for path, _ in ready] in ([first], [str(inbox / "b.csv")])
+    watcher.mark_processed(ready[0][1])
+    assert watcher.poll() == []
+    # O estado sobrevive a um reinício
+    restarted = _watcher(tmp_path, inbox)
+    restarted.poll()
+    assert restarted.poll() == []
+
+
+def test_watcher_survives_missing_folders_and_files(ledger, tmp_path, monkeypatch):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    ledger(ROWS, "inbox/a.csv")
+    watcher = _watcher(tmp_path, inbox, tmp_path / "nao_existe")
+    watcher.poll()
+
+    def removed(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(cli, "file_digest", removed)
+    assert watcher.poll() == []
+    monkeypatch.undo()
+    watcher.poll()
+    assert len(watcher.poll()) == 1
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from consolidated import PERIOD_COLUMN, ConsolidatedLedger, period_name
+
+MOVEMENTS = {
+    "jan": {"A": 100, "B": -50, "E": 0},
+    "fev": {"A": -100, "C": 30, "D": 10},
+    "mar": {"A": 20, "B": 50, "D": -10},
+}
+
+
+@pytest.fixture
+def ledger_table():
+    table = ConsolidatedLedger()
+    for period, totals in MOVEMENTS.items():
+        table.add_period(period, pd.Series(totals), [-50] if period == "jan" else [])
+    return table
+
+
+def test_period_name():
+    assert period_name("csv/2024-01.csv") == "2024-01"
+
+
+def test_cumulative_balances_and_closing(ledger_table):
+    cumulative = ledger_table.cumulative()
+    assert cumulative.loc["A"].tolist() == [100, 0, 20]
+    assert cumulative.loc["D"].tolist() == [0, 10, 0]
+    assert ledger_table.totals().to_dict() == {"A": 20, "B": 0, "C": 30, "D": 0, "E": 0}
+    assert ledger_table.closing_periods().to_dict() == {
+        "A": None,
+        "B": "mar",
+        "C": None,
+        "D": "mar",
+        "E": "jan",
+    }
+    with pytest.raises(ValueError):
+        ledger_table.add_period("jan", pd.Series({"A": 1}), [])
+
+
+def test_carry_over(ledger_table):
+    carry = ledger_table.carry_over().set_index(PERIOD_COLUMN)
+    assert carry["Recebidos em Aberto"].tolist() == [0, 2, 3]
+    assert carry["Liquidados do Anterior"].tolist() == [0, 1, 2]
+    assert carry["Fechados no Período"].tolist() == [1, 0, 2]
+    assert carry["Transportados"].tolist() == [2, 3, 2]
+    assert carry["Saldo Positivo Transportado"].tolist() == [1.0, 0.4, 0.5]
+    assert carry["Saldo Negativo Transportado"].tolist() == [-0.5, -0.5, 0.0]
+
+
+def test_history(ledger_table):
+    history = ledger_table.history("D")
+    assert history[PERIOD_COLUMN].tolist() == ["jan", "fev", "mar"]
+    assert history["Movimento"].tolist() == [0.0, 0.1, -0.1]
+    assert history["Saldo"].tolist() == [0.0, 0.1, 0.0]
+    assert ledger_table.history("Z") is None
+    assert np.array_equal(ledger_table.next_year_values(), [-50])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_consolidate_sums_the_periods(ledger, conciliation, sheet, workers):
+    january = ledger([("100.00", 133, "NF 1"), ("50.00", 133, "NF 2")], "2024-01.csv")
+    february = ledger([("100.00", 20, "NF 1"), ("7.00", 5, "NF 3")], "2024-02.csv")
+    conciliation.set_workers(workers)
+    output = conciliation.consolidate([january, february])
+
+    # Pago em janeiro e quitado em fevereiro
+    assert sheet(output, "Pagamento Completo")["Id"].tolist() == ["1"]
+    balances = sheet(output, "Saldos por Período")
+    assert balances.columns.tolist() == [
+        "Id",
+        "Resultado",
+        "Fechamento",
+        "2024-01",
+        "2024-02",
+    ]
+    assert balances["Fechamento"].tolist()[:1] == ["2024-02"]
+    other = sheet(output, "Hist Diferente de 20 e 133")
+    assert other[PERIOD_COLUMN].tolist() == ["2024-02"]
+    assert conciliation.consolidated_ledger().periods() == ["2024-01", "2024-02"]
+    with pytest.raises(ValueError):
+        conciliation.consolidate([january, january])
@@ -0,0 +1,79 @@
+import os
+
+from folder import FolderSnapshot
+
+
+def _write(directory, name, mtime, content=b"x"):
+    path = directory / name
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _names(snapshot):
+    return [entry.name for entry in snapshot.entries()]
+
+
+def test_refresh_lists_matching_files_newest_first(tmp_path):
+    _write(tmp_path, "antigo.xlsx", 1000)
+    _write(tmp_path, "Novo.XLSX", 3000)
+    _write(tmp_path, "meio.xlsx", 2000)
+    _write(tmp_path, "notas.txt", 4000)
+    (tmp_path / "pasta.xlsx").mkdir()
+    snapshot = FolderSnapshot(str(tmp_path), ".xlsx")
+    assert snapshot.refresh()
+    assert _names(snapshot) == ["Novo.XLSX", "meio.xlsx", "antigo.xlsx"]
+    assert len(snapshot) == 3
+    # Sem mudança na pasta, nada é relido
+    assert not snapshot.refresh()
+
+
+def test_forced_refresh_sees_overwritten_files(tmp_path):
+    path = _write(tmp_path, "razao.xlsx", 1000)
+    snapshot = FolderSnapshot(str(tmp_path), ".xlsx")
+    snapshot.refresh()
+    # Sobrescrever um arquivo não muda a data de modificação da pasta
+    _write(tmp_path, "razao.xlsx", 2000, b"maior")
+    assert not snapshot.refresh()
+    assert snapshot.refresh(force=True)
+    [entry] = snapshot.entries()
+    assert (entry.size, entry.mtime) == (len(b"maior"), 2000)
+    path.unlink()
+    assert snapshot.refresh(force=True) and len(snapshot) == 0
+
+
+def test_missing_folder_is_empty(tmp_path):
+    snapshot = FolderSnapshot(str(tmp_path / "nao_existe"), ".xlsx")
+    assert not snapshot.refresh()
+    assert snapshot.entries() == []
+
+
+def test_filter_is_case_insensitive_and_refinable(tmp_path):
+    for mtime, name in enumerate(["razao_jan.xlsx", "razao_fev.xlsx", "caixa.xlsx"]):
+        _write(tmp_path, name, 1000 + mtime)
+    snapshot = FolderSnapshot(str(tmp_path), ".xlsx")
+    snapshot.refresh()
+    assert snapshot.set_filter(" RAZAO ")
+    assert _names(snapshot) == ["razao_fev.xlsx", "razao_jan.xlsx"]
+    assert not snapshot.set_filter("razao")
+    assert snapshot.set_filter("razao_j")
+    assert _names(snapshot) == ["razao_jan.xlsx"]
+    assert snapshot.set_filter("")
+    assert len(_names(snapshot)) == 3
+
+
+def test_remove_and_rename_update_without_rereading(tmp_path):
+    _write(tmp_path, "a.xlsx", 1000)
+    _write(tmp_path, "b.xlsx", 2000)
+    snapshot = FolderSnapshot(str(tmp_path), ".xlsx")
+    snapshot.refresh()
+    snapshot.set_filter("a")
+    assert _names(snapshot) == ["a.xlsx"]
+    snapshot.rename("a.xlsx", "c.xlsx")
+    assert _names(snapshot) == []
+    snapshot.set_filter("")
+    assert _names(snapshot) == ["b.xlsx", "c.xlsx"]
+    # Com outra extensão, o arquivo sai da lista
+    snapshot.rename("b.xlsx", "b.txt")
+    snapshot.remove("c.xlsx")
+    assert snapshot.entries() == [] and len(snapshot) == 0
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from ids import CPF_PATTERN, IdExtractor
+
+TEXTS = [
+    "NF 138 PGTO CNPJ 12.345.678/0001-90",
+    "REF 22 CPF 123.456.789-09",
+    "SEM NUMERO",
+    None,
+]
+
+
+def test_cnpj_wins_over_an_earlier_number():
+    ids = IdExtractor().extract(pd.Series(TEXTS, dtype=object))
+    assert ids.tolist()[:3] == ["12.345.678/0001-90", "22", "SEM NUMERO"]
+    assert pd.isna(ids.iloc[3])
+
+
+def test_added_pattern_uses_its_priority():
+    extractor = IdExtractor()
+    extractor.add_pattern("cpf", CPF_PATTERN)
+    ids = extractor.extract(pd.Series(TEXTS, dtype=object))
+    assert ids.iloc[1] == "123.456.789-09"
+    with pytest.raises(ValueError):
+        extractor.add_pattern("cpf", CPF_PATTERN)
+    with pytest.raises(ValueError):
+        extractor.add_pattern("grupo", r"(\d+)")
+
+
+def test_chunked_arrow_column_matches_python_path():
+    # Blocos concatenados deixam a coluna Arrow em vários pedaços
+    column = pd.concat(
+        [pd.Series(TEXTS[:2], dtype="str"), pd.Series(TEXTS[2:], dtype="str")],
+        ignore_index=True,
+    )
+    extractor = IdExtractor()
+    ids = extractor.extract(column)
+    expected = extractor._extract_python(column)
+    assert ids.iloc[:3].tolist() == expected.iloc[:3].tolist()
+    assert pd.isna(ids.iloc[3])
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from incremental import IncrementalStore
+
+ROWS = [
+    ("100.0", 133, "NF 1"),
+    ("40.0", 20, "NF 1"),
+    ("25.0", 20, "NF 2"),
+    ("10.0", 133, "NF 3"),
+    ("10.0", 20, "NF 3"),
+    ("7.0", 20, "NF 4"),
+]
+
+
+def _totals(ids, cents):
+    return pd.Series(cents, index=pd.Index(ids, name="Id"), dtype="int64")
+
+
+def test_store_accumulates_and_reclassifies(tmp_path):
+    with IncrementalStore(str(tmp_path / "estado.sqlite")) as store:
+        assert store.apply(_totals(["1", "2"], [6000, -2500]), [-1000]) == 2
+        store.apply(_totals(["2", "3"], [2500, -1000]), [])
+        result, next_year = store.results()
+    assert result["Id"].tolist() == ["1", "2", "3"]
+    assert result["_cents"].tolist() == [6000, 0, -1000]
+    assert next_year.tolist() == [False, False, True]
+
+
+def test_new_next_year_value_promotes_untouched_ids(tmp_path):
+    with IncrementalStore(str(tmp_path / "estado.sqlite")) as store:
+        store.apply(_totals(["1", "2"], [-700, 500]), [])
+        store.apply(_totals(["3"], [100]), [-700])
+        result, next_year = store.results(only_touched=True)
+    # "1" não estava no lote, mas passou a ser de próximo ano
+    assert result["Id"].tolist() == ["1", "3"]
+    assert next_year.tolist() == [True, False]
+
+
+def test_store_refuses_a_repeated_batch(tmp_path):
+    with IncrementalStore(str(tmp_path / "estado.sqlite")) as store:
+        store.apply(_totals(["1"], [-700]), [], "abc")
+        with pytest.raises(ValueError):
+            store.apply(_totals(["1"], [-700]), [-700], "abc")
+        result, next_year = store.results()
+    # O saldo e os valores de "Próximo Ano" ficam como após o primeiro lote
+    assert result["_cents"].tolist() == [-700]
+    assert next_year.tolist() == [False]
+
+
+def _sheets(sheet, output):
+    names = ["Ano Passado", "Pagamento Incompleto", "Próximo Ano"]
+    return {name: sheet(output, name) for name in names}
+
+
+def test_two_deltas_match_a_single_run(ledger, make_conciliation, tmp_path, sheet):
+    whole = ledger(ROWS, "inteiro.csv")
+    first, second = ledger(ROWS[:3], "lote1.csv"), ledger(ROWS[3:], "lote2.csv")
+    single = make_conciliation("um")
+    single.set_incremental_store(str(tmp_path / "um.sqlite"))
+    [summary] = single.new_conciliation([whole])
+    split = make_conciliation("dois")
+    split.set_incremental_store(str(tmp_path / "dois.sqlite"))
+    summaries = split.new_conciliation([first, second])
+    expected = _sheets(sheet, summary["output"])
+    got = _sheets(sheet, summaries[1]["output"])
+    for name in expected:
+        pd.testing.assert_frame_equal(expected[name], got[name])
+
+
+def test_only_touched_lists_the_delta(ledger, conciliation, tmp_path, sheet):
+    first, second = ledger(ROWS[:3], "lote1.csv"), ledger(ROWS[3:], "lote2.csv")
+    conciliation.set_incremental_store(str(tmp_path / "e.sqlite"), True)
+    summaries = conciliation.new_conciliation([first, second])
+    sheets = _sheets(sheet, summaries[1]["output"])
+    ids = set().union(*(frame["Id"] for frame in sheets.values()))
+    assert ids == {"4"}
+
+
+def test_same_file_twice_is_not_added_again(ledger, conciliation, tmp_path, sheet):
+    path = ledger(ROWS)
+    conciliation.set_incremental_store(str(tmp_path / "e.sqlite"))
+    first, second = (conciliation.new_conciliation([path])[0] for _ in range(2))
+    assert second["status"] == "error"
+    assert "já aplicado" in second["error"]
+    # O segundo processamento não sobrescreve o resultado com saldos dobrados
+    sheets = _sheets(sheet, first["output"])
+    assert sheets["Ano Passado"]["Resultado"].tolist() == [60.0]
@@ -0,0 +1,21 @@
+import sys
+
+import pytest
+
+from instrumentation import RunReport
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="lê /proc/self/statm")
+def test_stage_records_its_own_memory():
+    report = RunReport("razao.csv")
+    with report.stage("load") as stage:
+        block = b"x" * (64 * 1024**2)
+        stage["rows_in"] = stage["rows_out"] = 10
+    with report.stage("save"):
+        del block
+    load, save = report.to_dict()["stages"]
+    assert load["rows_in"] == load["rows_out"] == 10
+    assert load["rss_delta_mb"] > 50
+    assert save["rss_delta_mb"] < -50
+    # O pico do processo não cai quando a memória é liberada
+    assert save["process_peak_rss_mb"] > save["rss_mb"] + 50
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from matching import SPLIT, TOLERANCE, match_subsets, match_within_tolerance
+from tools import SIMILAR_VALUES_COLUMNS
+
+
+def _results(ids, cents):
+    cents = np.array(cents, dtype="int64")
+    return pd.DataFrame({"Id": ids, "Resultado": cents / 100, "_cents": cents})
+
+
+def test_similar_values_pair_each_negative_once(conciliation):
+    positive = _results(["1", "2", "3"], [3000, 3000, 1000])
+    negative = _results(["4", "5", "6"], [-3000, -3000, -3000])
+    similar = conciliation._find_similar_values(positive, negative)
+    # Dois positivos de 30,00: dois pares, cada um com um negativo diferente
+    assert sorted(similar["Id Positivo"]) == ["1", "2"]
+    assert similar["Id Negativo"].nunique() == 2
+    assert (similar["Resultado Positivo"] == -similar["Resultado Negativo"]).all()
+
+
+def test_similar_values_without_matches_are_empty(conciliation):
+    positive = _results(["1"], [3000])
+    for negative in (_results(["2"], [-2999]), _results([], [])):
+        similar = conciliation._find_similar_values(positive, negative)
+        assert similar.empty
+        assert similar.columns.tolist() == SIMILAR_VALUES_COLUMNS
+
+
+def test_unpaired_next_year_balance_stays_in_next_year(ledger, reconcile, sheet):
+    # Os dois saldos de -50,00 são de "Próximo Ano", mas só um tem par positivo
+    path = ledger(
+        [("50.00", 133, "NF 1"), ("50.00", 20, "NF 2"), ("50.00", 20, "NF 3")]
+    )
+    output = reconcile(path)["output"]
+    incomplete = sheet(output, "Pagamento Incompleto")["Id"].tolist()
+    next_year = sheet(output, "Próximo Ano")["Id"].tolist()
+    assert len(incomplete) == len(next_year) == 1
+    assert sorted(incomplete + next_year) == ["2", "3"]
+
+
+def test_tolerance_pairs_take_the_closest_free_negative():
+    positive = np.array([1000, 1005, 5000])
+    negative = np.array([1004, 999, 4800])
+    pairs = match_within_tolerance(positive, negative, 5)
+    assert sorted(pairs) == [(0, 1), (1, 0)]
+    # Cada negativo entra em um só par
+    assert match_within_tolerance(np.array([100, 100]), np.array([100]), 0) == [
+        (0, 0)
+    ]
+    assert match_within_tolerance(positive, np.array([], dtype="int64"), 5) == []
+
+
+def test_subsets_use_each_part_once():
+    targets = np.array([600, 600, 450])
+    parts = np.array([250, 350, 100, 500, 400, 50])
+    groups = match_subsets(targets, parts, 3, 0, 5.0)
+    used = [part for _, members in groups for part in members]
+    assert len(used) == len(set(used))
+    for target, members in groups:
+        assert parts[members].sum() == targets[target]
+        assert 2 <= len(members) <= 3
+    assert len(groups) == 3
+
+
+def test_subsets_respect_tolerance_and_size():
+    assert match_subsets(np.array([1000]), np.array([300, 690]), 2, 5, 5.0) == []
+    assert match_subsets(np.array([1000]), np.array([300, 698]), 2, 5, 5.0) == [
+        (0, [0, 1])
+    ]
+    # Três parcelas não cabem em max_parts=2
+    assert match_subsets(np.array([600]), np.array([100, 200, 300]), 2, 0, 5.0) == []
+
+
+NEGATIVE = [(2, "100.50"), (4, "26.00"), (5, "36.00"), (6, "8.00")]
+
+
+def test_grouped_payments_sheet(ledger, conciliation, reconcile, sheet):
+    path = ledger(
+        [
+            ("100.00", 133, "NF 1"),
+            ("60.00", 133, "NF 3"),
+            # Saldos negativos diferentes de qualquer linha, para não irem
+            # para "Próximo Ano"
+            *[(value, 20, f"NF {id_}") for id_, value in NEGATIVE],
+            *[("1.00", 133, f"NF {id_}") for id_, _ in NEGATIVE],
+        ]
+    )
+    conciliation.set_matching(100, 2)
+    output = reconcile(path)["output"]
+
+    grouped = sheet(output, "Pagamentos Agrupados")
+    assert grouped["Grupo"].tolist() == [1, 1, 2, 2, 2]
+    assert grouped["Tipo"].tolist() == [TOLERANCE] * 2 + [SPLIT] * 3
+    assert grouped["Id"].tolist() == ["1", "2", "3", "4", "5"]
+    assert grouped["Diferença"].tolist() == [0.5, 0.5, 0.0, 0.0, 0.0]
+    # Os "Id" agrupados saem das abas de saldos em aberto
+    assert sheet(output, "Ano Passado").empty
+    assert sheet(output, "Pagamento Incompleto")["Id"].tolist() == ["6"]
@@ -0,0 +1,61 @@
+import pytest
+
+from query import normalize_id
+from tools import Conciliation
+
+ROWS = [
+    ("100.0", 133, "PGTO CNPJ 12.345.678/0001-90"),
+    ("40.0", 20, "PGTO CNPJ 12.345.678/0001-90"),
+    ("25.0", 133, "NF 200"),
+    ("25.0", 20, "NF 300"),
+    ("5.0", 133, ""),
+]
+
+
+@pytest.fixture
+def index(ledger):
+    return Conciliation().query(ledger(ROWS))
+
+
+def test_normalize_id_formats_cnpj_digits():
+    assert normalize_id(" 12345678000190 ") == "12.345.678/0001-90"
+    assert normalize_id("200") == "200"
+
+
+def test_balance_explains_an_id(index):
+    balance = index.balance("12345678000190")
+    assert balance["Id"] == "12.345.678/0001-90"
+    assert balance["Resultado"] == 60.0
+    assert balance["Categoria"] == "Ano Passado"
+    assert balance["Linhas"] == 2
+    assert index.balance("999") is None
+
+
+def test_lines_are_in_file_order(index):
+    lines = index.lines("12.345.678/0001-90")
+    assert lines["Linha"].tolist() == [1, 2]
+    assert lines["Hist"].tolist() == [133, 20]
+    assert index.lines("12.345.678/0001-90", hist=20)["Linha"].tolist() == [2]
+
+
+def test_similar_values_are_partners(index):
+    assert index.balance("200")["Par"] is not None
+    assert index.balance("300")["Par"] is not None
+
+
+def test_find_combines_filters(index):
+    assert index.ids("2") == ["200"]
+    found = index.find(minimum=0)
+    assert found["Id"].tolist() == ["12.345.678/0001-90", "200"]
+    assert index.find(hist=20)["Id"].tolist() == ["12.345.678/0001-90", "300"]
+    incomplete = index.find(category="Pagamento Incompleto", limit=1)
+    assert incomplete["Id"].tolist() == ["300"]
+    with pytest.raises(ValueError):
+        index.find(category="Outra")
+
+
+def test_rows_without_id_are_left_out(index):
+    # A linha com "Complemento" vazio não pertence a nenhum "Id"
+    assert len(index) == 3
+    assert index.find(hist=133)["Id"].tolist() == ["12.345.678/0001-90", "200"]
+    assert sum(index.balance(id_)["Linhas"] for id_ in index.ids()) == 4
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from rules import (
+    NEXT_YEAR,
+    NEXT_YEAR_KIND,
+    OTHER,
+    OTHER_KIND,
+    REGULAR_KIND,
+    HistRules,
+)
+
+RULES = {
+    "default_sign": -1,
+    "rules": [
+        {"hist": 20, "sign": -1, "category": NEXT_YEAR},
+        {"hist": [133, 134], "sign": 1},
+        {"hist": {"from": 900, "to": 902}, "bucket": "Estornos"},
+        {"hist": 5, "category": OTHER},
+    ],
+}
+
+
+def test_default_rules():
+    rules = HistRules.default()
+    kinds, signs = rules.classify(np.array([20, 133, 5]))
+    assert kinds.tolist() == [NEXT_YEAR_KIND, REGULAR_KIND, OTHER_KIND]
+    assert signs.tolist() == [-1, 1, 1]
+    assert rules.listed_sheets() == {OTHER_KIND: "Hist Diferente de 20 e 133"}
+
+
+def test_ranges_lists_and_buckets():
+    rules = HistRules.from_dict(RULES)
+    kinds, signs = rules.classify(np.array([134, 901, 5, 7]))
+    bucket = {name: kind for kind, name in rules.listed_sheets().items()}["Estornos"]
+    assert kinds.tolist() == [REGULAR_KIND, bucket, OTHER_KIND, OTHER_KIND]
+    # Códigos sem sinal usam default_sign
+    assert signs.tolist() == [1, -1, -1, -1]
+    assert HistRules.from_dict(rules.to_dict()).to_dict() == rules.to_dict()
+
+
+def test_missing_and_sparse_codes_match_the_dense_table():
+    dense = HistRules.from_dict(RULES)
+    sparse = HistRules.from_dict(
+        {**RULES, "rules": [*RULES["rules"], {"hist": 1_000_000, "sign": 1}]}
+    )
+    hist = np.array([20, 134, 901, 5, 7, np.nan])
+    expected_kinds, expected_signs = dense.classify(hist[:-1].astype("int64"))
+    for rules in (dense, sparse):
+        kinds, signs = rules.classify(hist)
+        assert kinds[:-1].tolist() == expected_kinds.tolist()
+        assert signs[:-1].tolist() == expected_signs.tolist()
+        assert (kinds[-1], signs[-1]) == (OTHER_KIND, -1)
+
+
+def test_with_signs_keeps_categories():
+    rules = HistRules.default().with_signs({20: 1})
+    kinds, signs = rules.classify(np.array([20, 133]))
+    assert kinds.tolist() == [NEXT_YEAR_KIND, REGULAR_KIND]
+    assert signs.tolist() == [1, 1]
+    assert rules.signs() == {20: 1}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"rules": [{"hist": 20}, {"hist": [1, 20]}]},
+        {"rules": [{"hist": 20, "category": OTHER, "bucket": "Estornos"}]},
+        {"rules": [{"hist": 20, "bucket": "Próximo Ano"}]},
+        {"rules": [{"hist": 20, "sign": 2}]},
+        {"rules": [{"hist": 20, "category": "outra"}]},
+        {"rules": [{"hist": {"from": 5, "to": 1}}]},
+        {"rules": [{"codigo": 20}]},
+        {"regras": []},
+    ],
+)
+def test_invalid_rules(data):
+    with pytest.raises(ValueError):
+        HistRules.from_dict(data)
+
+
+def test_bucket_sheet(ledger, conciliation, reconcile, sheet):
+    path = ledger([("10.00", 133, "NF 1"), ("4.00", 901, "NF 1"), ("2.00", 5, "NF 2")])
+    conciliation.set_hist_rules(HistRules.from_dict(RULES))
+    output = reconcile(path)["output"]
+
+    assert sheet(output, "Estornos")["Hist"].tolist() == [901]
+    assert sheet(output, "Hist Diferente de 20, 133 e 134")["Hist"].tolist() == [5]
+    # O balde entra no saldo com o sinal padrão
+    assert sheet(output, "Ano Passado")["Resultado"].tolist() == [6.0]
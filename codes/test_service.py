@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+from service import CANCELLED, FINISHED, RUNNING, ConciliationService
+
+ROWS = [("10.5", 20, "NF 100"), ("10.5", 133, "NF 100")]
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ConciliationService(str(tmp_path / "out"), 1)
+    yield service
+    service.close()
+
+
+def _wait(service, job):
+    for _ in range(600):
+        if service.job(job.id).status == FINISHED:
+            return job.summary
+        time.sleep(0.05)
+    raise TimeoutError(job.id)
+
+
+def test_job_runs_in_the_pool(service, ledger):
+    job = service.submit(ledger(ROWS), settings={"output_format": "csv"})
+    summary = _wait(service, job)
+    assert summary["status"] == "ok", summary["error"]
+    assert os.path.exists(os.path.join(job.output_path, "razao", "Ano Passado.csv"))
+
+
+def test_broken_pool_is_rebuilt(service, ledger):
+    broken = service._executor
+    broken.submit(os._exit, 1)
+    for _ in range(200):
+        if broken._broken:
+            break
+        time.sleep(0.05)
+    summary = _wait(service, service.submit(ledger(ROWS)))
+    assert summary["status"] == "ok", summary["error"]
+    assert service._executor is not broken
+
+
+def test_finished_jobs_expire(tmp_path, ledger):
+    service = ConciliationService(str(tmp_path / "out"), 1, retention=0)
+    try:
+        job = service.submit_upload("a.csv", b"Data;Valor;Hist;Complemento;Outro\n")
+        _wait(service, job)
+        assert service.jobs() == []
+        assert not os.path.exists(job.upload)
+    finally:
+        service.close()
+
+
+def test_close_cancels_queued_jobs(tmp_path, ledger):
+    service = ConciliationService(str(tmp_path / "out"), 1)
+    path = ledger(ROWS)
+    # Ocupa o único processo para que o primeiro trabalho espere e o segundo
+    # fique na fila
+    service._executor.submit(time.sleep, 1)
+    running = service.submit(path)
+    while running.status != RUNNING:
+        time.sleep(0.01)
+    queued = service.submit(path)
+    service.close()
+    assert running.status == FINISHED
+    assert queued.status == CANCELLED
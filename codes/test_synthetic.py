@@ -0,0 +1,21 @@
+import pandas as pd
+
+from synthetic import generate_ledger
+from tools import Conciliation
+
+
+def test_offset_pairs_are_found_by_the_value_match(tmp_path):
+    path = str(tmp_path / "razao.csv")
+    generate_ledger(path, 400, ids=100, match_rate=0, offset_ratio=0.2)
+    assert len(pd.read_csv(path, sep=";")) == 400
+
+    index = Conciliation().query(path)
+    partners = [id_ for id_ in index.ids() if index.balance(id_)["Par"] is not None]
+    assert len(partners) >= 20
+
+
+def test_without_offset_pairs(tmp_path):
+    path = str(tmp_path / "razao.csv")
+    generate_ledger(path, 400, ids=100, match_rate=0, offset_ratio=0)
+    index = Conciliation().query(path)
+    assert all(index.balance(id_)["Par"] is None for id_ in index.ids())
@@ -0,0 +1,68 @@
+import pandas as pd
+
+import tools
+
+
+def test_clean_sheet_keeps_rows_without_id_last(ledger, reconcile, sheet):
+    path = ledger(
+        [
+            ("10.5", 20, "PGTO CNPJ 12.345.678/0001-90"),
+            ("3.0", 133, ""),
+            ("7.25", 20, "NF 100"),
+        ]
+    )
+    clean = sheet(reconcile(path)["output"], "Planilha Limpa")
+    assert clean["Id"].iloc[:2].tolist() == ["100", "12.345.678/0001-90"]
+    assert pd.isna(clean["Id"].iloc[2])
+    assert clean["Hist"].tolist() == [20, 20, 133]
+
+
+def test_chunked_read_accepts_blank_hist(ledger, conciliation, reconcile, sheet):
+    path = ledger(
+        [("10.50", 133, "NF 1"), ("4.00", "", "NF 1"), ("2.00", 20, "NF 2")]
+    )
+    conciliation.set_chunk_size(2)
+    output = reconcile(path)["output"]
+    # Sem código, a linha usa o sinal padrão e é listada como "Hist" diferente
+    assert sheet(output, "Ano Passado")["Resultado"].tolist() == [14.5]
+    other = sheet(output, "Hist Diferente de 20 e 133")
+    assert other["Valor"].tolist() == [4.0]
+    assert other["Hist"].isna().all()
+
+
+def test_full_and_chunked_reads_parse_values_alike(
+    ledger, make_conciliation, reconcile, sheet, monkeypatch
+):
+    # "1.500" é milhar mesmo nos blocos em que nenhum valor tem vírgula, nas
+    # duas leituras
+    monkeypatch.setattr(tools, "PARSE_BLOCK_ROWS", 2)
+    path = ledger([("1.500", 20, "NF 1")] * 3 + [("2,00", 133, "NF 1")])
+    results = []
+    for chunk_size in (None, 2):
+        conciliation = make_conciliation(f"out{chunk_size}")
+        conciliation.set_chunk_size(chunk_size)
+        output = reconcile(path, conciliation)["output"]
+        results.append(sheet(output, "Pagamento Incompleto"))
+    assert results[0]["Resultado"].tolist() == [-4498.0]
+    pd.testing.assert_frame_equal(results[0], results[1])
+
+
+def test_pool_records_failed_files_and_keeps_going(
+    ledger, conciliation, tmp_path, sheet
+):
+    good = [ledger([("10.00", 133, "NF 1")], f"bom{i}.csv") for i in (1, 2)]
+    broken = tmp_path / "quebrado.csv"
+    broken.write_text("sem;colunas\n1;2\n", encoding="utf-8")
+    files = [good[0], str(tmp_path / "nao_existe.csv"), str(broken), good[1]]
+    conciliation.set_workers(2)
+    summaries = conciliation.new_conciliation(files)
+    assert [summary["file"] for summary in summaries] == files
+    assert [summary["status"] for summary in summaries] == [
+        "ok",
+        "error",
+        "error",
+        "ok",
+    ]
+    assert all(summary["error"] for summary in summaries[1:3])
+    for summary in (summaries[0], summaries[3]):
+        assert sheet(summary["output"], "Ano Passado")["Id"].tolist() == ["1"]
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from writers import HIGHLIGHTED_SHEETS, OUTPUT_WRITERS
+
+SHEETS = {
+    "Ano Passado": pd.DataFrame({"Id": ["1", "2", "3"], "Resultado": [1.5, 2.0, 9.25]}),
+    "Pagamento Incompleto": pd.DataFrame(
+        {"Id": ["4", "5", "6"], "Resultado": [-2.0, -1.5, -0.75]}
+    ),
+    "Hist Diferente de 20 e 133": pd.DataFrame(
+        {"Hist": [7, 8], "Valor": [10.0, None], "Id": ["7", None]}
+    ),
+    "Pagamento Completo": pd.DataFrame({"Id": [], "Resultado": []}),
+}
+HIGHLIGHTED = 2
+
+
+def _read_folder(output, extension, read):
+    return {
+        name: read(os.path.join(output, f"{name}.{extension}")) for name in SHEETS
+    }
+
+
+def _read_sqlite(output):
+    with sqlite3.connect(output) as connection:
+        sheets = {
+            name: pd.read_sql_query(f'SELECT * FROM "{name}"', connection)
+            for name in SHEETS
+        }
+    connection.close()
+    return sheets
+
+
+READERS = {
+    "xlsx": lambda output: pd.read_excel(output, sheet_name=None, dtype={"Id": str}),
+    "xlsx_stream": lambda output: pd.read_excel(
+        output, sheet_name=None, dtype={"Id": str}
+    ),
+    "csv": lambda output: _read_folder(
+        output, "csv", lambda path: pd.read_csv(path, sep=";", dtype={"Id": str})
+    ),
+    "parquet": lambda output: _read_folder(output, "parquet", pd.read_parquet),
+    "sqlite": _read_sqlite,
+}
+
+
+def test_every_writer_has_a_reader():
+    assert set(READERS) == set(OUTPUT_WRITERS)
+
+
+@pytest.mark.parametrize("output_format", sorted(READERS))
+def test_writers_save_the_same_sheets(tmp_path, output_format):
+    output = OUTPUT_WRITERS[output_format](
+        SHEETS, HIGHLIGHTED, str(tmp_path / "razao")
+    )
+    sheets = READERS[output_format](output)
+    assert list(sheets) == list(SHEETS)
+    for name, expected in SHEETS.items():
+        got = sheets[name]
+        assert got.columns.tolist() == expected.columns.tolist()
+        if expected.empty:
+            assert got.empty
+            continue
+        pd.testing.assert_frame_equal(
+            got.astype(object).where(got.notna(), None),
+            expected.astype(object).where(expected.notna(), None),
+            check_dtype=False,
+        )
+
+
+@pytest.mark.parametrize("output_format", ["xlsx", "xlsx_stream"])
+def test_excel_writers_bold_the_highlighted_rows(tmp_path, output_format):
+    output = OUTPUT_WRITERS[output_format](
+        SHEETS, HIGHLIGHTED, str(tmp_path / "razao")
+    )
+    workbook = openpyxl.load_workbook(output)
+    for name, data_frame in SHEETS.items():
+        worksheet = workbook[name]
+        bold = [
+            bool(worksheet.cell(row, 1).font.b)
+            for row in range(2, len(data_frame) + 2)
+        ]
+        expected = HIGHLIGHTED if name in HIGHLIGHTED_SHEETS else 0
+        assert bold == [row < expected for row in range(len(data_frame))]
+        # O cabeçalho é sempre negrito
+        assert worksheet.cell(1, 1).font.b
@@ -1,214 +1,733 @@
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import Callable, Dict, List, Optional, Union
 import os
-import errno
 import os.path
+import time
+import threading
+from contextlib import nullcontext
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from amounts import cents_to_values, to_cents, to_decimal_values
+from anomalies import (
+    ANOMALIES_COLUMNS,
+    DUPLICATE,
+    NEAR_DUPLICATE,
+    OUTLIER,
+    find_duplicates,
+    find_near_duplicates,
+    find_outliers,
+)
+from cache import (
+    CACHE_FOLDER,
+    PARSED_CACHE_FOLDER,
+    ParsedLedgerCache,
+    ResultCache,
+    file_digest,
+)
+from consolidated import PERIOD_COLUMN, ConsolidatedLedger, period_name
+from ids import IdExtractor
+from incremental import IncrementalStore
+from instrumentation import PROFILERS, RunReport
+from matching import SPLIT, TOLERANCE, match_subsets, match_within_tolerance
+from query import CATEGORY_COLUMN, ResultIndex
+from rules import NEXT_YEAR_KIND, OTHER_KIND, HistRules
+from writers import OUTPUT_WRITERS
+
+CSV_COLUMNS = ["Valor", "Hist", "Complemento"]
+# Categoria compilada das linhas listadas ("Hist" diferente e baldes)
+LISTED_KIND_COLUMN = "_kind"
+# Tipos explícitos da leitura do CSV: "Valor" é lido como texto e convertido
+# por to_decimal_values, com a mesma regra em qualquer bloco, e "Hist" como
+# float para aceitar células vazias (ver _hist_column)
+CSV_DTYPES = {"Valor": "str", "Hist": "float64", "Complemento": "str"}
+# Linhas por bloco na leitura completa, que não guarda o "Complemento" inteiro
+PARSE_BLOCK_ROWS = 200_000
+
+# Fração do tempo de leitura que a busca por anomalias pode usar (com um mínimo
+# em segundos, para arquivos pequenos); ao passar dela, as verificações
+# seguintes não são feitas
+ANOMALY_TIME_FRACTION = 0.25
+ANOMALY_MIN_SECONDS = 0.5
+
+# Configurações que não alteram o conteúdo do resultado (fora da chave do cache)
+_NON_RESULT_SETTINGS = (
+    "output_path",
+    "cache_size",
+    "parsed_cache_size",
+    "cache_directory",
+    "instrumented",
+    "profiler",
+)
+
+SIMILAR_VALUES_COLUMNS = [
+    "Id Positivo",
+    "Resultado Positivo",
+    "Id Negativo",
+    "Resultado Negativo",
+]
+GROUPED_PAYMENTS_COLUMNS = ["Grupo", "Tipo", "Id", "Resultado", "Diferença"]
+
+
+class ConciliationCancelled(Exception):
+    """Sinaliza que a conciliação foi interrompida pelo usuário."""
 
 
 class Conciliation:
     _input_path: List[str]
     _output_path: str
+    _hist_rules: HistRules
 
     def __init__(self):
         self._input_path = []
         self._output_path = ""
+        self._hist_rules = HistRules.default()
         self._data_frame = None
         self._different_hist = None
-        self._initial_data_frame = None
         self._completed_paid = None
         self._incomplete_payment = None
         self._last_year_payments = None
         self._next_year = None
         self._similar_values_df = None
+        self._grouped_payments = None
+        self._anomalies = None
+        self._id_totals = None
+        self._next_year_values = None
+        self._ledger = None
+        self._chunk_size = None
+        self._workers = 1
+        self._tolerance = 0
+        self._max_parts = 1
+        self._match_time_budget = 2.0
+        self._anomaly_detection = None
+        self._output_format = "xlsx"
+        self._id_extractor = IdExtractor()
+        self._cache_size = None
+        self._parsed_cache_size = None
+        self._cache_directory = None
+        self._incremental_store = None
+        self._incremental_touched_only = False
+        self._instrumented = False
+        self._profiler = None
+        self._report = None
+        self._progress = None
+        self._cancel_event = threading.Event()
+        self._rows_parsed = 0
+        self._rows_written = 0
 
-    def _load_and_process_data(self, file):
-        # Carrega o arquivo CSV e seleciona as colunas necessárias
-        self._data_frame = pd.read_csv(file, sep=";")
-        self._data_frame = self._data_frame.loc[:, ["Valor", "Hist", "Complemento"]]
+    def _load_and_process_data(self, file, keep_text=False):
+        if self._chunk_size and not keep_text:
+            self._load_in_chunks(file)
+            return
+        self._id_totals = None
+        self._next_year_values = None
 
-        # Filtra as linhas com valores de "Hist" diferentes de 133 e 20
-        self._different_hist = self._data_frame[
-            (self._data_frame["Hist"] != 133) & (self._data_frame["Hist"] != 20)
-        ]
+        blocks = None
+        cache = self._parsed_cache()
+        if cache is not None:
+            key = cache.key(file, self._id_extractor.patterns())
+            blocks = cache.get(key)
+            if blocks is None:
+                blocks = cache.put(key, self._parse_blocks(file))
+            else:
+                self._count("parsed_cache_hits", 1)
+        if blocks is None:
+            blocks = self._parse_blocks(file)
 
-        # Extrai IDs dos campos "Complemento"
-        self._data_frame["Id"] = self._data_frame["Complemento"].str.extract(
-            r"(\d+)", expand=False
-        )
-        formatted_id = self._data_frame["Complemento"].str.extract(
-            r"(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})", expand=False
+        # O "Complemento" só é mantido para as linhas listadas pelas regras de
+        # "Hist"; as demais ficam apenas com "Id", "Hist" e "Valor" (as
+        # consultas, com keep_text, mantêm o texto de todas as linhas)
+        frames = []
+        listed = []
+        next_year_values = []
+        for block in blocks:
+            rows, next_year = self._apply_hist_rules(block)
+            listed.append(rows)
+            next_year_values.append(next_year)
+            frames.append(block if keep_text else block.drop(columns="Complemento"))
+        if not frames:
+            raise ValueError(f"Arquivo sem linhas de lançamento: '{file}'")
+        self._data_frame = pd.concat(frames, ignore_index=True)
+        self._different_hist = pd.concat(listed, ignore_index=True)
+        # Os blocos mantêm "Hist" em float (mesmo tipo em todos, para o cache de
+        # leitura); o arquivo inteiro volta a inteiro se não houver vazios
+        self._data_frame["Hist"] = _hist_column(self._data_frame["Hist"])
+        self._different_hist["Hist"] = _hist_column(self._different_hist["Hist"])
+        self._next_year_values = np.concatenate(next_year_values)
+        del frames
+        self._rows_parsed = len(self._data_frame)
+
+        # "Id" categórico: cada texto é guardado uma vez e o agrupamento usa os códigos
+        self._data_frame["Id"] = self._data_frame["Id"].astype("category")
+
+    def _parse_blocks(self, file):
+        # Lê o CSV em blocos com as colunas necessárias e extrai o "Id" de cada um
+        reader = pd.read_csv(
+            file,
+            sep=";",
+            usecols=CSV_COLUMNS,
+            dtype=CSV_DTYPES,
+            chunksize=PARSE_BLOCK_ROWS,
         )
-        self._data_frame["Id"] = formatted_id.fillna(self._data_frame["Id"])
-        self._data_frame["Id"] = self._data_frame["Id"].fillna(
-            self._data_frame["Complemento"]
+        for block in reader:
+            self._check_cancelled()
+            block = block.loc[:, CSV_COLUMNS]
+            block["Valor"] = to_decimal_values(block["Valor"])
+
+            # Extrai IDs dos campos "Complemento"
+            block["Id"] = self._extract_ids(block["Complemento"])
+            yield block
+
+    def _cache_root(self):
+        # Pasta dos caches: a indicada em set_cache_directory ou a pasta de saída
+        return self._cache_directory or self._output_path
+
+    def _parsed_cache(self):
+        # Cache das colunas lidas do CSV; None quando desativado ou sem pyarrow
+        if not self._parsed_cache_size or not ParsedLedgerCache.available():
+            return None
+        return ParsedLedgerCache(
+            os.path.join(self._cache_root(), PARSED_CACHE_FOLDER),
+            self._parsed_cache_size,
         )
 
-        self._initial_data_frame = self._data_frame.copy()
+    def _load_in_chunks(self, file):
+        # Lê o CSV em blocos, acumulando apenas a soma por "Id", os valores de
+        # "Próximo Ano" e as linhas listadas; a "Planilha Limpa" não é gerada
+        self._data_frame = None
+        totals = None
+        listed = []
+        next_year_values = []
+        self._rows_parsed = 0
 
-        # Calcula o valor assinado com base no campo "Hist"
-        self._data_frame["signed_value"] = self._data_frame.apply(
-            lambda row: (
-                row["Valor"] * -1
-                if row["Hist"] == 20
-                else row["Valor"] * 1 if row["Hist"] == 133 else row["Valor"]
-            ),
-            axis=1,
+        reader = pd.read_csv(
+            file,
+            sep=";",
+            usecols=CSV_COLUMNS,
+            dtype=CSV_DTYPES,
+            chunksize=self._chunk_size,
         )
+        for chunk in reader:
+            self._check_cancelled()
+            chunk = chunk.loc[:, CSV_COLUMNS]
+            chunk["Valor"] = to_decimal_values(chunk["Valor"])
+            chunk["Hist"] = _hist_column(chunk["Hist"])
+            chunk["Id"] = self._extract_ids(chunk["Complemento"])
+            rows, next_year = self._apply_hist_rules(chunk)
+            listed.append(rows)
+            next_year_values.append(np.unique(next_year))
+
+            partial = chunk.groupby("Id")["signed_cents"].sum()
+            self._count("groupby_groups", len(partial))
+            totals = partial if totals is None else totals.add(partial, fill_value=0)
+            self._rows_parsed += len(chunk)
+            self._emit("rows_parsed", file, rows=self._rows_parsed)
 
-    def _calculate_results(self):
-        # Agrupa os dados pelo campo "Id" e calcula a soma dos valores assinados
-        result = (
-            self._data_frame.groupby("Id")["signed_value"]
-            .sum()
-            .reset_index(name="Resultado")
+        if totals is None:
+            raise ValueError(f"Arquivo sem linhas de lançamento: '{file}'")
+        self._id_totals = totals.astype("int64").rename_axis("Id")
+        self._next_year_values = np.unique(np.concatenate(next_year_values))
+        self._different_hist = pd.concat(listed, ignore_index=True)
+
+    def _apply_hist_rules(self, block):
+        # Uma única classificação do bloco dá o sinal de cada linha, as linhas
+        # listadas ("Hist" diferente e baldes) e os valores de "Próximo Ano"
+        kinds, signs = self._hist_rules.classify(block["Hist"])
+        block["signed_cents"] = to_cents(block["Valor"]) * signs
+        listed = kinds >= OTHER_KIND
+        rows = block.loc[listed, CSV_COLUMNS]
+        rows[LISTED_KIND_COLUMN] = kinds[listed]
+        next_year = block["signed_cents"].to_numpy()[kinds == NEXT_YEAR_KIND]
+        return rows, next_year
+
+    def _listed_sheets(self):
+        # Separa as linhas listadas na aba de "Hist" diferente e nas dos baldes
+        kinds = self._different_hist[LISTED_KIND_COLUMN].to_numpy()
+        rows = self._different_hist.drop(columns=LISTED_KIND_COLUMN)
+        return {
+            name: rows[kinds == kind].reset_index(drop=True)
+            for kind, name in self._hist_rules.listed_sheets().items()
+        }
+
+    def _extract_ids(self, complemento):
+        # Usa o CNPJ formatado quando presente, senão o primeiro número, senão o texto
+        self._count("regex_rows", len(complemento))
+        return self._id_extractor.extract(complemento)
+
+    def _group_totals(self):
+        # Agrupa os dados pelo campo "Id" e soma os centavos assinados (soma exata)
+        if self._id_totals is None:
+            ids = self._data_frame["Id"]
+            self._id_totals = self._data_frame.groupby("Id", observed=True)[
+                "signed_cents"
+            ].sum()
+            # Os resultados por "Id" usam o texto, não a categoria
+            self._id_totals.index = self._id_totals.index.astype(
+                ids.cat.categories.dtype
+            )
+            self._count("groupby_groups", len(self._id_totals))
+
+    def _calculate_results(self, file=None):
+        self._group_totals()
+        if self._incremental_store:
+            # Aplica o lote ao estado persistido e lê os saldos acumulados; o
+            # hash do arquivo impede que o mesmo lote seja somado duas vezes
+            digest = file_digest(file) if file is not None else None
+            with IncrementalStore(self._incremental_store) as store:
+                store.apply(self._id_totals, self._next_year_values, digest)
+                result, next_year_candidates = store.results(
+                    self._incremental_touched_only
+                )
+        else:
+            result, next_year_candidates = self._results_from_totals(
+                self._id_totals, self._next_year_values
+            )
+        self._split_results(result, next_year_candidates)
+
+    @staticmethod
+    def _results_from_totals(totals, next_year_values):
+        # "_cents" acompanha os resultados e é removida na gravação
+        result = totals.rename_axis("Id").reset_index(name="_cents")
+        result["Resultado"] = cents_to_values(result["_cents"])
+        return result, result["_cents"].isin(next_year_values)
+
+    def _split_results(self, result, next_year_candidates):
+        # Separa os resultados em três categorias (comparações exatas em centavos);
+        # cada categoria é ordenada uma única vez
+        cents = result["_cents"].to_numpy()
+        self._completed_paid = result[cents == 0]
+        self._last_year_payments = result[cents > 0].sort_values(by="Resultado")
+        self._incomplete_payment = result[cents < 0].sort_values(by="Resultado")
+        # Adiciona a nova categoria next_year
+        with self._stage("match") as stage:
+            self._similar_values_df = self._find_similar_values(
+                self._last_year_payments, self._incomplete_payment
+            )
+            stage["rows_in"] = len(self._last_year_payments) + len(
+                self._incomplete_payment
+            )
+            stage["rows_out"] = len(self._similar_values_df)
+        self._count("match_pairs", len(self._similar_values_df))
+        # Separa next_year de incomplete_payment com uma única máscara, mantendo
+        # a ordem já calculada
+        next_year = next_year_candidates.loc[
+            self._incomplete_payment.index
+        ].to_numpy() & ~_isin_ids(
+            self._incomplete_payment["Id"], self._similar_values_df["Id Negativo"]
         )
-        # Ajusta os resultados próximos de zero para zero
-        result["Resultado"] = np.where(
-            result["Resultado"].abs() < 1e-10, 0, result["Resultado"].round(10)
+        self._next_year = self._incomplete_payment[next_year]
+        self._incomplete_payment = self._incomplete_payment[~next_year]
+        if self._matching_enabled():
+            with self._stage("group_match") as stage:
+                self._grouped_payments = self._find_grouped_payments()
+                stage["rows_in"] = len(self._last_year_payments) + len(
+                    self._incomplete_payment
+                )
+                stage["rows_out"] = len(self._grouped_payments)
+            # Remove os "Id" agrupados de last_year_payments e incomplete_payment
+            grouped = self._grouped_payments["Id"]
+            self._last_year_payments = self._last_year_payments[
+                ~_isin_ids(self._last_year_payments["Id"], grouped)
+            ]
+            self._incomplete_payment = self._incomplete_payment[
+                ~_isin_ids(self._incomplete_payment["Id"], grouped)
+            ]
+        else:
+            self._grouped_payments = None
+
+    def _find_similar_values(self, last_year_payment, incomplete_payment):
+        # Encontra valores semelhantes entre as listas de resultados positivos e negativos
+        # Os valores são indexados em centavos inteiros e pareados um-para-um: o
+        # k-ésimo positivo de um valor é associado ao k-ésimo negativo de mesmo módulo
+        positive = self._match_keys(last_year_payment).rename(
+            columns={"Id": "Id Positivo", "Resultado": "Resultado Positivo"}
         )
-        # Separa os resultados em três categorias
-        self._completed_paid = result[result["Resultado"] == 0]
-        self._last_year_payments = result[result["Resultado"] > 0].sort_values(
-            by="Resultado"
+        negative = self._match_keys(incomplete_payment).rename(
+            columns={"Id": "Id Negativo", "Resultado": "Resultado Negativo"}
         )
-        self._incomplete_payment = result[result["Resultado"] < 0].sort_values(
-            by="Resultado"
+        similar_values_df = positive.merge(
+            negative, on=["_cents", "_rank"], how="inner", sort=False
         )
-        # Adiciona a nova categoria next_year
-        self._similar_values_df = self._find_similar_values(
-            self._last_year_payments, self._incomplete_payment
+        similar_values_df = similar_values_df[SIMILAR_VALUES_COLUMNS].sort_values(
+            by="Resultado Positivo", kind="stable"
         )
-        self._next_year = self._incomplete_payment[
-            self._incomplete_payment["Resultado"].isin(
-                self._data_frame[self._data_frame["Hist"] == 20]["signed_value"]
+        return similar_values_df
+
+    def _matching_enabled(self):
+        return self._tolerance > 0 or self._max_parts > 1
+
+    def _find_grouped_payments(self):
+        # Agrupa os saldos em aberto que sobraram do pareamento exato: pares com
+        # diferença dentro da tolerância e saldos quitados em várias parcelas
+        positive = self._last_year_payments[
+            ~_isin_ids(
+                self._last_year_payments["Id"], self._similar_values_df["Id Positivo"]
             )
-            & ~self._incomplete_payment["Id"].isin(
-                self._similar_values_df["Id Negativo"]
+        ]
+        negative = self._incomplete_payment[
+            ~_isin_ids(
+                self._incomplete_payment["Id"], self._similar_values_df["Id Negativo"]
             )
-        ].sort_values(by="Resultado")
-        # Remove os valores de next_year de incomplete_payment
-        self._incomplete_payment = self._incomplete_payment[
-            ~self._incomplete_payment["Id"].isin(self._next_year["Id"])
         ]
+        positive_cents = positive["_cents"].to_numpy(dtype="int64")
+        negative_cents = -negative["_cents"].to_numpy(dtype="int64")
+        free_positive = np.ones(len(positive), dtype=bool)
+        free_negative = np.ones(len(negative), dtype=bool)
+        groups = []
 
-    def _find_similar_values(self, last_year_payment, incomplete_payment):
-        # Encontra valores semelhantes entre as listas de resultados positivos e negativos
-        similar_ids = []
-        for idx, row in last_year_payment.iterrows():
-            opposite_row = incomplete_payment[
-                incomplete_payment["Resultado"].abs() == abs(row["Resultado"])
-            ]
-            if not opposite_row.empty:
-                similar_ids.append(
-                    {
-                        "Id Positivo": row["Id"],
-                        "Resultado Positivo": row["Resultado"],
-                        "Id Negativo": opposite_row.iloc[0]["Id"],
-                        "Resultado Negativo": opposite_row.iloc[0]["Resultado"],
-                    }
+        if self._tolerance > 0:
+            for p, n in match_within_tolerance(
+                positive_cents, negative_cents, self._tolerance
+            ):
+                groups.append((TOLERANCE, [p], [n]))
+                free_positive[p] = free_negative[n] = False
+
+        if self._max_parts > 1:
+            # O tempo limite é dividido entre as duas direções (um positivo
+            # quitado por vários negativos e um negativo coberto por vários positivos)
+            deadline = time.monotonic() + self._match_time_budget
+            for target_is_positive in (True, False):
+                open_positive = np.flatnonzero(free_positive)
+                open_negative = np.flatnonzero(free_negative)
+                targets, parts = (
+                    (open_positive, open_negative)
+                    if target_is_positive
+                    else (open_negative, open_positive)
                 )
-        similar_values_df = pd.DataFrame(similar_ids).sort_values(
-            by="Resultado Positivo"
+                target_cents, part_cents = (
+                    (positive_cents, negative_cents)
+                    if target_is_positive
+                    else (negative_cents, positive_cents)
+                )
+                remaining = deadline - time.monotonic()
+                budget = remaining / 2 if target_is_positive else remaining
+                found = match_subsets(
+                    target_cents[targets],
+                    part_cents[parts],
+                    self._max_parts,
+                    self._tolerance,
+                    max(budget, 0.0),
+                )
+                for target, members in found:
+                    target, members = int(targets[target]), parts[members].tolist()
+                    if target_is_positive:
+                        groups.append((SPLIT, [target], members))
+                        free_positive[target] = False
+                        free_negative[members] = False
+                    else:
+                        groups.append((SPLIT, members, [target]))
+                        free_negative[target] = False
+                        free_positive[members] = False
+
+        self._count("grouped_payments", len(groups))
+        if not groups:
+            return pd.DataFrame([], columns=GROUPED_PAYMENTS_COLUMNS)
+        # Junta as posições de todos os grupos e monta a aba com uma única
+        # seleção; os negativos vêm depois dos positivos na tabela combinada
+        columns = ["Id", "Resultado", "_cents"]
+        both = pd.concat([positive[columns], negative[columns]], ignore_index=True)
+        rows, numbers, kinds = [], [], []
+        for number, (kind, positions, negatives) in enumerate(groups, start=1):
+            members = [*positions, *(len(positive) + n for n in negatives)]
+            rows += members
+            numbers += [number] * len(members)
+            kinds += [kind] * len(members)
+        members = both.take(rows)
+        numbers = np.array(numbers, dtype="int64")
+        group_cents = np.zeros(len(groups) + 1, dtype="int64")
+        np.add.at(group_cents, numbers, members["_cents"].to_numpy(dtype="int64"))
+        return pd.DataFrame(
+            {
+                "Grupo": numbers,
+                "Tipo": kinds,
+                "Id": members["Id"].to_numpy(),
+                "Resultado": members["Resultado"].to_numpy(),
+                "Diferença": cents_to_values(group_cents[numbers]),
+            }
+        )
+
+    @staticmethod
+    def _match_keys(results):
+        # Gera a chave de pareamento (valor absoluto em centavos, ocorrência do valor)
+        keys = results.loc[:, ["Id", "Resultado", "_cents"]]
+        keys["_cents"] = np.abs(keys["_cents"].to_numpy())
+        keys["_rank"] = keys.groupby("_cents", sort=False).cumcount()
+        return keys
+
+    def _save_to_excel(self, input_file, additional_sheets=None):
+        # Coloca os valores semelhantes no topo; "Pagamento Incompleto" fica em
+        # ordem decrescente
+        self._last_year_payments = self._highlighted_first(
+            self._last_year_payments, self._similar_values_df["Id Positivo"]
+        )
+        self._incomplete_payment = self._highlighted_first(
+            self._incomplete_payment,
+            self._similar_values_df["Id Negativo"],
+            descending=True,
         )
-        return similar_values_df
 
-    def _save_to_excel(self, input_file):
-        # Reseta os índices dos DataFrames
-        self._completed_paid.reset_index(drop=True, inplace=True)
-        self._last_year_payments.reset_index(drop=True, inplace=True)
-        self._incomplete_payment.reset_index(drop=True, inplace=True)
-        self._different_hist.reset_index(drop=True, inplace=True)
-        self._similar_values_df.reset_index(drop=True, inplace=True)
-        self._initial_data_frame.reset_index(drop=True, inplace=True)
-        # Adiciona flag para destacar os valores semelhantes
-        self._last_year_payments["Highlight"] = self._last_year_payments["Id"].isin(
-            self._similar_values_df["Id Positivo"]
-        )
-        self._incomplete_payment["Highlight"] = self._incomplete_payment["Id"].isin(
-            self._similar_values_df["Id Negativo"]
-        )
-
-        # Ordena colocando os destacados no topo
-        self._last_year_payments = self._last_year_payments.sort_values(
-            by=["Highlight", "Resultado"], ascending=[False, True]
-        ).drop(columns=["Highlight"])
-        self._incomplete_payment = self._incomplete_payment.sort_values(
-            by=["Highlight", "Resultado"], ascending=[False, False]
-        ).drop(columns=["Highlight"])
+        sheets = {
+            "Ano Passado": self._last_year_payments,
+            "Pagamento Incompleto": self._incomplete_payment,
+            "Próximo Ano": self._next_year,
+            **self._listed_sheets(),
+            "Pagamento Completo": self._completed_paid,
+        }
+        if self._grouped_payments is not None:
+            sheets["Pagamentos Agrupados"] = self._grouped_payments
+        if self._anomalies is not None:
+            sheets["Anomalias"] = self._anomalies
+        sheets.update(additional_sheets or {})
+        if self._data_frame is not None:
+            sheets["Planilha Limpa"] = self._clean_sheet()
+        # Remove a coluna auxiliar de centavos das abas por "Id"
+        sheets = {
+            name: sheet.drop(columns="_cents") if "_cents" in sheet else sheet
+            for name, sheet in sheets.items()
+        }
 
         # Garante que o diretório de saída exista
         os.makedirs(self._output_path, exist_ok=True)
+        output_base = self._output_base(input_file)
+
+        # Os valores semelhantes ficam no topo de "Ano Passado" e "Pagamento Incompleto"
+        writer = OUTPUT_WRITERS[self._output_format]
+        self._rows_written = sum(len(sheet) for sheet in sheets.values())
+        self._count("rows_written", self._rows_written)
+        return writer(sheets, len(self._similar_values_df), output_base)
 
-        # Extrai o nome do arquivo de entrada sem a extensão
+    @staticmethod
+    def _highlighted_first(sheet, similar_ids, descending=False):
+        # Partição estável: os "Id" pareados vão para o topo sem reordenar os demais
+        if descending:
+            # Inverte a ordem crescente mantendo os empates na ordem original
+            sheet = sheet.iloc[np.argsort(-sheet["_cents"].to_numpy(), kind="stable")]
+        highlight = _isin_ids(sheet["Id"], similar_ids)
+        order = np.concatenate([np.flatnonzero(highlight), np.flatnonzero(~highlight)])
+        return sheet.iloc[order].reset_index(drop=True)
+
+    def _clean_sheet(self):
+        # "Planilha Limpa": as linhas lidas ordenadas por "Id", sem o "Complemento";
+        # a ordem vem dos códigos da categoria, sem comparar textos. Linhas sem
+        # "Id" (código -1) vão para o fim, como na ordenação pelo texto
+        ids = self._data_frame["Id"].cat
+        codes = ids.codes.to_numpy()
+        order = np.argsort(
+            np.where(codes < 0, len(ids.categories), codes), kind="stable"
+        )
+        clean = self._data_frame[["Hist", "Valor"]].take(order).reset_index(drop=True)
+        clean.insert(
+            0,
+            "Id",
+            ids.categories.take(codes[order], allow_fill=True, fill_value=np.nan),
+        )
+        return clean
+
+    def _output_base(self, input_file):
+        # Caminho de saída com o nome do arquivo de entrada, sem a extensão
         input_filename = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = f"{self._output_path}/{input_filename}.xlsx"
-
-        # Verifica se o arquivo de saída está acessível
-        if os.path.exists(output_file):
-            try:
-                os.rename(output_file, output_file)
-            except OSError as e:
-                if e.errno == errno.EACCES:
-                    raise PermissionError(f"Permission denied: '{output_file}'")
-
-        self._initial_data_frame = self._initial_data_frame.sort_values(by=["Id"]).drop(
-            columns=["Complemento"]
-        )
-        new_order = ["Id", "Hist", "Valor"]
-        self._initial_data_frame = self._initial_data_frame[new_order]
-        # Salva os resultados em um arquivo Excel
-        with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
-            self._last_year_payments.to_excel(
-                writer, sheet_name="Ano Passado", index=False
-            )
-            self._incomplete_payment.to_excel(
-                writer, sheet_name="Pagamento Incompleto", index=False
-            )
-            self._next_year.to_excel(writer, sheet_name="Próximo Ano", index=False)
-            self._different_hist.to_excel(
-                writer, sheet_name="Hist Diferente de 20 e 133", index=False
-            )
-            self._completed_paid.to_excel(
-                writer, sheet_name="Pagamento Completo", index=False
+        return f"{self._output_path}/{input_filename}"
+
+    def _result(self, file):
+        # Executa o processo de conciliação para um arquivo
+        self._check_cancelled()
+        self._emit("file_started", file)
+        if self._cache_size and not self._incremental_store:
+            cache = ResultCache(
+                os.path.join(self._cache_root(), CACHE_FOLDER), self._cache_size
             )
-            self._initial_data_frame.to_excel(
-                writer, sheet_name="Planilha Limpa", index=False
+            settings = self._settings()
+            for name in _NON_RESULT_SETTINGS:
+                del settings[name]
+            key = cache.key(file, settings)
+            os.makedirs(self._output_path, exist_ok=True)
+            output = cache.get(key, self._output_base(file))
+            if output is not None:
+                self._emit("written", file, output=output, cached=True)
+                return output
+            output = self._reconcile(file)
+            cache.put(key, output)
+            return output
+        return self._reconcile(file)
+
+    def _reconcile(self, file):
+        self._report = RunReport(file, self._profiler) if self._instrumented else None
+        if self._report is not None:
+            self._report.start_profiler()
+        try:
+            load_start = time.perf_counter()
+            with self._stage("load") as stage:
+                self._load_and_process_data(file)
+                stage["rows_in"] = stage["rows_out"] = self._rows_parsed
+            load_time = time.perf_counter() - load_start
+            self._emit("rows_parsed", file, rows=self._rows_parsed)
+            self._check_cancelled()
+            self._anomalies = None
+            if self._anomaly_detection and self._data_frame is not None:
+                with self._stage("anomalies") as stage:
+                    self._anomalies = self._find_anomalies(
+                        max(load_time * ANOMALY_TIME_FRACTION, ANOMALY_MIN_SECONDS)
+                    )
+                    stage["rows_in"] = self._rows_parsed
+                    stage["rows_out"] = len(self._anomalies)
+                self._check_cancelled()
+            with self._stage("calculate") as stage:
+                self._calculate_results(file)
+                stage["rows_in"] = self._rows_parsed
+                stage["rows_out"] = len(self._id_totals)
+            self._emit("matched", file, matches=len(self._similar_values_df))
+            self._check_cancelled()
+            with self._stage("save") as stage:
+                output = self._save_to_excel(file)
+                stage["rows_in"] = stage["rows_out"] = self._rows_written
+        finally:
+            if self._report is not None:
+                self._report.stop_profiler(f"{self._output_base(file)}.prof")
+        if self._report is not None:
+            self._report.save(f"{self._output_base(file)}.report.json")
+        self._emit("written", file, output=output, cached=False)
+        return output
+
+    def _find_anomalies(self, time_budget):
+        # Procura linhas repetidas, quase repetidas e valores atípicos. As
+        # repetidas são sempre verificadas; cada verificação seguinte só começa
+        # se, custando o mesmo que a anterior, terminar dentro do tempo
+        tolerance, threshold, min_lines = self._anomaly_detection
+        codes = self._data_frame["Id"].cat.codes.to_numpy()
+        hist = self._data_frame["Hist"].to_numpy()
+        cents = self._data_frame["signed_cents"].to_numpy()
+
+        def duplicates():
+            rows, groups = find_duplicates(codes, hist, cents)
+            sizes = np.bincount(groups)[groups] if len(groups) else groups
+            return rows, groups, _labels("{} ocorrências", sizes)
+
+        def near_duplicates():
+            rows, groups, spans = find_near_duplicates(codes, hist, cents, tolerance)
+            spans = cents_to_values(spans)
+            return rows, groups, _labels("Amplitude: {:.2f}", spans)
+
+        def outliers():
+            rows, groups, scores, medians = find_outliers(
+                codes, cents, threshold, min_lines
             )
+            details = [
+                f"Mediana: {median:.2f}; escore: {score:.1f}"
+                for median, score in zip(cents_to_values(medians), scores)
+            ]
+            return rows, groups, details
 
-            workbook = writer.book
-            font_format = workbook.add_format({"font_size": 14})
-            bold_format = workbook.add_format({"font_size": 14, "bold": True})
-
-            for sheet_name in writer.sheets:
-                worksheet = writer.sheets[sheet_name]
-                worksheet.set_column(
-                    "A:Z", None, font_format
-                )  # Define o tamanho da fonte para as células
-                # Determine o número de colunas baseado no DataFrame
-                sheet_values = self._last_year_payments.columns.values
-                if sheet_name == "Hist Diferente de 20 e 133":
-                    sheet_values = self._different_hist.columns.values
-                elif sheet_name == "Planilha Limpa":
-                    sheet_values = self._initial_data_frame.columns.values
-                for col_num, value in enumerate(sheet_values):
-                    worksheet.write(
-                        0, col_num, value, bold_format
-                    )  # Cabeçalhos com negrito e tamanho definido
-
-            # Adiciona negrito para IDs semelhantes em "Valores Semelhantes"
-            worksheet_last_year_payments = writer.sheets["Ano Passado"]
-            worksheet_incomplete_payment = writer.sheets["Pagamento Incompleto"]
-            for idx, row in self._similar_values_df.iterrows():
-                if row["Id Positivo"] in self._last_year_payments["Id"].values:
-                    worksheet_last_year_payments.set_row(idx + 1, None, bold_format)
-                    worksheet_incomplete_payment.set_row(idx + 1, None, bold_format)
+        deadline = time.perf_counter() + time_budget
+        cost = 0.0
+        found = []
+        for kind, counter, check in (
+            (DUPLICATE, "duplicate_rows", duplicates),
+            (NEAR_DUPLICATE, "near_duplicate_rows", near_duplicates),
+            (OUTLIER, "outlier_rows", outliers),
+        ):
+            start = time.perf_counter()
+            if found and start + cost > deadline:
+                self._count("anomaly_checks_skipped", 1)
+                continue
+            rows, groups, details = check()
+            cost = time.perf_counter() - start
+            found.append((kind, rows, groups, details))
+            self._count(counter, len(rows))
 
-    def _result(self, file):
-        # Executa o processo de conciliação para um arquivo
+        # Linhas já ordenadas por grupo e posição; "Linha" 1 é o primeiro
+        # lançamento após o cabeçalho, como na consulta
+        kinds, rows, groups, details = zip(*found)
+        sizes = [len(kind_rows) for kind_rows in rows]
+        rows = np.concatenate(rows)
+        ids = self._data_frame["Id"].cat.categories
+        return pd.DataFrame(
+            {
+                "Tipo": np.repeat(np.array(kinds, dtype=object), sizes),
+                "Grupo": np.concatenate(groups) + 1,
+                "Id": ids.take(codes[rows], allow_fill=True, fill_value=np.nan),
+                "Linha": rows + 1,
+                "Hist": hist[rows],
+                "Valor": self._data_frame["Valor"].to_numpy()[rows],
+                "Detalhe": np.concatenate(
+                    [np.asarray(kind_details, dtype=object) for kind_details in details]
+                ),
+            },
+            columns=ANOMALIES_COLUMNS,
+        )
+
+    def _load_period(self, file):
+        # Carrega um período da consolidação, mantendo só as somas por "Id"
+        self._check_cancelled()
+        self._emit("file_started", file)
         self._load_and_process_data(file)
-        self._calculate_results()
-        self._save_to_excel(file)
+        self._group_totals()
+        self._emit("rows_parsed", file, rows=self._rows_parsed)
+        different_hist = self._different_hist.copy()
+        different_hist.insert(0, PERIOD_COLUMN, period_name(file))
+        return self._id_totals, np.unique(self._next_year_values), different_hist
+
+    def _stage(self, name):
+        # Mede a etapa no relatório de execução; sem relatório, não faz nada
+        if self._report is None:
+            return nullcontext({})
+        return self._report.stage(name)
+
+    def _count(self, name, amount):
+        if self._report is not None:
+            self._report.count(name, amount)
+
+    def _emit(self, event, file, **data):
+        # Envia um evento de progresso ao callback registrado, se houver
+        if self._progress is not None:
+            self._progress({"event": event, "file": file, **data})
+
+    def _check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise ConciliationCancelled()
+
+    def _settings(self):
+        # Configuração necessária para reproduzir a conciliação em outro processo
+        return {
+            "output_path": self._output_path,
+            "hist_rules": self._hist_rules.to_dict(),
+            "chunk_size": self._chunk_size,
+            "matching": (self._tolerance, self._max_parts, self._match_time_budget),
+            "anomalies": self._anomaly_detection,
+            "output_format": self._output_format,
+            "id_patterns": self._id_extractor.patterns(),
+            "cache_size": self._cache_size,
+            "parsed_cache_size": self._parsed_cache_size,
+            "cache_directory": self._cache_directory,
+            "incremental_store": self._incremental_store,
+            "incremental_touched_only": self._incremental_touched_only,
+            "instrumented": self._instrumented,
+            "profiler": self._profiler,
+        }
+
+    @classmethod
+    def _from_settings(cls, settings):
+        conciliation = cls()
+        conciliation.set_output(settings["output_path"])
+        conciliation.set_hist_rules(HistRules.from_dict(settings["hist_rules"]))
+        conciliation.set_chunk_size(settings["chunk_size"])
+        conciliation.set_matching(*settings["matching"])
+        if settings["anomalies"]:
+            conciliation.set_anomaly_detection(True, *settings["anomalies"])
+        conciliation.set_output_format(settings["output_format"])
+        conciliation._id_extractor = IdExtractor(settings["id_patterns"])
+        conciliation.set_cache(settings["cache_size"])
+        conciliation.set_parsed_cache(settings["parsed_cache_size"])
+        conciliation.set_cache_directory(settings["cache_directory"])
+        conciliation.set_incremental_store(
+            settings["incremental_store"], settings["incremental_touched_only"]
+        )
+        conciliation.set_instrumentation(settings["instrumented"], settings["profiler"])
+        return conciliation
 
     def set_output(self, new_directory: str):
         """
@@ -219,15 +738,533 @@ class Conciliation:
         """
         self._output_path = new_directory
 
-    def new_conciliation(self, input_path: List[str]):
+    def set_hist_signs(self, hist_signs: Dict[int, int]):
+        """
+        Define o sinal aplicado ao "Valor" para cada código "Hist".
+
+        Parâmetros:
+        hist_signs (Dict[int, int]): Mapeamento de código "Hist" para -1 ou 1.
+        Códigos ausentes do mapeamento mantêm o valor original.
+        """
+        self._hist_rules = self._hist_rules.with_signs(hist_signs)
+
+    def set_hist_rules(self, rules: Union[HistRules, str]):
+        """
+        Define as regras de "Hist": o sinal de cada código, os códigos de
+        "Próximo Ano", os listados na aba de "Hist" diferente e as abas
+        personalizadas (baldes). Ver rules.HistRules para o formato do arquivo.
+
+        Parâmetros:
+        rules (Union[HistRules, str]): As regras ou o caminho de um arquivo
+        JSON de regras.
+        """
+        self._hist_rules = HistRules.load(rules) if isinstance(rules, str) else rules
+
+    def set_chunk_size(self, chunk_size: Optional[int]):
+        """
+        Ativa a leitura em blocos do CSV, mantendo o uso de memória constante.
+
+        No modo em blocos apenas as somas por "Id" são mantidas em memória e a
+        aba "Planilha Limpa" não é gerada.
+
+        Parâmetros:
+        chunk_size (Optional[int]): Quantidade de linhas por bloco, ou None para
+        carregar o arquivo inteiro.
+        """
+        self._chunk_size = chunk_size
+
+    def set_matching(
+        self, tolerance_cents: int = 0, max_parts: int = 1, time_budget: float = 2.0
+    ):
+        """
+        Ativa o agrupamento dos saldos em aberto que não têm par exato.
+
+        Depois do pareamento exato, positivos e negativos cujos módulos diferem
+        no máximo pela tolerância (ex.: tarifas bancárias) são pareados, e
+        saldos quitados em até max_parts parcelas do lado oposto são agrupados.
+        Os "Id" agrupados saem de "Ano Passado" e "Pagamento Incompleto" e vão
+        para a aba "Pagamentos Agrupados", com o número do grupo, o tipo
+        ("Tolerância" ou "Parcelado") e a diferença que sobrou no grupo.
+
+        Parâmetros:
+        tolerance_cents (int): Diferença máxima aceita, em centavos.
+        max_parts (int): Quantidade máxima de parcelas por saldo; 1 desativa a
+        busca por parcelas.
+        time_budget (float): Tempo máximo, em segundos, da busca por parcelas
+        em cada arquivo; ao atingi-lo, ficam só os grupos já encontrados.
+        """
+        if tolerance_cents < 0 or max_parts < 1:
+            raise ValueError("Tolerância e quantidade de parcelas inválidas")
+        self._tolerance = int(tolerance_cents)
+        self._max_parts = int(max_parts)
+        self._match_time_budget = float(time_budget)
+
+    def set_anomaly_detection(
+        self,
+        enabled: bool,
+        tolerance_cents: int = 100,
+        threshold: float = 3.5,
+        min_lines: int = 5,
+    ):
+        """
+        Ativa a busca por anomalias nas linhas do razão, listadas na aba
+        "Anomalias".
+
+        São procuradas linhas repetidas (mesmo "Id", "Hist" e "Valor"), linhas
+        quase repetidas (mesmo "Id" e "Hist" e valores próximos) e valores
+        atípicos dentro de cada "Id", pelo escore robusto da mediana. A busca
+        usa no máximo ANOMALY_TIME_FRACTION do tempo de leitura do arquivo (ou
+        ANOMALY_MIN_SECONDS, se maior): as repetidas são sempre verificadas, e
+        as verificações seguintes são puladas quando o tempo acaba, o que fica
+        registrado no contador "anomaly_checks_skipped" do relatório. Não se
+        aplica à leitura em blocos nem à consolidação, que não mantêm as linhas
+        em memória.
+
+        Parâmetros:
+        enabled (bool): Faz ou não a busca.
+        tolerance_cents (int): Maior diferença, em centavos, entre valores
+        vizinhos de linhas quase repetidas; 0 desativa essa verificação.
+        threshold (float): Escore a partir do qual um valor é atípico.
+        min_lines (int): Quantidade mínima de linhas de um "Id" para procurar
+        valores atípicos nele.
+        """
+        if tolerance_cents < 0 or threshold <= 0 or min_lines < 1:
+            raise ValueError("Parâmetros da busca por anomalias inválidos")
+        self._anomaly_detection = (
+            (int(tolerance_cents), float(threshold), int(min_lines))
+            if enabled
+            else None
+        )
+
+    def set_output_format(self, output_format: str):
+        """
+        Define o formato dos arquivos de resultado.
+
+        Parâmetros:
+        output_format (str): Um dos formatos de writers.OUTPUT_WRITERS: "xlsx"
+        (padrão), "xlsx_stream" (Excel gravado em fluxo, para planilhas
+        grandes), "csv", "parquet" ou "sqlite".
+        """
+        if output_format not in OUTPUT_WRITERS:
+            raise ValueError(f"Formato de saída desconhecido: '{output_format}'")
+        self._output_format = output_format
+
+    def add_id_pattern(self, name: str, expression: str, priority: int = 50):
+        """
+        Registra um padrão adicional para extrair o "Id" do "Complemento".
+
+        Parâmetros:
+        name (str): Nome do padrão (ex.: "cpf").
+        expression (str): Expressão regular do "Id" (ex.: ids.CPF_PATTERN).
+        priority (int): Precedência; o CNPJ usa 10 e o número genérico 100.
+        """
+        self._id_extractor.add_pattern(name, expression, priority)
+
+    def set_cache(self, max_bytes: Optional[int]):
+        """
+        Ativa o cache de resultados na pasta de saída.
+
+        Um arquivo já conciliado com o mesmo conteúdo e as mesmas configurações
+        tem o resultado anterior restaurado sem reprocessamento. As entradas
+        menos usadas são removidas quando o cache passa do limite.
+
+        Parâmetros:
+        max_bytes (Optional[int]): Tamanho máximo do cache em bytes, ou None
+        para desativá-lo.
+        """
+        self._cache_size = max_bytes
+
+    def set_parsed_cache(self, max_bytes: Optional[int]):
+        """
+        Ativa o cache dos razões lidos na pasta de saída.
+
+        As colunas "Valor", "Hist", "Complemento" e "Id" de cada CSV lido são
+        guardadas em formato Arrow e, enquanto o arquivo não mudar, as próximas
+        conciliações dele as carregam por mapeamento de memória em vez de reler
+        o CSV e extrair os "Id" novamente, mesmo com outras configurações de
+        sinais, agrupamento ou formato de saída. Não se aplica à leitura em
+        blocos e requer o pacote pyarrow.
+
+        Parâmetros:
+        max_bytes (Optional[int]): Tamanho máximo do cache em bytes, ou None
+        para desativá-lo.
+        """
+        self._parsed_cache_size = max_bytes
+
+    def set_cache_directory(self, directory: Optional[str]):
+        """
+        Define a pasta onde ficam o cache de resultados e o cache dos razões
+        lidos, permitindo compartilhá-los entre pastas de saída diferentes.
+
+        Parâmetros:
+        directory (Optional[str]): Caminho da pasta, ou None para usar a pasta
+        de saída.
+        """
+        self._cache_directory = directory
+
+    def set_incremental_store(self, path: Optional[str], only_touched: bool = False):
+        """
+        Ativa a conciliação incremental com o estado salvo no arquivo indicado.
+
+        Cada arquivo conciliado é tratado como um lote de novos lançamentos:
+        seus saldos por "Id" são somados ao estado persistido e apenas os "Id"
+        do lote são reclassificados. O resultado gerado reflete o estado
+        acumulado, lendo e regravando os saldos de todos os "Id"; com
+        only_touched, só os "Id" afetados pelo lote são lidos e gravados, e o
+        tempo da conciliação fica proporcional ao lote (o pareamento de valores
+        semelhantes considera apenas esses "Id"). "Planilha Limpa" e "Hist
+        Diferente" contêm só as linhas do lote. Os arquivos são aplicados em
+        ordem, em um único processo, e o cache de resultados não é usado. Um
+        arquivo com conteúdo já aplicado ao estado é recusado (status "error"),
+        sem alterar os saldos.
+
+        Parâmetros:
+        path (Optional[str]): Caminho do banco SQLite com o estado, ou None
+        para desativar o modo incremental.
+        only_touched (bool): Gera o resultado só com os "Id" do lote e os
+        reclassificados por ele.
+        """
+        self._incremental_store = path
+        self._incremental_touched_only = bool(only_touched)
+
+    def set_instrumentation(self, enabled: bool, profiler: Optional[str] = None):
+        """
+        Ativa o relatório de execução de cada arquivo conciliado.
+
+        O relatório é salvo em JSON ao lado do resultado ("<nome>.report.json")
+        com o tempo, as linhas e o pico de memória de cada etapa ("load",
+        "anomalies", quando ativada, "calculate", que inclui "match", e "save")
+        e contadores de linhas com regex, grupos, pares encontrados, anomalias
+        e linhas gravadas.
+
+        Parâmetros:
+        enabled (bool): Gera ou não o relatório.
+        profiler (Optional[str]): "cprofile" para salvar as estatísticas em
+        "<nome>.prof" e incluir as funções mais custosas no relatório, ou
+        "tracemalloc" para incluir as linhas que mais alocam memória.
+        """
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Profiler desconhecido: '{profiler}'")
+        self._instrumented = enabled
+        self._profiler = profiler if enabled else None
+
+    def set_workers(self, workers: int):
+        """
+        Define quantos processos conciliam arquivos em paralelo.
+
+        Parâmetros:
+        workers (int): Número de processos; 1 concilia no processo atual.
+        """
+        self._workers = max(1, int(workers))
+
+    def set_progress(self, callback: Optional[Callable[[Dict], None]]):
+        """
+        Define o callback que recebe os eventos de progresso da conciliação.
+
+        Cada evento é um dicionário com as chaves "event" e "file", onde
+        "event" é "file_started", "rows_parsed" (com "rows"), "matched" (com
+        "matches"), "written" (com "output" e "cached") ou "file_finished" (com o resumo
+        do arquivo em "summary"). No modo com vários processos apenas
+        "file_finished" é enviado. O callback é chamado na thread que executa a conciliação.
+
+        Parâmetros:
+        callback (Optional[Callable[[Dict], None]]): Função chamada a cada evento.
+        """
+        self._progress = callback
+
+    def cancel(self):
+        """
+        Solicita o cancelamento da conciliação em andamento.
+
+        O arquivo atual é interrompido na próxima etapa e os arquivos restantes
+        são marcados como cancelados. Pode ser chamado de qualquer thread.
+        """
+        self._cancel_event.set()
+
+    def new_conciliation(self, input_path: List[str]) -> List[Dict]:
         """
         Inicia um novo processo de conciliação para os arquivos fornecidos.
 
+        Cada arquivo é conciliado de forma independente: um erro em um arquivo
+        é registrado no resumo e não interrompe os demais.
+
         Parâmetros:
         input_path (List[str]): Lista de caminhos dos arquivos de entrada.
+
+        Retorno:
+        List[Dict]: Um resumo por arquivo, na ordem de entrada, com as chaves
+        "file", "status" ("ok", "error" ou "cancelled"), "output", "error",
+        "elapsed" e "report" (o relatório de execução, quando ativado por
+        set_instrumentation e o arquivo não veio do cache).
+        """
+        self._cancel_event.clear()
+        settings = self._settings()
+        workers = min(self._workers, len(input_path))
+        if self._incremental_store:
+            # Os lotes alteram o mesmo estado e precisam ser aplicados em ordem
+            workers = 1
+        if workers <= 1:
+            summaries = []
+            for file in input_path:
+                summary = _reconcile_file(
+                    settings, file, self._progress, self._cancel_event
+                )
+                self._emit("file_finished", file, summary=summary)
+                summaries.append(summary)
+            return summaries
+        return self._run_in_pool(settings, input_path, workers)
+
+    def submit_to(self, executor: Executor, file: str) -> Future:
+        """
+        Envia a conciliação de um arquivo a um executor mantido pelo chamador
+        (ex.: um ProcessPoolExecutor aquecido), com as configurações atuais.
+
+        Parâmetros:
+        executor (Executor): Executor que roda a conciliação.
+        file (str): Caminho do arquivo de entrada.
+
+        Retorno:
+        Future: Futuro do resumo do arquivo; leia-o com collect_summary.
+        """
+        return executor.submit(_reconcile_file, self._settings(), file)
+
+    @staticmethod
+    def collect_summary(future: Future, file: str) -> Dict:
+        """
+        Lê o resumo de um futuro criado por submit_to. Cancelamentos e falhas
+        do próprio processo (ex.: processo encerrado) também viram resumo.
+
+        Parâmetros:
+        future (Future): Futuro retornado por submit_to, já concluído.
+        file (str): Arquivo enviado.
+
+        Retorno:
+        Dict: Resumo com as mesmas chaves de new_conciliation.
+        """
+        return _collect_result(future, file)
+
+    def consolidate(self, input_path: List[str], name: str = "consolidado") -> str:
+        """
+        Concilia um conjunto de períodos (ex.: os razões mensais de um ano)
+        como um único razão.
+
+        Cada arquivo é um período, nomeado pelo nome do arquivo e na ordem da
+        lista. Os saldos por "Id" somam todos os períodos, então um "Id" pago
+        em um mês e quitado no seguinte aparece como "Pagamento Completo". O
+        resultado traz ainda as abas "Saldos por Período" (saldo acumulado de
+        cada "Id" ao fim de cada período e o período em que foi fechado) e
+        "Transporte entre Períodos" (saldos levados de um período ao seguinte).
+        A tabela consolidada fica disponível em consolidated_ledger() para
+        novas consultas sem reler os arquivos. O cache de resultados e o modo
+        incremental não são usados.
+
+        Parâmetros:
+        input_path (List[str]): Arquivos dos períodos, do mais antigo ao mais
+        recente.
+        name (str): Nome do arquivo de resultado, sem extensão.
+
+        Retorno:
+        str: Caminho do resultado gravado.
+        """
+        periods = [period_name(file) for file in input_path]
+        if not periods:
+            raise ValueError("Nenhum período informado")
+        if len(set(periods)) != len(periods):
+            raise ValueError("Os arquivos dos períodos precisam ter nomes diferentes")
+        self._cancel_event.clear()
+        self._report = None
+
+        workers = min(self._workers, len(input_path))
+        if workers > 1:
+            settings = self._settings()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                loaded = list(
+                    executor.map(
+                        _load_period, [settings] * len(input_path), input_path
+                    )
+                )
+        else:
+            loaded = [self._load_period(file) for file in input_path]
+
+        ledger = ConsolidatedLedger()
+        for period, (totals, next_year_values, _) in zip(periods, loaded):
+            ledger.add_period(period, totals, next_year_values)
+        self._ledger = ledger
+        self._different_hist = pd.concat(
+            [different_hist for _, _, different_hist in loaded], ignore_index=True
+        )
+        self._data_frame = None
+        self._anomalies = None
+        self._check_cancelled()
+
+        self._id_totals = ledger.totals()
+        result, next_year_candidates = self._results_from_totals(
+            self._id_totals, ledger.next_year_values()
+        )
+        self._split_results(result, next_year_candidates)
+        self._emit("matched", name, matches=len(self._similar_values_df))
+        output = self._save_to_excel(
+            name,
+            {
+                "Saldos por Período": ledger.balances(),
+                "Transporte entre Períodos": ledger.carry_over(),
+            },
+        )
+        self._emit("written", name, output=output, cached=False)
+        return output
+
+    def consolidated_ledger(self) -> Optional[ConsolidatedLedger]:
+        """
+        Retorna a tabela da última consolidação, para consultar saldos por
+        período, fechamentos e o histórico de um "Id" (ver
+        consolidated.ConsolidatedLedger), ou None se não houve consolidação.
+        """
+        return self._ledger
+
+    def query(self, file: str) -> ResultIndex:
         """
-        for file in input_path:
-            self._result(file)
+        Concilia um arquivo em memória, sem gravar o resultado, e retorna um
+        índice para consultar os saldos e as linhas de cada "Id" (ver
+        query.ResultIndex).
+
+        O arquivo é sempre lido por inteiro, com o "Complemento" de todas as
+        linhas, mesmo com a leitura em blocos ativada, e o estado incremental
+        não é alterado. Com o cache de leitura ativado, consultar de novo o
+        mesmo arquivo não relê o CSV.
+
+        Parâmetros:
+        file (str): Caminho do CSV.
+
+        Retorno:
+        ResultIndex: O índice da conciliação do arquivo.
+        """
+        # Instância própria: a consulta não interfere em uma conciliação em andamento
+        conciliation = Conciliation._from_settings(self._settings())
+        conciliation._load_and_process_data(file, keep_text=True)
+        conciliation._group_totals()
+        conciliation._split_results(
+            *conciliation._results_from_totals(
+                conciliation._id_totals, conciliation._next_year_values
+            )
+        )
+        return conciliation._result_index()
+
+    def _result_index(self):
+        # Cada "Id" recebe o nome da aba em que aparece e, se pareado, o seu par
+        sheets = {
+            "Ano Passado": self._last_year_payments,
+            "Pagamento Incompleto": self._incomplete_payment,
+            "Próximo Ano": self._next_year,
+            "Pagamento Completo": self._completed_paid,
+        }
+        if self._grouped_payments is not None:
+            sheets["Pagamentos Agrupados"] = self._grouped_payments
+        categories = pd.concat(
+            [
+                pd.Series(name, index=sheet["Id"].to_numpy(), dtype=object)
+                for name, sheet in sheets.items()
+            ]
+        )
+        balances = self._id_totals.rename_axis("Id").reset_index(name="_cents")
+        balances[CATEGORY_COLUMN] = balances["Id"].map(categories)
+
+        partners = {}
+        similar = self._similar_values_df
+        for positive, negative in zip(similar["Id Positivo"], similar["Id Negativo"]):
+            partners[positive] = negative
+            partners[negative] = positive
+        if self._grouped_payments is not None:
+            for id_, number, kind in zip(
+                self._grouped_payments["Id"],
+                self._grouped_payments["Grupo"],
+                self._grouped_payments["Tipo"],
+            ):
+                partners[id_] = f"Grupo {number} ({kind})"
+        return ResultIndex(self._data_frame, balances, partners)
+
+    def _run_in_pool(self, settings, input_path, workers):
+        summaries = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_reconcile_file, settings, file): file
+                for file in input_path
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file = futures[future]
+                    summaries[file] = _collect_result(future, file)
+                    self._emit("file_finished", file, summary=summaries[file])
+                if self._cancel_event.is_set():
+                    # Arquivos ainda na fila não chegam a ser iniciados
+                    for future in pending:
+                        future.cancel()
+        return [summaries[file] for file in input_path]
+
+
+def _labels(template, values):
+    # Formata cada valor distinto uma única vez (muitas linhas repetem o texto)
+    unique, inverse = np.unique(values, return_inverse=True)
+    return np.array([template.format(value) for value in unique], dtype=object)[
+        inverse
+    ]
+
+
+def _reconcile_file(settings, file, progress=None, cancel_event=None):
+    # Unidade de trabalho: uma instância nova por arquivo, sem estado compartilhado
+    start = time.perf_counter()
+    conciliation = Conciliation._from_settings(settings)
+    conciliation._progress = progress
+    if cancel_event is not None:
+        conciliation._cancel_event = cancel_event
+    try:
+        output = conciliation._result(file)
+    except ConciliationCancelled:
+        return _file_summary(file, start, status="cancelled")
+    except Exception as e:
+        return _file_summary(file, start, error=f"{type(e).__name__}: {e}")
+    report = conciliation._report.to_dict() if conciliation._report else None
+    return _file_summary(file, start, output=output, report=report)
+
+
+def _isin_ids(ids, values):
+    # Como Series.isin, mas sem converter cada "Id" em objeto Python (o que o
+    # pandas faz com texto do Arrow): busca em um índice de valores únicos
+    return pd.Index(values).unique().get_indexer(ids) >= 0
+
+
+def _hist_column(hist):
+    # Sem células vazias, "Hist" volta a ser inteiro, como na leitura completa
+    # (o tipo inteiro com valores ausentes do pandas torna a leitura bem mais lenta)
+    return hist if hist.hasnans else hist.astype("int64")
+
+
+def _load_period(settings, file):
+    # Carrega um período da consolidação em outro processo
+    return Conciliation._from_settings(settings)._load_period(file)
+
+
+def _collect_result(future, file):
+    # Falhas do próprio processo (ex.: processo encerrado) também viram resumo
+    start = time.perf_counter()
+    if future.cancelled():
+        return _file_summary(file, start, status="cancelled")
+    try:
+        return future.result()
+    except Exception as e:
+        return _file_summary(file, start, error=f"{type(e).__name__}: {e}")
+
+
+def _file_summary(file, start, output=None, error=None, status=None, report=None):
+    return {
+        "file": file,
+        "status": status or ("error" if error else "ok"),
+        "output": output,
+        "error": error,
+        "elapsed": time.perf_counter() - start,
+        "report": report,
+    }
 
 
 # Exemplo de uso da classe Conciliation
@@ -238,10 +1275,16 @@ if __name__ == "__main__":
     # Define o diretório de saída
     conciliation.set_output("./result")
 
-    # Lista de arquivos de entrada
+    # Lista de arquivos de entrada (gera um razão sintético se não existir)
     arquivos_de_entrada = [
         "csv/original.csv",
     ]
+    if not os.path.exists(arquivos_de_entrada[0]):
+        from synthetic import generate_ledger
+
+        os.makedirs("csv", exist_ok=True)
+        generate_ledger(arquivos_de_entrada[0], rows=10_000)
 
     # Inicia o processo de conciliação
-    conciliation.new_conciliation(arquivos_de_entrada)
+    for resumo in conciliation.new_conciliation(arquivos_de_entrada):
+        print(resumo)
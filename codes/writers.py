@@ -0,0 +1,184 @@
+import errno
+import os
+import sqlite3
+from typing import Callable, Dict
+
+import pandas as pd
+import xlsxwriter
+
+# Linhas por bloco ao converter os DataFrames em valores para o xlsxwriter
+_ROWS_PER_BLOCK = 10000
+
+# Abas cujas primeiras linhas (valores semelhantes) são destacadas em negrito
+HIGHLIGHTED_SHEETS = ("Ano Passado", "Pagamento Incompleto")
+
+
+def _ensure_writable(output_file):
+    # Verifica se o arquivo de saída está acessível
+    if os.path.exists(output_file):
+        try:
+            os.rename(output_file, output_file)
+        except OSError as e:
+            if e.errno == errno.EACCES:
+                raise PermissionError(f"Permission denied: '{output_file}'")
+
+
+def save_excel(sheets: Dict[str, pd.DataFrame], highlighted: int, output_base: str):
+    """
+    Salva as abas em um arquivo Excel usando o pandas.
+
+    Parâmetros:
+    sheets (Dict[str, pd.DataFrame]): Abas na ordem em que devem ser gravadas.
+    highlighted (int): Quantidade de linhas destacadas no topo das abas de
+    HIGHLIGHTED_SHEETS.
+    output_base (str): Caminho de saída sem a extensão.
+
+    Retorno:
+    str: Caminho do arquivo gerado.
+    """
+    output_file = f"{output_base}.xlsx"
+    _ensure_writable(output_file)
+
+    with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
+        for sheet_name, data_frame in sheets.items():
+            data_frame.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        workbook = writer.book
+        font_format = workbook.add_format({"font_size": 14})
+        bold_format = workbook.add_format({"font_size": 14, "bold": True})
+
+        for sheet_name, data_frame in sheets.items():
+            worksheet = writer.sheets[sheet_name]
+            worksheet.set_column(
+                "A:Z", None, font_format
+            )  # Define o tamanho da fonte para as células
+            for col_num, value in enumerate(data_frame.columns.values):
+                worksheet.write(
+                    0, col_num, value, bold_format
+                )  # Cabeçalhos com negrito e tamanho definido
+
+        # Adiciona negrito para IDs semelhantes
+        for sheet_name in HIGHLIGHTED_SHEETS:
+            for idx in range(highlighted):
+                writer.sheets[sheet_name].set_row(idx + 1, None, bold_format)
+
+    return output_file
+
+
+def save_excel_streaming(
+    sheets: Dict[str, pd.DataFrame], highlighted: int, output_base: str
+):
+    """
+    Salva as abas em um arquivo Excel gravando linha a linha em modo
+    constant_memory do xlsxwriter, com a formatação aplicada na mesma passada.
+
+    Os parâmetros e o retorno são os mesmos de save_excel.
+    """
+    output_file = f"{output_base}.xlsx"
+    _ensure_writable(output_file)
+
+    workbook = xlsxwriter.Workbook(output_file, {"constant_memory": True})
+    try:
+        font_format = workbook.add_format({"font_size": 14})
+        bold_format = workbook.add_format({"font_size": 14, "bold": True})
+
+        for sheet_name, data_frame in sheets.items():
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.set_column("A:Z", None, font_format)
+            worksheet.write_row(0, 0, list(data_frame.columns), bold_format)
+
+            bold_rows = highlighted if sheet_name in HIGHLIGHTED_SHEETS else 0
+            row_num = 1
+            for values in _iter_rows(data_frame):
+                cell_format = bold_format if row_num <= bold_rows else None
+                worksheet.write_row(row_num, 0, values, cell_format)
+                row_num += 1
+    finally:
+        workbook.close()
+
+    return output_file
+
+
+def _iter_rows(data_frame):
+    # Converte blocos de linhas para tipos nativos, trocando valores ausentes por None
+    for start in range(0, len(data_frame), _ROWS_PER_BLOCK):
+        block = data_frame.iloc[start : start + _ROWS_PER_BLOCK]
+        columns = [
+            block[column].astype(object).where(block[column].notna(), None).tolist()
+            for column in block.columns
+        ]
+        yield from zip(*columns)
+
+
+def save_csv(sheets: Dict[str, pd.DataFrame], highlighted: int, output_base: str):
+    """
+    Salva cada aba como um arquivo CSV (separado por ";") em uma pasta própria.
+
+    Os parâmetros são os mesmos de save_excel.
+
+    Retorno:
+    str: Caminho da pasta gerada.
+    """
+    os.makedirs(output_base, exist_ok=True)
+    for sheet_name, data_frame in sheets.items():
+        data_frame.to_csv(
+            os.path.join(output_base, f"{sheet_name}.csv"), sep=";", index=False
+        )
+    return output_base
+
+
+def save_parquet(sheets: Dict[str, pd.DataFrame], highlighted: int, output_base: str):
+    """
+    Salva cada aba como um arquivo Parquet em uma pasta própria.
+
+    Requer o pacote pyarrow. Os parâmetros são os mesmos de save_excel.
+
+    Retorno:
+    str: Caminho da pasta gerada.
+    """
+    os.makedirs(output_base, exist_ok=True)
+    for sheet_name, data_frame in sheets.items():
+        data_frame.to_parquet(
+            os.path.join(output_base, f"{sheet_name}.parquet"), index=False
+        )
+    return output_base
+
+
+def save_sqlite(sheets: Dict[str, pd.DataFrame], highlighted: int, output_base: str):
+    """
+    Salva cada aba como uma tabela de um banco SQLite, substituindo as existentes.
+
+    Os parâmetros são os mesmos de save_excel.
+
+    Retorno:
+    str: Caminho do banco gerado.
+    """
+    output_file = f"{output_base}.sqlite"
+    with sqlite3.connect(output_file) as connection:
+        for sheet_name, data_frame in sheets.items():
+            data_frame.to_sql(
+                sheet_name, connection, if_exists="replace", index=False
+            )
+    connection.close()
+    return output_file
+
+
+OUTPUT_WRITERS: Dict[str, Callable] = {
+    "xlsx": save_excel,
+    "xlsx_stream": save_excel_streaming,
+    "csv": save_csv,
+    "parquet": save_parquet,
+    "sqlite": save_sqlite,
+}
+
+
+def register_writer(name: str, writer: Callable):
+    """
+    Registra um novo formato de saída.
+
+    Parâmetros:
+    name (str): Nome do formato, usado em Conciliation.set_output_format.
+    writer (Callable): Função com a mesma assinatura de save_excel que retorna
+    o caminho gerado.
+    """
+    OUTPUT_WRITERS[name] = writer